@@ -0,0 +1,16 @@
+"""
+EvoBuildSim: building agents compete for materials, trade, build and sell houses, and evolve
+their strategies with a genetic algorithm.
+
+    from evobuildsim import SimulationConfig, create_world, main
+
+    material_agent, agents = create_world(SimulationConfig(days=60))
+    main(60, material_agent, agents, write_stats=False)
+
+Importing the package is cheap: pandas, openpyxl, pyarrow and numpy are only imported by the
+features that need them (stats export, metrics streaming, the array engine).
+"""
+from .config import SimulationConfig
+from .simulation import BuildingAgent, HouseProgress, MaterialAgent, create_world, main
+
+__version__ = "0.2.0"
@@ -0,0 +1,348 @@
+"""
+Benchmark suite.
+
+Times the parts of the simulator that decide how long a run takes, with output silenced and
+fixed seeds so two runs of the same code do the same work. The worlds have a warehouse scaled
+to the population and run every day (skip_idle off):
+
+    main/<n>              days per second of main() with n agents (12, 1k, 10k, 100k)
+    engine_speedup/<n>    main() with the array engine against the object engine, n agents (10k, 100k)
+    trading_round/<n>     one conduct_trading_round with n agents that have needs and excess
+    ga_step/<n>           roulette_wheel_selection + perform_crossover + perform_mutation
+    snapshot_capture/<n>  Snapshot.capture of a world with n agents (10k, 100k)
+    snapshot_restore/<n>  Snapshot.restore of that world
+    snapshot_fork/<n>     Snapshot.fork of that world into FORK_BRANCHES branches
+    write_csv/<rows>      write_stats_to_csv for 12 agents onto a file that already has <rows> rows
+    write_excel/<rows>    the same for write_stats_to_excel
+    cold_start            a fresh interpreter running `evobuildsim run` for 50 silent days
+
+Every case runs a few times and reports the median and the fastest time. Results are JSON;
+compare mode flags every case that got slower than a stored baseline by more than a threshold.
+Cases with a fixed budget (BUDGETS) fail the run when they exceed it; cold_start also fails
+when the run imported one of the export-only modules, and engine_speedup when the array engine
+is less than MIN_SPEEDUP times as fast as the object engine.
+
+Usage:
+    evobuildsim bench run --out baseline.json
+    evobuildsim bench run --quick --out current.json --baseline baseline.json
+    evobuildsim bench compare baseline.json current.json --threshold 0.15
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from . import events, simulation
+from .config import SimulationConfig
+from .snapshot import Snapshot
+
+
+SEED = 1234
+MAIN_SIZES = (12, 1000, 10000, 100000)
+TRADING_SIZES = (12, 1000, 10000, 100000)
+GA_SIZES = (12, 1000, 10000)
+SPEEDUP_SIZES = (10000, 100000)
+SNAPSHOT_SIZES = (10000, 100000)
+FORK_BRANCHES = 4
+CSV_HISTORY = (0, 1000, 10000, 100000)
+EXCEL_HISTORY = (0, 1000, 10000)
+SKIP_IDLE = False
+QUICK_LIMIT = 10000  # --quick skips the cases above this size
+# seconds a case may take no matter what the baseline says; pandas alone takes about half a second to import
+BUDGETS = {'cold_start': 0.35}
+# the array engine has to at least keep up with the object engine; it used to be 3.7x slower at 100k
+MIN_SPEEDUP = 1.0
+EXPORT_ONLY_MODULES = ('pandas', 'openpyxl', 'pyarrow', 'numpy')
+_COLD_START = (
+    "import sys\n"
+    "from evobuildsim.cli import main\n"
+    "main(['run', '--level', 'off', '--seed', '%d'])\n"
+    "print(','.join(name for name in %r if name in sys.modules))\n"
+)
+
+
+def _world(n, engine="object"):
+    # the warehouse grows with the population (3x for the 12 default builders) so big runs don't sell out
+    # on day 1, and skip_idle is pinned so a change of its default doesn't change what main/* measures
+    config = SimulationConfig(roster=simulation.scaled_roster(n), engine=engine,
+                              inventory_multiplier=max(3, n // 4), skip_idle=SKIP_IDLE)
+    return config, *simulation.create_world(config)
+
+
+def _time(run, repeats, setup=None):
+    """Median and fastest wall time of run(setup()) over `repeats` runs; setup is not timed."""
+    times = []
+    for _ in range(repeats):
+        argument = setup() if setup is not None else None
+        random.seed(SEED)
+        start = time.perf_counter()
+        run(argument)
+        times.append(time.perf_counter() - start)
+    return {'seconds': statistics.median(times), 'min': min(times), 'repeats': repeats}
+
+
+def bench_main(n, days, repeats, engine="object"):
+
+    def setup():
+        random.seed(SEED)
+        return _world(n, engine)
+
+    def run(world):
+        config, material_agent, agents = world
+        simulation.main(days, material_agent=material_agent, agents=agents, config=config, write_stats=False)
+
+    result = _time(run, repeats, setup)
+    result.update(days=days, agents=n, days_per_second=days / result['seconds'])
+    return result
+
+
+def bench_engine_speedup(n, days, repeats):
+    object_result = bench_main(n, days, repeats, "object")
+    result = bench_main(n, days, repeats, "array")
+    result.update(object_seconds=object_result['seconds'], speedup=object_result['seconds'] / result['seconds'])
+    return result
+
+
+def _warm_world(n, days=4):
+    # a few request days so the agents have needs to buy and excess to sell, frozen in a snapshot
+    random.seed(SEED)
+    config, material_agent, agents = _world(n)
+    simulation.main(days, material_agent=material_agent, agents=agents, config=config, write_stats=False)
+    return Snapshot.capture(days, material_agent, agents)
+
+
+def bench_trading_round(n, repeats):
+    snapshot = _warm_world(n)
+
+    def run(world):
+        _, material_agent, agents = world
+        simulation.conduct_trading_round(agents, material_agent)
+
+    result = _time(run, repeats, lambda: snapshot.restore(set_random_state=False))
+    result.update(agents=n)
+    return result
+
+
+def bench_ga_step(n, repeats):
+    snapshot = _warm_world(n)
+
+    def run(world):
+        _, _, agents = world
+        selected = simulation.roulette_wheel_selection(agents)
+        for start in range(0, len(selected), 2):
+            simulation.perform_crossover(selected[start:start + 2])
+        simulation.perform_mutation(agents)
+
+    result = _time(run, repeats, lambda: snapshot.restore(set_random_state=False))
+    result.update(agents=n)
+    return result
+
+
+def bench_snapshot(kind, n, repeats):
+    snapshot = _warm_world(n)
+    if kind == 'capture':
+        _, material_agent, agents = snapshot.restore(set_random_state=False)
+        run = lambda _: Snapshot.capture(snapshot.day, material_agent, agents)
+    elif kind == 'restore':
+        run = lambda _: snapshot.restore(set_random_state=False)
+    else:
+        run = lambda _: snapshot.fork(FORK_BRANCHES)
+    result = _time(run, repeats)
+    result.update(agents=n)
+    return result
+
+
+def bench_write_stats(kind, history_rows, repeats, directory):
+    write = simulation.write_stats_to_csv if kind == 'csv' else simulation.write_stats_to_excel
+    _, _, agents = _world(12)
+    path = os.path.join(directory, f"history.{'csv' if kind == 'csv' else 'xlsx'}")
+
+    def setup():
+        if os.path.exists(path):
+            os.remove(path)
+        if history_rows:
+            write(agents * (history_rows // len(agents)), None, 0.2, 1, file_name=path)
+
+    def run(_):
+        write(agents, None, 0.2, 1, file_name=path)
+
+    result = _time(run, repeats, setup)
+    result.update(history_rows=history_rows)
+    return result
+
+
+def bench_cold_start(repeats):
+    command = [sys.executable, "-c", _COLD_START % (SEED, EXPORT_ONLY_MODULES)]
+    project = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = []
+
+    def run(_):
+        output.append(subprocess.run(command, cwd=project, capture_output=True, text=True, check=True).stdout)
+
+    result = _time(run, repeats)
+    result.update(imported=[name for name in output[-1].strip().split(',') if name])
+    return result
+
+
+def cases(quick=False, engine="object"):
+    """Case name -> zero argument callable returning its result dict."""
+    limit = QUICK_LIMIT if quick else float('inf')
+    directory = tempfile.mkdtemp(prefix="evobuildsim-bench-")
+    found = {}
+    for n in MAIN_SIZES:
+        if n <= limit:
+            # fewer days and repeats for the big populations so every case takes seconds, not minutes
+            days, repeats = (30, 5) if n <= 1000 else (10, 3) if n <= 10000 else (5, 1)
+            found[f"main/{n}"] = lambda n=n, days=days, repeats=repeats: bench_main(n, days, repeats, engine)
+    for n in SPEEDUP_SIZES:
+        if n <= limit:
+            days, repeats = (15, 3) if n <= 10000 else (10, 1)
+            found[f"engine_speedup/{n}"] = lambda n=n, days=days, repeats=repeats: bench_engine_speedup(n, days, repeats)
+    for n in TRADING_SIZES:
+        if n <= limit:
+            found[f"trading_round/{n}"] = lambda n=n: bench_trading_round(n, 5 if n <= 10000 else 2)
+    for n in GA_SIZES:
+        if n <= limit:
+            found[f"ga_step/{n}"] = lambda n=n: bench_ga_step(n, 5)
+    for n in SNAPSHOT_SIZES:
+        if n <= limit:
+            for kind in ('capture', 'restore', 'fork'):
+                found[f"snapshot_{kind}/{n}"] = lambda kind=kind, n=n: bench_snapshot(kind, n, 5 if n <= 10000 else 3)
+    for rows in CSV_HISTORY:
+        if rows <= limit:
+            found[f"write_csv/{rows}"] = lambda rows=rows: bench_write_stats('csv', rows, 5, directory)
+    for rows in EXCEL_HISTORY:
+        if rows <= limit:
+            found[f"write_excel/{rows}"] = lambda rows=rows: bench_write_stats('excel', rows, 3, directory)
+    found["cold_start"] = lambda: bench_cold_start(5)
+    return found
+
+
+def run_benchmarks(selected=None, quick=False, engine="object", progress=None):
+    """
+    Run the benchmark cases.
+
+    :param selected: case name prefixes to run, e.g. ["main/", "ga_step/12"], None for all.
+    :param progress: optional callable(name, result) called after every case.
+    :return: JSON-ready dict with the environment and a result per case.
+    """
+    previous = events.configure(events.NullSink(), events.OFF)
+    try:
+        results = {}
+        for name, case in cases(quick, engine).items():
+            if selected and not any(name.startswith(prefix) for prefix in selected):
+                continue
+            results[name] = case()
+            if progress is not None:
+                progress(name, results[name])
+    finally:
+        events.configure(*previous)
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'engine': engine,
+            'skip_idle': SKIP_IDLE,
+            'seed': SEED,
+            'time': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        'results': results,
+    }
+
+
+def compare(baseline, current, threshold=0.10):
+    """
+    Compare two benchmark results case by case.
+
+    :param threshold: relative slowdown of the median time that counts as a regression.
+    :return: list of (name, baseline seconds, current seconds, ratio, regressed) for the cases in both.
+    """
+    rows = []
+    for name, result in current['results'].items():
+        if name in baseline['results']:
+            before, after = baseline['results'][name]['seconds'], result['seconds']
+            ratio = after / before if before else float('inf')
+            rows.append((name, before, after, ratio, ratio > 1 + threshold))
+    return rows
+
+
+def check_budgets(results):
+    """:return: one message per case over its budget (or a cold start that imported export-only modules)."""
+    problems = []
+    for name, budget in BUDGETS.items():
+        result = results['results'].get(name)
+        if result is not None and result['seconds'] > budget:
+            problems.append(f"{name} took {result['seconds']:.3f}s, budget {budget:.3f}s")
+    cold_start = results['results'].get('cold_start')
+    if cold_start and cold_start['imported']:
+        problems.append(f"cold_start imported {', '.join(cold_start['imported'])}")
+    for name, result in results['results'].items():
+        if name.startswith('engine_speedup/') and result['speedup'] < MIN_SPEEDUP:
+            problems.append(f"{name} array engine {result['speedup']:.2f}x the object engine, minimum {MIN_SPEEDUP:.2f}x")
+    return problems
+
+
+def _print_comparison(rows, threshold):
+    regressions = 0
+    for name, before, after, ratio, regressed in rows:
+        regressions += regressed
+        flag = "REGRESSION" if regressed else ("faster" if ratio < 1 - threshold else "")
+        print(f"{name:24} {before * 1000:12.3f}ms {after * 1000:12.3f}ms {ratio:7.2f}x {flag}")
+    print(f"{regressions} regression(s) over {threshold:.0%} in {len(rows)} case(s)")
+    return regressions
+
+
+def _load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def cli(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the simulator.")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run = commands.add_parser('run', help="run the benchmark cases")
+    run.add_argument('cases', nargs='*', help="case name prefixes to run, e.g. main/ ga_step/12 (default: all)")
+    run.add_argument('--quick', action='store_true', help=f"skip the cases with more than {QUICK_LIMIT} agents or rows")
+    run.add_argument('--engine', choices=('object', 'array'), default='object', help="engine for the main/ cases")
+    run.add_argument('--out', default=None, help="write the results to this JSON file")
+    run.add_argument('--baseline', default=None, help="compare against this results file afterwards")
+    run.add_argument('--threshold', type=float, default=0.10)
+
+    comparison = commands.add_parser('compare', help="compare two results files")
+    comparison.add_argument('baseline')
+    comparison.add_argument('current')
+    comparison.add_argument('--threshold', type=float, default=0.10)
+
+    args = parser.parse_args(argv)
+    if args.command == 'compare':
+        rows = compare(_load(args.baseline), _load(args.current), args.threshold)
+        return 1 if _print_comparison(rows, args.threshold) else 0
+
+    def progress(name, result):
+        extra = f" ({result['days_per_second']:.1f} days/s)" if 'days_per_second' in result else ""
+        if 'speedup' in result:
+            extra += f" {result['speedup']:.2f}x the object engine"
+        print(f"{name:24} {result['seconds'] * 1000:12.3f}ms{extra}", file=sys.stderr)
+
+    results = run_benchmarks(args.cases or None, args.quick, args.engine, progress)
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(results, f, indent=2)
+    problems = check_budgets(results)
+    for problem in problems:
+        print(f"OVER BUDGET: {problem}")
+    if args.baseline:
+        rows = compare(_load(args.baseline), results, args.threshold)
+        return 1 if _print_comparison(rows, args.threshold) or problems else 0
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(cli())
@@ -0,0 +1,130 @@
+"""
+The `evobuildsim` command.
+
+    evobuildsim run --days 50 --seed 7              one simulation (--metrics DIR streams per-day metrics)
+    evobuildsim replicas --seeds 0-99 --workers 8   many seeds on a process pool (runner.py)
+    evobuildsim sweep --grid mutation_rate=0.05,0.1 parameter sweeps with a result cache (sweep.py)
+    evobuildsim regions --regions 4 --agents 4000   one world split into markets in worker processes (regions.py)
+    evobuildsim islands --islands 4 --topology ring island-model GA with migration between worker processes (islands.py)
+    evobuildsim landscape --seeds 0-4               every genotype evaluated with the GA off (genome.py)
+    evobuildsim bench run --quick                   benchmark suite (benchmark.py)
+    evobuildsim metrics export --csv daily.csv      convert streamed metrics (metrics_writer.py)
+    evobuildsim results top --where days=50         query the SQLite results catalog (results_catalog.py)
+    evobuildsim replay show run.tape --day 43       re-run days of a recorded run with tracing (replay.py)
+    evobuildsim lineage ancestors lineage --agent X where a strategy came from (lineage.py)
+
+Every subcommand imports its module only when it runs, so a plain `evobuildsim run` never
+loads pandas, openpyxl, pyarrow or numpy.
+"""
+import argparse
+import importlib
+import importlib.util
+import random
+import sys
+import time
+
+from . import events
+from .config import SimulationConfig
+
+
+# subcommand -> module whose cli(argv) handles it
+DELEGATES = {
+    'replicas': 'runner',
+    'sweep': 'sweep',
+    'regions': 'regions',
+    'islands': 'islands',
+    'landscape': 'genome',
+    'bench': 'benchmark',
+    'metrics': 'metrics_writer',
+    'results': 'results_catalog',
+    'replay': 'replay',
+    'lineage': 'lineage',
+}
+
+
+def run(argv=None):
+    """Run one simulation, printing what happens like the original script did."""
+    parser = argparse.ArgumentParser(prog="evobuildsim run", description="Run one simulation.")
+    parser.add_argument('--days', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=None, help="seed the random module for a reproducible run")
+    parser.add_argument('--engine', choices=('object', 'array'), default='object')
+    parser.add_argument('--clearing', choices=('sequential', 'pro_rata', 'price_weighted'), default='sequential')
+    parser.add_argument('--rng', choices=('global', 'streams'), default='global',
+                        help="random module stream, or per-purpose streams seeded with --seed (needs numpy)")
+    parser.add_argument('--house-mix', default=None, metavar='TYPES',
+                        help="comma-separated house types handed out to the agents in turn, e.g. cottage,standard")
+    parser.add_argument('--level', choices=tuple(events.LEVEL_NAMES), default='debug', help="console output level")
+    parser.add_argument('--metrics', default=None, metavar='DIR',
+                        help="stream one row per agent per day to a new file in this directory (needs pyarrow)")
+    parser.add_argument('--history', default=None, metavar='DIR',
+                        help="keep the full state of every agent on every day in a memory-mapped store (needs numpy)")
+    parser.add_argument('--lineage', default=None, metavar='DIR',
+                        help="record every crossover and mutation with its parents in a lineage store")
+    parser.add_argument('--stats', action='store_true', help="append the final day to agent_stats.xlsx and agent_stats.csv")
+    parser.add_argument('--results', default=None, metavar='PATH',
+                        help="record the run with its config, seed and daily stats in this SQLite results catalog")
+    args = parser.parse_args(argv)
+    if args.metrics and importlib.util.find_spec('pyarrow') is None:
+        parser.error("--metrics needs pyarrow: pip install pyarrow")
+
+    from .simulation import create_world, main
+
+    events.configure(events.ConsoleSink(), events.LEVEL_NAMES[args.level])
+    if args.seed is not None:
+        random.seed(args.seed)
+    config = SimulationConfig(days=args.days, engine=args.engine, clearing=args.clearing, rng=args.rng,
+                              rng_seed=args.seed or 0, house_mix=args.house_mix.split(',') if args.house_mix else None)
+    material_agent, agents = create_world(config)
+    history = None
+    if args.history:
+        from .history import HistoryStore
+        history = HistoryStore.create(args.history, agents)
+    lineage = None
+    if args.lineage:
+        from .lineage import LineageStore
+        lineage = LineageStore.create(args.lineage, agents)
+    daily = None
+    if args.results:
+        from .results_catalog import DailyStats
+        daily = DailyStats()
+    started = time.time()
+    try:
+        if args.metrics is None:
+            agents = main(config.days, material_agent, agents, config=config, write_stats=args.stats, history=history,
+                          on_day_end=daily, lineage=lineage)
+        else:
+            # per-day rows are streamed to the metrics directory, export them with: evobuildsim metrics export
+            from .metrics_writer import MetricsWriter
+            with MetricsWriter(args.metrics) as metrics:
+                agents = main(config.days, material_agent, agents, config=config, write_stats=args.stats,
+                              metrics=metrics, history=history, on_day_end=daily, lineage=lineage)
+    finally:
+        if history is not None:
+            history.close()
+        if lineage is not None:
+            lineage.close()
+    if args.results:
+        from .results_catalog import ResultsCatalog
+        with ResultsCatalog(args.results) as catalog:
+            catalog.record_run(config, args.seed, agents, started, time.time(), daily)
+    return 0
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    commands = ('run',) + tuple(DELEGATES)
+    if not argv or argv[0] in ('-h', '--help') or argv[0] not in commands:
+        if argv and argv[0] not in ('-h', '--help'):
+            print(f"evobuildsim: unknown command {argv[0]!r}", file=sys.stderr)
+        print(__doc__.strip(), file=sys.stderr)
+        return 0 if argv and argv[0] in ('-h', '--help') else 2
+
+    command, rest = argv[0], argv[1:]
+    if command == 'run':
+        return run(rest)
+    module = importlib.import_module(f".{DELEGATES[command]}", __package__)
+    return module.cli(rest) or 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
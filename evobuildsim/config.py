@@ -0,0 +1,103 @@
+"""
+Simulation settings.
+
+Every knob that used to be a literal inside main() and the agents lives here, so a run is fully
+described by a SimulationConfig (plus its seed). The defaults reproduce the original simulation.
+"""
+import hashlib
+import json
+from dataclasses import asdict, dataclass, field, fields, replace
+
+
+@dataclass
+class SimulationConfig:
+    """
+    :param days: number of days to simulate.
+    :param engine: "object" walks every BuildingAgent through request_materials, "array" runs the
+                   request days on the NumPy population engine (same results, scales to large populations).
+    :param clearing: how a request day's demands share the MaterialAgent stock: "sequential" (list
+                     order, the original behaviour), "pro_rata" or "price_weighted" (by buyprice).
+                     The last two always clear in one batch on the population engine.
+    :param roster: list of BuildingAgent keyword dicts, None for the default twelve agents. A dict's
+                   'house_type' names the type of house the agent builds (houses.py).
+    :param start_money: give every agent this much money to start with, None keeps the roster's amounts.
+    :param restock_every: the MaterialAgent restocks every this many days.
+    :param trade_every: trading day every this many days (no material requests on those days).
+    :param mutate_every: mutation day every this many days.
+    :param ga_every: selection and crossover every this many days.
+    :param mutation_rate: chance per gene and agent to mutate on mutation days.
+    :param selection: parent selection operator: "roulette", "alias", "sus" or "tournament".
+    :param parents: number of parents selected on GA days, crossed over in pairs.
+    :param tournament_size: agents per tournament for the "tournament" operator.
+    :param forced_buy_chance: chance per needed material to be forced to buy extra units.
+    :param forced_buy_amount: number of extra units in a forced buy.
+    :param inventory_multiplier: warehouse capacity in multiples of 80% of the materials for 8 houses.
+    :param skip_idle: jump over stretches of request days on which provably nobody can buy anything
+                      (same results, see simulation.idle_request_draws). Off while debug events are on.
+    :param rng: "global" draws from the random module in agent order (the original behaviour), "streams"
+                from per-purpose, per-day streams keyed by agent name (rng.py, needs numpy), which don't
+                depend on the agent order, the engine or the process.
+    :param rng_seed: root seed of the "streams" rng.
+    :param surrogate: with a fitness cache passed to main(), undo crossovers and mutations that the
+                      cache predicts to score worse than the genotype they replace.
+    :param surrogate_min_samples: samples a genotype needs in the cache before its estimate is trusted.
+    :param house_types: extra house types, HouseType.to_dict() dicts, usable by name in the roster and house_mix.
+    :param house_mix: house type names handed out in turn to the roster agents that don't name one,
+                      None builds standard houses.
+    :param stop_entropy: stop early once the genotype entropy is at or below this many bits (convergence.py).
+    :param stop_plateau: stop early after this many mutation/GA days in a row over which neither the best
+                         nor the mean fitness grew by more than plateau_tolerance (relative).
+    :param plateau_tolerance: growth of the fitness, relative to its level, that still counts as a plateau.
+    :param stop_rank_stable: stop early after this many mutation/GA days in a row on which the fitness
+                             ranking correlates with the previous one by at least rank_threshold (Spearman).
+    :param rank_threshold: rank correlation that counts as a stable ranking.
+    :param stop_min_day: never stop early before this day.
+    """
+    days: int = 50
+    engine: str = "object"
+    clearing: str = "sequential"
+    roster: list = field(default=None)
+    start_money: int = None
+    restock_every: int = 9
+    trade_every: int = 5
+    mutate_every: int = 6
+    ga_every: int = 15
+    mutation_rate: float = 0.1
+    selection: str = "roulette"
+    parents: int = 4
+    tournament_size: int = 3
+    forced_buy_chance: float = 0.2
+    forced_buy_amount: int = 1
+    inventory_multiplier: int = 3
+    skip_idle: bool = True
+    rng: str = "global"
+    rng_seed: int = 0
+    surrogate: bool = False
+    surrogate_min_samples: int = 3
+    house_types: list = field(default=None)
+    house_mix: list = field(default=None)
+    stop_entropy: float = None
+    stop_plateau: int = None
+    plateau_tolerance: float = 0.01
+    stop_rank_stable: int = None
+    rank_threshold: float = 0.99
+    stop_min_day: int = 0
+
+    def to_dict(self):
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, values):
+        known = {f.name for f in fields(cls)}
+        unknown = set(values) - known
+        if unknown:
+            raise ValueError(f"unknown config fields: {', '.join(sorted(unknown))}")
+        return cls(**values)
+
+    def replace(self, **changes):
+        return replace(self, **changes)
+
+    def digest(self):
+        """Stable hash of the settings, the same for equal configs in any process."""
+        text = json.dumps(self.to_dict(), sort_keys=True, separators=(',', ':'))
+        return hashlib.sha256(text.encode()).hexdigest()
@@ -0,0 +1,174 @@
+"""
+Convergence monitors and early stopping.
+
+Once the population has collapsed to a few genotypes, or the fitness and the ranking of the
+builders stop moving, the remaining days of a run can't change what the GA found. The monitor
+is updated at the end of every mutation and GA day and keeps one record per check:
+
+    entropy   Shannon entropy (bits) of the genotype distribution, 0 when everybody has the same genome
+    best      best fitness
+    mean      mean fitness
+    rate      fitness the best and the mean builder gained per day since the previous check,
+              exponentially smoothed
+    rank      Spearman correlation of the fitness ranking with the one of the previous check
+
+Stop rules, all off by default (SimulationConfig fields, or ConvergenceMonitor arguments):
+
+    stop_entropy      entropy at or below this many bits
+    stop_plateau      this many checks in a row over which neither the best nor the mean fitness
+                      grew by more than plateau_tolerance, relative to its value at the start of
+                      the stretch; a population that keeps building at a steady pace is not on a
+                      plateau, however flat its gain per day
+    stop_rank_stable  this many checks in a row with a rank correlation of at least rank_threshold
+
+main() stops at the end of the first day a rule fires (never before stop_min_day), writes the
+stats of that day as the final ones and leaves the reason in monitor.stop_reason / stop_day:
+
+    monitor = ConvergenceMonitor.from_config(config)
+    main(config.days, config=config, convergence=monitor)
+    monitor.stop_reason, monitor.stop_day, monitor.records
+"""
+import math
+from collections import Counter
+
+from .selection import fitness
+
+
+REASONS = ('entropy', 'plateau', 'rank_stable')
+
+
+def genotype_entropy(builder_agents):
+    """Shannon entropy in bits of the agents' genotypes, 0 when they all share one."""
+    n = len(builder_agents)
+    if n == 0:
+        return 0.0
+    counts = Counter(agent.genome() for agent in builder_agents)
+    return -sum(count / n * math.log2(count / n) for count in counts.values())
+
+
+def gene_entropies(builder_agents):
+    """Entropy in bits of every gene on its own, by gene name."""
+    n = len(builder_agents)
+    genes = {'build_order': Counter(), 'priority_houses': Counter(), 'buyprice': Counter(), 'sellprice': Counter()}
+    for agent in builder_agents:
+        build_order, priority_houses, buyprice, sellprice = agent.genome()
+        genes['build_order'][build_order] += 1
+        genes['priority_houses'][priority_houses] += 1
+        genes['buyprice'][buyprice] += 1
+        genes['sellprice'][sellprice] += 1
+    return {gene: -sum(count / n * math.log2(count / n) for count in counts.values()) if n else 0.0
+            for gene, counts in genes.items()}
+
+
+def rank_correlation(previous, current):
+    """
+    Spearman correlation of two rankings given as name lists, best first, over the names in both.
+    1.0 when fewer than two names are shared.
+    """
+    shared = set(previous).intersection(current)
+    n = len(shared)
+    if n < 2:
+        return 1.0
+    previous_rank = {name: rank for rank, name in enumerate(name for name in previous if name in shared)}
+    squared = sum((previous_rank[name] - rank) ** 2 for rank, name in enumerate(name for name in current if name in shared))
+    return 1.0 - 6.0 * squared / (n * (n * n - 1))
+
+
+class ConvergenceMonitor:
+    """
+    :param stop_entropy: stop when the genotype entropy is at or below this many bits, None for no rule.
+    :param stop_plateau: stop after this many fitness plateau checks in a row, None for no rule.
+    :param plateau_tolerance: growth of the best and mean fitness, relative to their level, that still counts as a plateau.
+    :param smoothing: weight of the newest gain in the smoothed rate.
+    :param stop_rank_stable: stop after this many stable-ranking checks in a row, None for no rule.
+    :param rank_threshold: rank correlation with the previous check that counts as stable.
+    :param min_day: never stop before this day.
+    """
+
+    def __init__(self, stop_entropy=None, stop_plateau=None, plateau_tolerance=0.01, stop_rank_stable=None,
+                 rank_threshold=0.99, min_day=0, smoothing=0.25):
+        self.stop_entropy = stop_entropy
+        self.stop_plateau = stop_plateau
+        self.plateau_tolerance = plateau_tolerance
+        self.stop_rank_stable = stop_rank_stable
+        self.rank_threshold = rank_threshold
+        self.min_day = min_day
+        self.smoothing = smoothing
+        self.records = []  # dicts with day, entropy, best, mean, rate and rank per check
+        self.stop_reason = None
+        self.stop_day = None
+        self.plateau_checks = 0
+        self.stable_checks = 0
+        self._ranking = None
+        self._plateau_start = None  # best and mean fitness at the start of the current plateau
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(config.stop_entropy, config.stop_plateau, config.plateau_tolerance, config.stop_rank_stable,
+                   config.rank_threshold, config.stop_min_day)
+
+    @property
+    def active(self):
+        """True if any stop rule is set."""
+        return self.stop_entropy is not None or self.stop_plateau is not None or self.stop_rank_stable is not None
+
+    def update(self, day, builder_agents):
+        """
+        Record the population at the end of a mutation or GA day.
+
+        :return: the stop reason (one of REASONS) if a rule fires, else None.
+        """
+        scores = [fitness(agent) for agent in builder_agents]
+        ranking = [agent.name for _, agent in sorted(zip(scores, builder_agents), key=lambda pair: pair[0], reverse=True)]
+        record = {
+            'day': day,
+            'entropy': genotype_entropy(builder_agents),
+            'best': max(scores, default=0.0),
+            'mean': sum(scores) / len(scores) if scores else 0.0,
+            'rank': None if self._ranking is None else rank_correlation(self._ranking, ranking),
+        }
+        record['rate'] = None
+        if self.records:
+            last = self.records[-1]
+            days = max(day - last['day'], 1)
+            gains = ((record['best'] - last['best']) / days, (record['mean'] - last['mean']) / days)
+            if last['rate'] is None:
+                record['rate'] = gains
+            else:
+                weight = self.smoothing
+                record['rate'] = tuple(weight * gain + (1 - weight) * rate for gain, rate in zip(gains, last['rate']))
+        levels = (record['best'], record['mean'])
+        if self._plateau_start is None:
+            self._plateau_start = levels
+        else:
+            tolerance = self.plateau_tolerance
+            if any(level - start > tolerance * abs(start) for level, start in zip(levels, self._plateau_start)):
+                self._plateau_start = levels
+                self.plateau_checks = 0
+            else:
+                self.plateau_checks += 1
+        if record['rank'] is not None:
+            self.stable_checks = self.stable_checks + 1 if record['rank'] >= self.rank_threshold else 0
+        self._ranking = ranking
+        self.records.append(record)
+
+        if self.stop_reason is not None or day < self.min_day:
+            return None
+        if self.stop_entropy is not None and record['entropy'] <= self.stop_entropy:
+            self.stop_reason = 'entropy'
+        elif self.stop_plateau is not None and self.plateau_checks >= self.stop_plateau:
+            self.stop_reason = 'plateau'
+        elif self.stop_rank_stable is not None and self.stable_checks >= self.stop_rank_stable:
+            self.stop_reason = 'rank_stable'
+        if self.stop_reason is not None:
+            self.stop_day = day
+        return self.stop_reason
+
+    def detail(self):
+        """One line describing the last check, for the log."""
+        if not self.records:
+            return ""
+        record = self.records[-1]
+        rank = "n/a" if record['rank'] is None else f"{record['rank']:.3f}"
+        return (f"entropy {record['entropy']:.2f} bits, best {record['best']:.4f}, mean {record['mean']:.4f}, "
+                f"rank correlation {rank}, {self.plateau_checks} flat / {self.stable_checks} stable checks")
@@ -0,0 +1,254 @@
+"""
+Leveled, typed simulation events with pluggable sinks.
+
+The simulation reports what happens through emit() instead of print(). Events are only built
+when their level is enabled, so the hot path guards every emit with the module flags:
+
+    if events.info_enabled:
+        events.emit(events.Purchase(agent.name, material, quantity, cost))
+
+and a silenced run never formats a string. Sinks decide what happens with the events:
+NullSink drops them, RingBufferSink keeps the last N in memory, ConsoleSink prints them
+the way the simulation always has, and FileSink writes buffered NDJSON.
+"""
+import json
+from collections import deque
+from typing import NamedTuple
+
+
+DEBUG = 10    # per-agent progress dumps, needs, summaries
+INFO = 20     # purchases, trades, completed parts, sold houses, mutations, crossovers
+WARNING = 30  # things that should not happen
+OFF = 100
+
+LEVEL_NAMES = {'debug': DEBUG, 'info': INFO, 'warning': WARNING, 'off': OFF}
+
+
+class Purchase(NamedTuple):
+    agent: str
+    material: str
+    quantity: int
+    cost: int
+    level = INFO
+    kind = 'purchase'
+
+    def format(self):
+        return f"{self.agent} received {self.quantity} units of {self.material} for SEK {self.cost}."
+
+
+class ForcedBuy(NamedTuple):
+    agent: str
+    material: str
+    quantity: int
+    level = INFO
+    kind = 'forced_buy'
+
+    def format(self):
+        return f"{self.agent} was forced to buy an additional {self.quantity} units of {self.material}."
+
+
+class Trade(NamedTuple):
+    buyer: str
+    seller: str
+    material: str
+    quantity: int
+    cost: int
+    level = INFO
+    kind = 'trade'
+
+    def format(self):
+        return f"{self.buyer} bought {self.quantity} units of {self.material} from {self.seller} at {self.cost} SEK."
+
+
+class PartCompleted(NamedTuple):
+    agent: str
+    part: str
+    level = INFO
+    kind = 'part_completed'
+
+    def format(self):
+        return f"{self.agent} has completed {self.part}."
+
+
+class HouseSold(NamedTuple):
+    agent: str
+    house_number: int
+    price: int
+    money_before: int
+    money_after: int
+    level = INFO
+    kind = 'house_sold'
+
+    def format(self):
+        return (f"{self.agent} has completed house {self.house_number} according to the build order.\n"
+                f"{self.agent} has {self.money_before} SEK before selling.\n"
+                f"{self.agent} has sold house {self.house_number} for {self.price} SEK.\n"
+                f"{self.agent} has {self.money_after} SEK after selling.\n")
+
+
+class Mutation(NamedTuple):
+    agent: str
+    gene: str
+    old: object
+    new: object
+    level = INFO
+    kind = 'mutation'
+
+    def format(self):
+        names = {'build_order': 'build order', 'priority_houses': 'priority houses'}
+        return f"{self.agent} {names.get(self.gene, self.gene)} mutated from {self.old} to {self.new}."
+
+
+class Crossover(NamedTuple):
+    agent_a: str
+    agent_b: str
+    genes: tuple
+    level = INFO
+    kind = 'crossover'
+
+    def format(self):
+        return f"{self.agent_a} and {self.agent_b} swapped {', '.join(self.genes)}."
+
+
+class Converged(NamedTuple):
+    day: int
+    reason: str
+    detail: str
+    level = INFO
+    kind = 'converged'
+
+    def format(self):
+        return f"Day {self.day}: the population has converged ({self.reason}: {self.detail}), stopping early."
+
+
+class Trace(NamedTuple):
+    """Free-form line for the verbose parts of the log (progress dumps, day headers, summaries)."""
+    level: int
+    text: str
+    kind = 'trace'
+
+    def format(self):
+        return self.text
+
+
+class NullSink:
+    """Drops every event."""
+
+    def write(self, event):
+        pass
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class ConsoleSink:
+    """Prints events as the human-readable lines the simulation has always printed."""
+
+    def write(self, event):
+        print(event.format())
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class RingBufferSink:
+    """Keeps the last `capacity` events in memory, e.g. for tests or post-mortem inspection."""
+
+    def __init__(self, capacity=10000):
+        self.events = deque(maxlen=capacity)
+
+    def write(self, event):
+        self.events.append(event)
+
+    def of_kind(self, kind):
+        return [event for event in self.events if event.kind == kind]
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class FileSink:
+    """
+    Writes one compact JSON object per event (NDJSON), buffered in memory and written in batches.
+
+    :param path: file to append to.
+    :param batch_size: number of events collected before a write.
+    """
+
+    def __init__(self, path, batch_size=4096):
+        self.file = open(path, 'a', buffering=1 << 20)
+        self.batch_size = batch_size
+        self.pending = []
+
+    def write(self, event):
+        record = event._asdict()
+        record['kind'] = event.kind
+        self.pending.append(json.dumps(record, separators=(',', ':'), default=str))
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self.pending:
+            self.file.write('\n'.join(self.pending) + '\n')
+            self.pending = []
+        self.file.flush()
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+
+_sink = ConsoleSink()
+_threshold = DEBUG
+debug_enabled = True
+info_enabled = True
+warning_enabled = True
+
+
+def configure(sink=None, level=INFO):
+    """
+    Select where events go and which levels are built at all.
+
+    :param sink: NullSink, RingBufferSink, ConsoleSink, FileSink or anything with write/flush/close.
+    :param level: lowest level that is emitted (DEBUG, INFO, WARNING, OFF or its lowercase name).
+    :return: the previous (sink, level), so callers can restore it.
+    """
+    global _sink, _threshold, debug_enabled, info_enabled, warning_enabled
+    previous = (_sink, _threshold)
+    if isinstance(level, str):
+        level = LEVEL_NAMES[level.lower()]
+    _sink = sink if sink is not None else ConsoleSink()
+    _threshold = level
+    debug_enabled = level <= DEBUG
+    info_enabled = level <= INFO
+    warning_enabled = level <= WARNING
+    return previous
+
+
+def silence():
+    """Turn all events off; nothing is built or written. Returns the previous (sink, level)."""
+    return configure(NullSink(), OFF)
+
+
+def emit(event):
+    if event.level >= _threshold:
+        _sink.write(event)
+
+
+def trace(level, text):
+    """Shorthand for emit(Trace(level, text)); only call it behind an *_enabled check."""
+    if level >= _threshold:
+        _sink.write(Trace(level, text))
+
+
+def current_sink():
+    return _sink
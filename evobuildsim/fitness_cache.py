@@ -0,0 +1,271 @@
+"""
+Genotype -> fitness memo cache.
+
+A strategy genome is only (build_order, priority_houses, buyprice, sellprice), so the same few
+hundred genotypes come back generation after generation and run after run. The cache keeps a
+running mean and variance of the final fitness seen for every genotype, per environment (the
+config minus the settings that don't change how a genotype scores), so later runs can look up
+what a genotype is likely to score instead of finding out the hard way.
+
+Recent entries live in memory (LRU, max_entries). With a path, the cache is backed by an
+SQLite file that several runs and processes can share: flush() merges what this process
+recorded into the file in one transaction, so concurrent writers never lose samples. Entries
+that are looked up count as used as well, the file prunes the least recently used ones.
+
+A cache that is read while it is being written makes a run's results depend on which other
+runs came first. runner.run_replicas() therefore takes a snapshot() of the file before it
+starts any replica, every replica reads only that snapshot (FitnessCache(snapshot=...)), and
+the samples they recorded are merged into the file afterwards, in seed order; a seed gives
+the same results whatever the worker count and chunking.
+
+    with FitnessCache("fitness.sqlite") as cache:
+        main(50, material_agent, agents, config=SimulationConfig(surrogate=True), fitness_cache=cache)
+
+With config.surrogate the GA pre-screens offspring: after crossover and mutation, an agent whose
+new genotype is known (at least surrogate_min_samples samples) to score below its old one goes
+back to the old genotype, so no simulation days are spent on it.
+
+The samples are the agents' fitness at the end of a run, credited in full to the genotype each
+agent has then. Houses and money an agent earned under an earlier genotype, before crossover or
+mutation changed it, count for its last one, so the estimates lean toward the genotypes that
+were around late in a run rather than measuring each genotype on its own.
+"""
+import hashlib
+import json
+import math
+import sqlite3
+import time
+from collections import OrderedDict
+
+from .selection import fitness
+
+
+# settings that don't change how a genotype scores on average: same results, another random stream, or they only steer the GA
+NOT_ENVIRONMENT = ('engine', 'skip_idle', 'rng', 'rng_seed', 'surrogate', 'surrogate_min_samples')
+
+
+def environment_key(config):
+    values = {name: value for name, value in config.to_dict().items() if name not in NOT_ENVIRONMENT}
+    return hashlib.sha256(json.dumps(values, sort_keys=True, separators=(',', ':')).encode()).hexdigest()[:16]
+
+
+def genotype_key(genome):
+    build_order, priority_houses, buyprice, sellprice = genome
+    return f"{','.join(build_order)}|{priority_houses}|{buyprice}|{sellprice}"
+
+
+class FitnessStats:
+    """Running count, mean and sum of squared deviations (Welford) of one genotype's fitness."""
+    __slots__ = ('count', 'mean', 'm2')
+
+    def __init__(self, count=0, mean=0.0, m2=0.0):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    def merge(self, other):
+        """Combine with another set of samples (Chan et al.)."""
+        if other.count == 0:
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+
+    @property
+    def variance(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def stdev(self):
+        return math.sqrt(self.variance)
+
+    def __repr__(self):
+        return f"FitnessStats(count={self.count}, mean={self.mean:.4f}, stdev={self.stdev:.4f})"
+
+
+class FitnessCache:
+    """
+    :param path: SQLite file shared between runs, None for a memory-only cache.
+    :param max_entries: genotypes kept in memory, least recently used ones are dropped first.
+    :param max_disk_entries: rows kept in the file, the least recently used are pruned on flush; None keeps all.
+    :param snapshot: read-only estimates from snapshot(), used instead of a file. What this cache records
+                     doesn't change its estimates then; take it from `pending` and merge() it elsewhere.
+    """
+
+    def __init__(self, path=None, max_entries=4096, max_disk_entries=None, snapshot=None):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.snapshot_entries = snapshot
+        self.entries = OrderedDict()  # (environment, genotype) -> FitnessStats, most recently used last
+        self.pending = {}             # samples recorded since the last flush, same keys
+        self.used = set()             # keys looked up since the last flush, their last_used moves on flush
+        self.screened = 0
+        self.rejected = 0
+        self.connection = None
+        if path is not None:
+            # autocommit mode, flush() takes the write lock itself before reading what it merges into
+            self.connection = sqlite3.connect(path, timeout=30, isolation_level=None)
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS fitness (environment TEXT, genotype TEXT, count INTEGER, mean REAL,"
+                " m2 REAL, last_used REAL, PRIMARY KEY (environment, genotype))")
+
+    def _get(self, key):
+        if self.snapshot_entries is not None:
+            values = self.snapshot_entries.get(key)
+            return None if values is None else FitnessStats(*values)
+        stats = self.entries.get(key)
+        if stats is not None:
+            self.entries.move_to_end(key)
+            self.used.add(key)
+            return stats
+        if self.connection is not None:
+            row = self.connection.execute("SELECT count, mean, m2 FROM fitness WHERE environment = ? AND genotype = ?",
+                                          key).fetchone()
+            if row is not None:
+                stats = FitnessStats(*row)
+        pending = self.pending.get(key)
+        if pending is not None:
+            # samples of this process that were not flushed yet
+            stats = stats or FitnessStats()
+            stats.merge(pending)
+        if stats is not None:
+            self._remember(key, stats)
+            self.used.add(key)
+        return stats
+
+    def _remember(self, key, stats):
+        self.entries[key] = stats
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def estimate(self, config, genome):
+        """FitnessStats of a genotype in this environment, None if it was never seen."""
+        return self._get((environment_key(config), genotype_key(genome)))
+
+    def _record(self, key, value):
+        if self.snapshot_entries is not None:
+            self.pending.setdefault(key, FitnessStats()).add(value)
+            return
+        stats = self._get(key)
+        if stats is None:
+            stats = FitnessStats()
+            self._remember(key, stats)
+        stats.add(value)
+        self.pending.setdefault(key, FitnessStats()).add(value)
+
+    def record(self, config, genome, value):
+        """Add one fitness sample of a genotype."""
+        self._record((environment_key(config), genotype_key(genome)), value)
+
+    def record_agents(self, config, builder_agents):
+        """Record every agent's fitness under its current genotype, e.g. at the end of a run."""
+        environment = environment_key(config)
+        for agent in builder_agents:
+            self._record((environment, genotype_key(agent.genome())), fitness(agent))
+
+    def snapshot(self, config=None):
+        """
+        Read-only copy of the estimates, for FitnessCache(snapshot=...) in other processes.
+
+        :param config: only the entries of this config's environment, None for all.
+        :return: dict (environment, genotype) -> (count, mean, m2); a file-backed cache is flushed first.
+        """
+        environment = None if config is None else environment_key(config)
+        if self.connection is None:
+            return {key: (stats.count, stats.mean, stats.m2) for key, stats in self.entries.items()
+                    if environment is None or key[0] == environment}
+        self.flush()
+        query, parameters = "SELECT environment, genotype, count, mean, m2 FROM fitness", ()
+        if environment is not None:
+            query, parameters = query + " WHERE environment = ?", (environment,)
+        return {(row[0], row[1]): row[2:] for row in self.connection.execute(query, parameters)}
+
+    def merge(self, samples):
+        """
+        Add samples another cache recorded, e.g. the `pending` of a snapshot cache in a worker.
+
+        :param samples: dict (environment, genotype) -> FitnessStats.
+        """
+        for key, delta in samples.items():
+            stats = self._get(key)
+            if stats is None:
+                stats = FitnessStats()
+                self._remember(key, stats)
+            stats.merge(delta)
+            self.pending.setdefault(key, FitnessStats()).merge(delta)
+
+    def prescreen(self, config, agent, parent_genome):
+        """
+        Surrogate check of one offspring: send the agent back to `parent_genome` when the cache
+        knows both genotypes well enough and the new one scores lower on average.
+
+        :return: True if the offspring is kept.
+        """
+        child_genome = agent.genome()
+        if child_genome == parent_genome:
+            return True
+        self.screened += 1
+        child, parent = self.estimate(config, child_genome), self.estimate(config, parent_genome)
+        minimum = config.surrogate_min_samples
+        if child is not None and parent is not None and child.count >= minimum and parent.count >= minimum \
+                and child.mean < parent.mean:
+            agent.set_genome(parent_genome)
+            self.rejected += 1
+            return False
+        return True
+
+    def flush(self):
+        """Merge the samples recorded since the last flush into the backing file and mark the entries looked up as used."""
+        if self.connection is None or not (self.pending or self.used):
+            self.pending.clear()
+            self.used.clear()
+            return
+        now = time.time()
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            self.connection.executemany("UPDATE fitness SET last_used = ? WHERE environment = ? AND genotype = ?",
+                                        [(now, environment, genotype) for environment, genotype in self.used
+                                         if (environment, genotype) not in self.pending])
+            for (environment, genotype), delta in self.pending.items():
+                row = self.connection.execute("SELECT count, mean, m2 FROM fitness WHERE environment = ? AND genotype = ?",
+                                              (environment, genotype)).fetchone()
+                stats = FitnessStats(*row) if row is not None else FitnessStats()
+                stats.merge(delta)
+                self.connection.execute("INSERT OR REPLACE INTO fitness VALUES (?, ?, ?, ?, ?, ?)",
+                                        (environment, genotype, stats.count, stats.mean, stats.m2, now))
+            if self.max_disk_entries is not None:
+                self.connection.execute(
+                    "DELETE FROM fitness WHERE rowid NOT IN (SELECT rowid FROM fitness ORDER BY last_used DESC LIMIT ?)",
+                    (self.max_disk_entries,))
+        except BaseException:
+            self.connection.execute("ROLLBACK")
+            raise
+        self.connection.execute("COMMIT")
+        self.pending.clear()
+        self.used.clear()
+
+    def close(self):
+        self.flush()
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return len(self.entries)
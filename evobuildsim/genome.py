@@ -0,0 +1,266 @@
+"""
+Packed integer genomes.
+
+A builder's strategy is (build_order, priority_houses, buyprice, sellprice): 6 build orders x 2
+house counts x 8 buy prices x 8 sell prices = 768 genotypes, so one genome fits in a small
+integer and a whole population in one int16 array:
+
+    code = ((order * 2 + priority_houses - 1) * 8 + buyprice - 1) * 8 + sellprice - 1
+
+where order indexes BUILD_ORDERS. pack()/unpack() convert between codes and BuildingAgents
+(unpack goes through set_genome, so construction progress follows the house count), and
+crossover()/mutate() apply the GA operators to a whole population array in one call.
+
+Exhaustive mode runs every genotype of the space as a probe builder among the default roster,
+with the GA switched off, and averages its final fitness over a few seeds. That is the ground
+truth fitness landscape a GA run can be compared against:
+
+    evobuildsim landscape --seeds 0-4 --days 50 --workers 8 --out landscape.json
+    evobuildsim landscape --seeds 0-4 --compare replicas.json
+
+Everything but pack/unpack/encode/decode needs numpy.
+"""
+import argparse
+import itertools
+import json
+import random
+import statistics
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from . import events, simulation
+from .config import SimulationConfig
+from .runner import parse_seeds
+
+
+PARTS = tuple(simulation.BuildingAgent.part_requirements)
+BUILD_ORDERS = tuple(itertools.permutations(PARTS))
+_ORDER_INDEX = {order: index for index, order in enumerate(BUILD_ORDERS)}
+PRICES = 8  # buyprice and sellprice are 1..8, like perform_mutation draws them
+SPACE = len(BUILD_ORDERS) * 2 * PRICES * PRICES
+
+
+def encode(genome):
+    """Packed code of a (build_order, priority_houses, buyprice, sellprice) genome."""
+    build_order, priority_houses, buyprice, sellprice = genome
+    if not (priority_houses in (1, 2) and 1 <= buyprice <= PRICES and 1 <= sellprice <= PRICES):
+        raise ValueError(f"genome {genome!r} is outside the genotype space")
+    return ((_ORDER_INDEX[tuple(build_order)] * 2 + priority_houses - 1) * PRICES + buyprice - 1) * PRICES + sellprice - 1
+
+
+def decode(code):
+    """The (build_order, priority_houses, buyprice, sellprice) genome of a code, like BuildingAgent.genome()."""
+    code = int(code)
+    if not 0 <= code < SPACE:
+        raise ValueError(f"code {code} is outside the genotype space")
+    rest, sellprice = divmod(code, PRICES)
+    rest, buyprice = divmod(rest, PRICES)
+    order, priority = divmod(rest, 2)
+    return BUILD_ORDERS[order], priority + 1, buyprice + 1, sellprice + 1
+
+
+def pack(builder_agents):
+    """int16 array with the code of every agent's genome, in list order."""
+    import numpy as np
+    return np.array([encode(agent.genome()) for agent in builder_agents], dtype=np.int16)
+
+
+def unpack(codes, builder_agents):
+    """Give every agent the genome of its code; agents whose code didn't change are left alone."""
+    for agent, code in zip(builder_agents, codes):
+        genome = decode(code)
+        if genome != agent.genome():
+            agent.set_genome(genome)
+
+
+def fields(codes):
+    """Split codes into (order, priority_houses, buyprice, sellprice) arrays."""
+    rest, sellprice = divmod(codes, PRICES)
+    rest, buyprice = divmod(rest, PRICES)
+    order, priority = divmod(rest, 2)
+    return order, priority + 1, buyprice + 1, sellprice + 1
+
+
+def combine(order, priority_houses, buyprice, sellprice):
+    """Inverse of fields()."""
+    import numpy as np
+    codes = ((order * 2 + priority_houses - 1) * PRICES + buyprice - 1) * PRICES + sellprice - 1
+    return np.asarray(codes, dtype=np.int16)
+
+
+def crossover(codes, pairs):
+    """
+    Cross over pairs of a population in one step, like perform_crossover: the two agents of a
+    pair swap their whole genomes.
+
+    Parents can be selected more than once; the pairs then swap in order, like the serial loop.
+
+    :param codes: int array of packed genomes, changed in place.
+    :param pairs: int array (pairs, 2) of population indices, e.g. selected parents taken two by two.
+    """
+    import numpy as np
+    pairs = np.asarray(pairs, dtype=np.int64).reshape(-1, 2)
+    if len(np.unique(pairs)) == pairs.size:
+        first, second = pairs[:, 0], pairs[:, 1]
+        codes[first], codes[second] = codes[second], codes[first].copy()
+    else:
+        # compose the swaps into one permutation of the population, then gather once
+        source = np.arange(len(codes))
+        for first, second in pairs.tolist():
+            source[first], source[second] = source[second], source[first]
+        codes[:] = codes[source]
+    return codes
+
+
+def mutate(codes, rate, rng):
+    """
+    Mutate a population in one step, like perform_mutation: every gene of every agent mutates
+    with chance `rate`. A build order mutates to a random permutation (it may stay the same,
+    like random.shuffle), priority_houses mutates to 1 (perform_mutation's `2 if agent == 1 else 1`
+    is always 1), buyprice and sellprice to a random 1..8.
+
+    The draws come from the NumPy generator, so the result matches perform_mutation in
+    distribution, not draw for draw.
+
+    :param rng: numpy.random.Generator.
+    :return: new array of codes.
+    """
+    import numpy as np
+    order, priority_houses, buyprice, sellprice = fields(np.asarray(codes, dtype=np.int64))
+    hit = rng.random((4, len(order))) < rate
+    order = np.where(hit[0], rng.integers(0, len(BUILD_ORDERS), len(order)), order)
+    priority_houses = np.where(hit[1], 1, priority_houses)
+    buyprice = np.where(hit[2], rng.integers(1, PRICES + 1, len(order)), buyprice)
+    sellprice = np.where(hit[3], rng.integers(1, PRICES + 1, len(order)), sellprice)
+    return combine(order, priority_houses, buyprice, sellprice)
+
+
+def frequencies(codes):
+    """Share of the population per genotype, an array of length SPACE."""
+    import numpy as np
+    counts = np.bincount(np.asarray(codes, dtype=np.int64), minlength=SPACE)
+    return counts / max(len(codes), 1)
+
+
+def _probe_config(config):
+    # no mutation or GA days, the probe keeps its genotype for the whole run
+    return config.replace(mutate_every=config.days + 1, ga_every=config.days + 1)
+
+
+def evaluate(code, config, seeds, position=0):
+    """
+    Final fitness of one genotype on every seed: the builder at `position` of the roster is
+    given the genotype, the GA is off, and the run goes for config.days days.
+    """
+    config = _probe_config(config)
+    genome = decode(code)
+    scores = []
+    previous = events.silence()
+    try:
+        for seed in seeds:
+            random.seed(seed)
+            material_agent, agents = simulation.create_world(config)
+            probe = agents[position]
+            probe.set_genome(genome)
+            simulation.main(config.days, material_agent, agents, config=config, write_stats=False)
+            scores.append(probe.houses_built + probe.money / 1000000)
+    finally:
+        events.configure(*previous)
+    return scores
+
+
+def _evaluate_chunk(codes, config, seeds, position):
+    return [(code, evaluate(code, config, seeds, position)) for code in codes]
+
+
+def landscape(config=None, seeds=range(5), position=0, workers=None, chunksize=16, codes=None):
+    """
+    Evaluate every genotype (or the given codes) on a process pool.
+
+    :param position: roster index of the probe builder.
+    :param workers: worker processes, None for os.cpu_count(), 0 to run in this process.
+    :return: list of dicts (code, genome fields, mean, stdev, scores), best mean first.
+    """
+    config = config or SimulationConfig()
+    seeds = list(seeds)
+    codes = list(range(SPACE)) if codes is None else [int(code) for code in codes]
+    chunks = [codes[i:i + chunksize] for i in range(0, len(codes), chunksize)]
+    if workers == 0:
+        results = [row for chunk in chunks for row in _evaluate_chunk(chunk, config, seeds, position)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = [row for chunk in pool.map(_evaluate_chunk, chunks, [config] * len(chunks),
+                                                 [seeds] * len(chunks), [position] * len(chunks)) for row in chunk]
+    rows = []
+    for code, scores in results:
+        build_order, priority_houses, buyprice, sellprice = decode(code)
+        rows.append({
+            'code': code,
+            'build_order': list(build_order),
+            'priority_houses': priority_houses,
+            'buyprice': buyprice,
+            'sellprice': sellprice,
+            'mean': statistics.fmean(scores),
+            'stdev': statistics.stdev(scores) if len(scores) > 1 else 0.0,
+            'scores': scores,
+        })
+    rows.sort(key=lambda row: row['mean'], reverse=True)
+    for rank, row in enumerate(rows, 1):
+        row['rank'] = rank
+    return rows
+
+
+def compare(rows, genomes):
+    """
+    Place genomes (e.g. the final genomes of a GA run) in an exhaustive landscape.
+
+    :param rows: landscape() result.
+    :param genomes: iterable of (build_order, priority_houses, buyprice, sellprice).
+    :return: list of (genome, rank, mean) with rank 1 the best genotype of the landscape.
+    """
+    by_code = {row['code']: row for row in rows}
+    placed = []
+    for genome in genomes:
+        row = by_code.get(encode(genome))
+        placed.append((genome, row['rank'] if row else None, row['mean'] if row else None))
+    return placed
+
+
+def _replica_genomes(path):
+    # final genomes of every agent in a runner results file (evobuildsim replicas --out)
+    with open(path) as f:
+        results = json.load(f)
+    return [(tuple(agent['build_order']), agent['priority_houses'], agent['buyprice'], agent['sellprice'])
+            for result in results['per_seed'] for agent in result['agents']]
+
+
+def cli(argv=None):
+    parser = argparse.ArgumentParser(prog="evobuildsim landscape",
+                                     description="Evaluate every genotype as a probe builder with the GA off.")
+    parser.add_argument('--seeds', default='0-4', help="seeds per genotype (default 0-4)")
+    parser.add_argument('--days', type=int, default=50)
+    parser.add_argument('--position', type=int, default=0, help="roster index of the probe builder")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes, 0 runs in-process (default: cpu count)")
+    parser.add_argument('--chunksize', type=int, default=16)
+    parser.add_argument('--top', type=int, default=10, help="genotypes to print")
+    parser.add_argument('--compare', default=None, metavar='REPLICAS_JSON',
+                        help="rank the final genomes of a replicas run (evobuildsim replicas --out) in the landscape")
+    parser.add_argument('--out', default=None, help="write the whole landscape as JSON to this file")
+    args = parser.parse_args(argv)
+
+    rows = landscape(SimulationConfig(days=args.days), parse_seeds(args.seeds), args.position, args.workers, args.chunksize)
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(rows, f, indent=2)
+    for row in rows[:args.top]:
+        print(f"{row['rank']:4} {','.join(row['build_order']):20} {row['priority_houses']} "
+              f"{row['buyprice']} {row['sellprice']} {row['mean']:10.4f} +- {row['stdev']:.4f}")
+    if args.compare:
+        ranks = [rank for _, rank, _ in compare(rows, _replica_genomes(args.compare)) if rank is not None]
+        if ranks:
+            print(f"{len(ranks)} final GA genomes: median rank {statistics.median(ranks):.0f} of {len(rows)}, "
+                  f"best {min(ranks)}, worst {max(ranks)}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,226 @@
+"""
+Memory-mapped per-agent time series.
+
+MetricsWriter streams a handful of columns per agent per day; HistoryStore keeps the full state
+of every agent on every day (money, houses, genome, focus, acquired units per part, excess per
+material) in one fixed-schema int64 array on disk, shaped days x agents x FIELDS and filled in
+place at the end of every day. The file is a raw memmap next to a small JSON schema, so the
+process only holds the pages it touches and analysis code can read it while the run goes on:
+
+    with HistoryStore.create("history", agents) as history:
+        main(10000, material_agent, agents, history=history)
+
+    history = HistoryStore.open("history")
+    money = history.view('money', days=slice(100, 200))          # days x agents, no copy
+    krzysztof = history.view(agents=history.column("Krzysztof Wojcik"))  # days x fields
+
+Agents keep the column they got when the store was created, however the roster gets sorted.
+The file grows by chunk_days days at a time when a run goes past its capacity; views taken
+before that keep showing the old mapping, open() again (or call refresh()) to see the new days.
+Rows of days that were not recorded yet have day == 0.
+
+    evobuildsim run --days 10000 --history history
+"""
+import json
+import os
+from array import array
+
+from .genome import BUILD_ORDERS, PRICES
+from .simulation import WAREHOUSE_CAPACITY, BuildingAgent
+
+
+PARTS = tuple(BuildingAgent.part_requirements)
+MATERIALS = tuple(WAREHOUSE_CAPACITY)
+FIELDS = (
+    ('day', 'money', 'houses_built', 'genome', 'build_order', 'priority_houses', 'buyprice', 'sellprice', 'focus')
+    + tuple(f"progress_{part}" for part in PARTS)
+    + tuple(f"excess_{material}" for material in MATERIALS)
+    + ('excess_other',)  # excess under keys that are not materials (crossover and mutation put part names there)
+)
+DATA_FILE = "history.i64"
+SCHEMA_FILE = "schema.json"
+_ORDER_INDEX = {order: index for index, order in enumerate(BUILD_ORDERS)}
+
+
+def _require_numpy():
+    try:
+        import numpy
+    except ImportError as error:
+        raise ImportError("the history store needs numpy: pip install numpy") from error
+    return numpy
+
+
+def agent_row(agent, day):
+    """The FIELDS values of one agent at the end of `day`."""
+    houses = agent.construction_progress
+    if len(houses) == 1:
+        progress = [sum(houses[0].parts[part].values()) for part in PARTS]
+    else:
+        progress = [sum(sum(house.parts[part].values()) for house in houses) for part in PARTS]
+    excess = agent.excess_materials
+    if len(excess) == len(MATERIALS) and tuple(excess) == MATERIALS:
+        excess_values = list(excess.values())
+        excess_values.append(0)
+    else:
+        excess_values = [excess.get(material, 0) for material in MATERIALS]
+        excess_values.append(sum(quantity for key, quantity in excess.items() if key not in WAREHOUSE_CAPACITY))
+    build_order = _ORDER_INDEX[tuple(agent.build_order)]
+    genome = ((build_order * 2 + agent.priority_houses - 1) * PRICES + agent.buyprice - 1) * PRICES + agent.sellprice - 1
+    return ([day, agent.money, agent.houses_built, genome, build_order,
+             agent.priority_houses, agent.buyprice, agent.sellprice, agent.current_focus_house]
+            + progress + excess_values)
+
+
+class HistoryStore:
+    """
+    Use create() to start a store for a roster and open() to read (or extend) an existing one.
+
+    :param directory: directory with the data file and its schema.
+    :param mode: "r" for read-only views, "r+" to record days.
+    """
+
+    def __init__(self, directory, mode="r"):
+        self.np = _require_numpy()
+        self.directory = directory
+        self.mode = mode
+        with open(os.path.join(directory, SCHEMA_FILE)) as f:
+            schema = json.load(f)
+        if tuple(schema['fields']) != FIELDS:
+            raise ValueError(f"{directory} was written with fields {schema['fields']}, expected {list(FIELDS)}")
+        self.agents = schema['agents']
+        self.first_day = schema['first_day']
+        self.chunk_days = schema['chunk_days']
+        self._field_index = {name: index for index, name in enumerate(FIELDS)}
+        self._agent_index = {name: index for index, name in enumerate(self.agents)}
+        self._columns = {}  # id(agent) -> column, filled when recording
+        self.data = None
+        self.refresh()
+
+    @classmethod
+    def create(cls, directory, builder_agents, first_day=1, chunk_days=1024):
+        """
+        Start an empty store for these agents, room for chunk_days days to begin with.
+
+        :param first_day: day stored in the first row, e.g. the day after a restored snapshot.
+        """
+        names = [agent.name for agent in builder_agents]
+        if len(set(names)) != len(names):
+            raise ValueError("agent names must be unique to be stored in a history")
+        os.makedirs(directory, exist_ok=True)
+        schema = {'fields': list(FIELDS), 'agents': names, 'first_day': first_day, 'chunk_days': chunk_days}
+        with open(os.path.join(directory, SCHEMA_FILE), 'w') as f:
+            json.dump(schema, f)
+        with open(os.path.join(directory, DATA_FILE), 'wb') as f:
+            f.truncate(chunk_days * len(names) * len(FIELDS) * 8)
+        store = cls(directory, mode="r+")
+        store.bind(builder_agents)
+        return store
+
+    @classmethod
+    def open(cls, directory, mode="r"):
+        return cls(directory, mode)
+
+    def bind(self, builder_agents):
+        """Match agent objects to their columns by name, e.g. after reopening a store to extend a run."""
+        self._columns = {id(agent): self._agent_index[agent.name] for agent in builder_agents}
+
+    def refresh(self):
+        """Map the file again, to see the days a writer added past the old capacity."""
+        path = os.path.join(self.directory, DATA_FILE)
+        row_bytes = len(self.agents) * len(FIELDS) * 8
+        capacity = os.path.getsize(path) // row_bytes
+        self.data = self.np.memmap(path, dtype=self.np.int64, mode=self.mode, shape=(capacity, len(self.agents), len(FIELDS)))
+
+    @property
+    def capacity(self):
+        return self.data.shape[0]
+
+    def _grow(self, rows):
+        # the day axis comes first, so growing only appends to the file and nothing moves
+        chunks = -(-rows // self.chunk_days)
+        self.data.flush()
+        with open(os.path.join(self.directory, DATA_FILE), 'r+b') as f:
+            f.truncate(chunks * self.chunk_days * len(self.agents) * len(FIELDS) * 8)
+        self.refresh()
+
+    def record_day(self, day, builder_agents):
+        """Write the end-of-day state of every agent into the row of `day`."""
+        row = day - self.first_day
+        if row < 0:
+            raise ValueError(f"day {day} is before the first day {self.first_day} of the history")
+        if row >= self.capacity:
+            self._grow(row + 1)
+        # one flat buffer in agent order, then a single copy into the mapped row
+        values = array('q')
+        order = []
+        columns = self._columns
+        for agent in builder_agents:
+            column = columns.get(id(agent))
+            if column is None:
+                raise KeyError(f"{agent.name} is not in the history, create() or bind() it first")
+            order.append(column)
+            values.extend(agent_row(agent, day))
+        rows = self.np.frombuffer(values, dtype=self.np.int64).reshape(len(order), len(FIELDS))
+        if order == list(range(len(self.agents))):
+            self.data[row] = rows
+        else:
+            self.data[row, order] = rows
+
+    def column(self, name):
+        """Column index of an agent."""
+        return self._agent_index[name]
+
+    def field(self, name):
+        """Index of a field on the last axis."""
+        return self._field_index[name]
+
+    def recorded_days(self):
+        """Number of rows from the first day on that hold a recorded day."""
+        recorded = self.np.flatnonzero(self.data[:, 0, 0])
+        return int(recorded[-1]) + 1 if len(recorded) else 0
+
+    def view(self, field=None, agents=slice(None), days=slice(None)):
+        """
+        Zero-copy view of the history.
+
+        :param field: field name (or list of names, which copies), None for all fields.
+        :param agents: column index, slice or index list (lists copy) of agents.
+        :param days: slice of days, in day numbers (slice(100, 200) is days 100..199), or one day.
+
+        Every index list selects along its own axis, so agents=[0, 3] with field=['money', 'genome']
+        gives both fields of both agents.
+        """
+        if isinstance(days, slice):
+            start = None if days.start is None else days.start - self.first_day
+            stop = None if days.stop is None else days.stop - self.first_day
+            rows = slice(start, stop, days.step)
+        else:
+            rows = days - self.first_day
+        if field is None:
+            fields = slice(None)
+        elif isinstance(field, str):
+            fields = self._field_index[field]
+        else:
+            fields = [self._field_index[name] for name in field]
+        # one axis at a time: several lists in one subscript would be paired up element by element
+        view = self.data
+        axis = 0
+        for selector in (rows, agents, fields):
+            view = view[(slice(None),) * axis + (selector,)]
+            if isinstance(selector, (slice, list, tuple, self.np.ndarray)):
+                axis += 1
+        return view
+
+    def flush(self):
+        if self.mode != "r":
+            self.data.flush()
+
+    def close(self):
+        self.flush()
+        self.data = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,142 @@
+"""
+House types.
+
+A house type is a design, part -> {material: units}, plus what a finished house sells for.
+All types share the same parts (floor, garret, hall), so a build order means the same for every
+builder; they differ in how much of each material a part takes and in the sell price.
+
+HouseCatalog compiles a list of types once into dense tables over a fixed material order:
+
+    requirements  types x parts x materials   units per part
+    totals        types x parts               units per part, what HouseProgress counts down
+    part_costs    types x parts               cost of a part at the catalog prices
+    costs         types                       cost of a whole house
+    sell_prices   types
+
+Builders pick their type with the roster's 'house_type' key (or SimulationConfig.house_mix);
+HouseProgress and sell_house take everything they need from the agent's HouseType, and the
+population engine turns the tables into NumPy arrays indexed by every agent's type.
+
+    catalog = HouseCatalog([STANDARD, COTTAGE], prices=MaterialAgent().prices)
+    catalog.costs, catalog.margins()
+"""
+
+
+class HouseType:
+    """
+    :param name: key of the type in a catalog and in rosters.
+    :param part_requirements: part -> {material: required units}; the dict order of a part's
+                              materials is the order builders request them in.
+    :param sell_price: money a finished house of this type brings in.
+    """
+
+    __slots__ = ('name', 'part_requirements', 'sell_price', 'parts', 'totals', 'empty_parts')
+
+    def __init__(self, name, part_requirements, sell_price):
+        self.name = name
+        self.part_requirements = part_requirements
+        self.sell_price = sell_price
+        self.parts = tuple(part_requirements)
+        self.totals = {part: sum(materials.values()) for part, materials in part_requirements.items()}
+        # what reset() copies into a house's part dicts
+        self.empty_parts = {part: dict.fromkeys(materials, 0) for part, materials in part_requirements.items()}
+
+    def to_dict(self):
+        return {'name': self.name, 'part_requirements': self.part_requirements, 'sell_price': self.sell_price}
+
+    @classmethod
+    def from_dict(cls, values):
+        return cls(values['name'], values['part_requirements'], values['sell_price'])
+
+    def __repr__(self):
+        return f"HouseType({self.name!r}, sell_price={self.sell_price})"
+
+    def __reduce__(self):
+        return (HouseType, (self.name, self.part_requirements, self.sell_price))
+
+
+STANDARD = HouseType('standard', {
+    'floor': {'windows': 11, 'doors': 7, 'wall_modules': 7, 'toilet_seats': 2, 'tabs': 2, 'shower_cabins': 2},
+    'garret': {'windows': 3, 'doors': 1, 'wall_modules': 1},
+    'hall': {'outside_doors': 1, 'windows': 1, 'wall_modules': 1},
+}, 900000)
+
+# a smaller design with about the same markup as the standard house: costs 515695 at the default prices, 14% under its price
+COTTAGE = HouseType('cottage', {
+    'floor': {'windows': 6, 'doors': 4, 'wall_modules': 4, 'toilet_seats': 1, 'tabs': 1, 'shower_cabins': 1},
+    'garret': {'windows': 2, 'doors': 1, 'wall_modules': 1},
+    'hall': {'outside_doors': 1, 'windows': 1, 'wall_modules': 1},
+}, 590000)
+
+HOUSE_TYPES = {house_type.name: house_type for house_type in (STANDARD, COTTAGE)}
+
+
+class HouseCatalog:
+    """
+    House types compiled into dense tables.
+
+    :param house_types: HouseType objects, the first one is the default type.
+    :param prices: material -> unit price; its order is the material order of the tables.
+    """
+
+    def __init__(self, house_types, prices):
+        house_types = list(house_types)
+        if not house_types:
+            raise ValueError("a house catalog needs at least one house type")
+        self.types = house_types
+        self.index = {house_type.name: position for position, house_type in enumerate(house_types)}
+        if len(self.index) != len(house_types):
+            raise ValueError("house type names must be unique")
+        self.parts = house_types[0].parts
+        self.materials = tuple(prices)
+        for house_type in house_types:
+            if set(house_type.parts) != set(self.parts):
+                raise ValueError(f"house type {house_type.name!r} has parts {house_type.parts}, expected {self.parts}")
+            unknown = {material for materials in house_type.part_requirements.values() for material in materials} - set(prices)
+            if unknown:
+                raise ValueError(f"house type {house_type.name!r} needs unpriced materials: {', '.join(sorted(unknown))}")
+
+        self.requirements = tuple(
+            tuple(tuple(house_type.part_requirements[part].get(material, 0) for material in self.materials)
+                  for part in self.parts)
+            for house_type in house_types)
+        self.totals = tuple(tuple(sum(row) for row in matrix) for matrix in self.requirements)
+        unit_prices = [prices[material] for material in self.materials]
+        self.part_costs = tuple(tuple(sum(units * price for units, price in zip(row, unit_prices)) for row in matrix)
+                                for matrix in self.requirements)
+        self.costs = tuple(sum(part_costs) for part_costs in self.part_costs)
+        self.sell_prices = tuple(house_type.sell_price for house_type in house_types)
+
+    def __getitem__(self, name):
+        return self.types[self.index[name]]
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def __iter__(self):
+        return iter(self.types)
+
+    def __len__(self):
+        return len(self.types)
+
+    def margins(self):
+        """Sell price minus material cost per type, by name."""
+        return {house_type.name: price - cost for house_type, price, cost in zip(self.types, self.sell_prices, self.costs)}
+
+
+def resolve(house_type, extra_types=None):
+    """
+    A HouseType from a HouseType, a type name, or None (the standard house).
+
+    :param extra_types: name -> HouseType, looked up before the built-in types.
+    """
+    if house_type is None:
+        return STANDARD
+    if isinstance(house_type, HouseType):
+        return house_type
+    if extra_types and house_type in extra_types:
+        return extra_types[house_type]
+    try:
+        return HOUSE_TYPES[house_type]
+    except KeyError:
+        raise ValueError(f"unknown house type {house_type!r}, expected one of {', '.join(HOUSE_TYPES)}") from None
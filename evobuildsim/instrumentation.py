@@ -0,0 +1,186 @@
+"""
+Per-phase timing and hot-path counters for the day loop.
+
+Pass an Instrumentation to main() to find out where a run spends its time:
+
+    instruments = Instrumentation(profile_days=range(20, 26))
+    main(50, instruments=instruments)
+    instruments.metrics()           # phase seconds and calls, per-agent counters, per-day rows
+    print(instruments.summary(30))  # one line for day 30
+    instruments.profile_stats().sort_stats('cumulative').print_stats(20)
+
+Phases are timed with time.perf_counter() around each block of the day loop. The per-agent
+counters (purchases, trades, parts completed) are bumped from the hot paths, guarded by the
+module flag the same way events are:
+
+    if instrumentation.enabled:
+        instrumentation.count_purchase(agent.name)
+
+Without instruments main() uses NULL_INSTRUMENTS, whose timers do nothing, and the flag stays
+False, so an uninstrumented run only pays a few no-op calls per day.
+"""
+import cProfile
+import pstats
+import time
+from collections import defaultdict
+
+from . import events
+
+
+PHASES = ('restock', 'trading_day', 'request_materials', 'idle_days', 'mutation_day', 'ga_day', 'day_summary',
+          'sort_agents', 'hooks', 'convergence', 'write_stats')
+COUNTERS = ('purchases', 'trades', 'parts_completed')
+
+enabled = False  # True while an Instrumentation is active, checked by the hot paths
+_active = None
+
+
+def count_purchase(agent_name):
+    _active.counters['purchases'][agent_name] += 1
+
+
+def count_part_completed(agent_name):
+    _active.counters['parts_completed'][agent_name] += 1
+
+
+class NullInstruments:
+    """Stand-in used by main() when nothing is measured; every method is a no-op."""
+
+    def activate(self):
+        pass
+
+    def deactivate(self):
+        pass
+
+    def begin_day(self, day):
+        pass
+
+    def end_day(self, day):
+        pass
+
+    def start(self):
+        return 0.0
+
+    def stop(self, phase, started, calls=1):
+        pass
+
+    def count_trades(self, ledger):
+        pass
+
+    def count_engine_day(self, population, builder_agents):
+        pass
+
+
+NULL_INSTRUMENTS = NullInstruments()
+
+
+class Instrumentation(NullInstruments):
+    """
+    Phase timers, call counters and per-agent counters for one or more runs of main().
+
+    :param profile_days: days (any container, e.g. range(10, 20)) to run under cProfile, None for none.
+    :param profile_path: write the collected profile to this file when the run ends.
+    :param summarize: emit the one-line summary of every day as an INFO trace event.
+    """
+
+    def __init__(self, profile_days=None, profile_path=None, summarize=False):
+        self.phase_seconds = dict.fromkeys(PHASES, 0.0)
+        self.phase_calls = dict.fromkeys(PHASES, 0)
+        self.counters = {counter: defaultdict(int) for counter in COUNTERS}
+        self.days = []  # one dict per day: day, seconds, per-phase seconds and counter totals
+        self.profile_days = profile_days
+        self.profile_path = profile_path
+        self.summarize = summarize
+        self.profiler = None
+        self._previous = None
+        self._day_started = 0.0
+        self._day_phases = None
+        self._day_counts = None
+
+    def activate(self):
+        global enabled, _active
+        self._previous = (enabled, _active)
+        enabled, _active = True, self
+
+    def deactivate(self):
+        global enabled, _active
+        if self.profiler is not None:
+            self.profiler.disable()
+            if self.profile_path:
+                self.profiler.dump_stats(self.profile_path)
+        enabled, _active = self._previous
+
+    def begin_day(self, day):
+        self._day_phases = dict.fromkeys(PHASES, 0.0)
+        self._day_counts = self._totals()
+        if self.profile_days is not None and day in self.profile_days:
+            if self.profiler is None:
+                self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        self._day_started = time.perf_counter()
+
+    def end_day(self, day):
+        seconds = time.perf_counter() - self._day_started
+        if self.profiler is not None:
+            self.profiler.disable()
+        totals = self._totals()
+        row = {'day': day, 'seconds': seconds}
+        row.update(self._day_phases)
+        row.update({counter: totals[counter] - self._day_counts[counter] for counter in COUNTERS})
+        self.days.append(row)
+        if self.summarize and events.info_enabled:
+            events.trace(events.INFO, self.summary(day))
+
+    def start(self):
+        return time.perf_counter()
+
+    def stop(self, phase, started, calls=1):
+        seconds = time.perf_counter() - started
+        self.phase_seconds[phase] += seconds
+        self.phase_calls[phase] += calls
+        if self._day_phases is not None:
+            self._day_phases[phase] += seconds
+
+    def count_trades(self, ledger):
+        trades = self.counters['trades']
+        for trade in ledger:
+            trades[trade.buyer] += 1
+            trades[trade.seller] += 1
+
+    def count_engine_day(self, population, builder_agents):
+        """Per-agent counters for a request day run on the population engine."""
+        purchases, parts = self.counters['purchases'], self.counters['parts_completed']
+        for agent, bought, completed in zip(builder_agents, population.last_purchases.tolist(),
+                                            population.last_parts_completed.tolist()):
+            if bought:
+                purchases[agent.name] += bought
+            if completed:
+                parts[agent.name] += 1
+
+    def _totals(self):
+        return {counter: sum(values.values()) for counter, values in self.counters.items()}
+
+    def summary(self, day):
+        """One line with the time per phase and the counter totals of a day."""
+        for row in self.days:
+            if row['day'] == day:
+                phases = " ".join(f"{phase} {row[phase] * 1000:.2f}" for phase in PHASES if row[phase])
+                return (f"day {day}: {row['seconds'] * 1000:.2f}ms [{phases}] "
+                        f"purchases {row['purchases']} trades {row['trades']} parts {row['parts_completed']}")
+        raise KeyError(f"day {day} was not instrumented")
+
+    def summaries(self):
+        return [self.summary(row['day']) for row in self.days]
+
+    def metrics(self):
+        """Everything measured so far as plain Python data."""
+        return {
+            'phases': {phase: {'seconds': self.phase_seconds[phase], 'calls': self.phase_calls[phase]} for phase in PHASES},
+            'agents': {counter: dict(values) for counter, values in self.counters.items()},
+            'totals': self._totals(),
+            'days': list(self.days),
+        }
+
+    def profile_stats(self):
+        """pstats.Stats of the profiled days, None when no day was profiled."""
+        return pstats.Stats(self.profiler) if self.profiler is not None else None
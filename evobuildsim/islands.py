@@ -0,0 +1,263 @@
+"""
+Island-model GA: several independent populations that swap their best genomes now and then.
+
+Every island is a whole world of its own, a MaterialAgent with its builders and its own random
+stream, running the normal day loop (with its own restock, mutation and GA cadence) in its own
+process. Every migrate_every days the islands stop, each sends the genomes of its `migrants`
+fittest builders to its neighbours in the topology, and the immigrants replace the genomes of
+the receiving island's least fit builders (money, houses and construction stay with the builder,
+like crossover swaps only genomes). An island's fittest builder never takes an immigrant, and
+max_immigrants caps the genomes it takes per migration; the best arrivals go first. Topologies:
+
+    ring    island i sends to island i + 1
+    full    every island sends to every other island
+    random  every island sends to one other island, drawn anew at every migration
+
+Island i draws from a stream seeded with (seed, i) and the random topology from one seeded with
+the run seed, so a run only depends on the seed and the island configs; processes=False runs
+the islands in turn in this process with the same results.
+
+    result = run_islands(make_islands(SimulationConfig(days=300), islands=4), seed=7, topology="ring")
+
+Usage:
+    evobuildsim islands --islands 4 --days 300 --migrate-every 15 --migrants 2 --topology ring --seed 7
+"""
+import argparse
+import json
+import multiprocessing
+import random
+import statistics
+import sys
+import traceback
+
+from . import events
+from .config import SimulationConfig
+from .regions import Region, _collect, exchange_days
+from .selection import fitness
+
+
+TOPOLOGIES = ('ring', 'full', 'random')
+
+
+def make_islands(config=None, islands=4):
+    """`islands` copies of a config, one per island; give them different settings to mix cadences."""
+    config = config or SimulationConfig()
+    return [config.replace() for _ in range(islands)]
+
+
+def migration_routes(islands, topology, rng=None):
+    """
+    Where every island sends its emigrants at one migration.
+
+    :param rng: random.Random for the "random" topology.
+    :return: list of (source, destination) pairs, in source order.
+    """
+    if islands < 2:
+        return []
+    if topology == 'ring':
+        return [(source, (source + 1) % islands) for source in range(islands)]
+    if topology == 'full':
+        return [(source, destination) for source in range(islands) for destination in range(islands)
+                if destination != source]
+    if topology == 'random':
+        routes = []
+        for source in range(islands):
+            destination = rng.randrange(islands - 1)
+            routes.append((source, destination + (destination >= source)))
+        return routes
+    raise ValueError(f"unknown topology {topology!r}, expected one of {', '.join(TOPOLOGIES)}")
+
+
+class Island(Region):
+    """
+    One population with its own market, stepping through the days with main().
+
+    :param max_immigrants: most arriving genomes taken per migration, None for all but the fittest builder.
+    """
+
+    def __init__(self, index, config, seed, max_immigrants=None):
+        super().__init__(index, config, seed)
+        self.max_immigrants = max_immigrants
+        self.immigrants = 0
+
+    def emigrants(self, count):
+        """Genomes of the `count` fittest builders, best first, with their fitness."""
+        best = sorted(self.agents, key=fitness, reverse=True)[:count]
+        return [(agent.genome(), fitness(agent)) for agent in best]
+
+    def immigrate(self, arrivals):
+        """
+        Give the arriving genomes to the least fit builders, the best arrival to the worst builder.
+        The fittest builder keeps its genome, so at most len(agents) - 1 (and max_immigrants) arrive.
+
+        :return: number of genomes placed.
+        """
+        places = len(self.agents) - 1
+        if self.max_immigrants is not None:
+            places = min(places, self.max_immigrants)
+        arrivals = sorted(arrivals, key=lambda arrival: arrival[1], reverse=True)[:max(places, 0)]
+        worst = sorted(self.agents, key=fitness)
+        for agent, (genome, _) in zip(worst, arrivals):
+            agent.set_genome(genome)
+        self.immigrants += len(arrivals)
+        return len(arrivals)
+
+    def result(self):
+        result = super().result()
+        result['island'] = result.pop('region')
+        result['summary'] = island_summary(result['agents'])
+        result['immigrants'] = self.immigrants
+        return result
+
+
+def island_summary(agent_stats):
+    scores = [agent['fitness'] for agent in agent_stats]
+    best = max(agent_stats, key=lambda agent: agent['fitness'])
+    return {
+        'houses': sum(agent['houses_built'] for agent in agent_stats),
+        'best_fitness': best['fitness'],
+        'mean_fitness': statistics.fmean(scores),
+        'best_genome': _genome_of(best),
+        'genotypes': len({tuple(_genome_of(agent)) for agent in agent_stats}),
+    }
+
+
+def _genome_of(agent):
+    return [', '.join(agent['build_order']), agent['priority_houses'], agent['buyprice'], agent['sellprice']]
+
+
+def _route(emigrants, routes, islands):
+    arrivals = [[] for _ in range(islands)]
+    for source, destination in routes:
+        arrivals[destination].extend(emigrants[source])
+    return arrivals
+
+
+def _island_worker(index, config, seed, days, every, migrants, max_immigrants, inbox, outbox):
+    try:
+        events.silence()
+        island = Island(index, config, seed, max_immigrants)
+        for day in exchange_days(days, every):
+            island.run_until(day)
+            outbox.put((index, 'emigrants', island.emigrants(migrants)))
+            island.immigrate(inbox.get())
+        island.run_until(days)
+        outbox.put((index, 'result', island.result()))
+    except BaseException:
+        outbox.put((index, 'error', traceback.format_exc()))
+
+
+def _run_in_process(configs, seed, days, every, migrants, max_immigrants, topology, migrations):
+    islands = [Island(index, config, seed, max_immigrants) for index, config in enumerate(configs)]
+    rng = random.Random(f"{seed}/migration")
+    for day in exchange_days(days, every):
+        for island in islands:
+            island.run_until(day)
+        routes = migration_routes(len(islands), topology, rng)
+        migrations.append((day, routes))
+        for island, arrivals in zip(islands, _route([island.emigrants(migrants) for island in islands], routes, len(islands))):
+            island.immigrate(arrivals)
+    for island in islands:
+        island.run_until(days)
+    return [island.result() for island in islands]
+
+
+def _run_in_workers(configs, seed, days, every, migrants, max_immigrants, topology, migrations):
+    outbox = multiprocessing.Queue()
+    inboxes = [multiprocessing.Queue() for _ in configs]
+    workers = [
+        multiprocessing.Process(target=_island_worker, name=f"island-{index}",
+                                args=(index, config, seed, days, every, migrants, max_immigrants,
+                                      inboxes[index], outbox))
+        for index, config in enumerate(configs)
+    ]
+    for worker in workers:
+        worker.start()
+    rng = random.Random(f"{seed}/migration")
+    try:
+        for day in exchange_days(days, every):
+            emigrants = _collect(outbox, workers, 'emigrants')
+            routes = migration_routes(len(configs), topology, rng)
+            migrations.append((day, routes))
+            for inbox, arrivals in zip(inboxes, _route(emigrants, routes, len(configs))):
+                inbox.put(arrivals)
+        return _collect(outbox, workers, 'result')
+    finally:
+        for worker in workers:
+            worker.join(timeout=5)
+            if worker.is_alive():
+                worker.terminate()
+
+
+def run_islands(configs, seed=0, days=None, migrate_every=None, migrants=1, topology="ring", processes=True,
+                max_immigrants=None):
+    """
+    Run an island-model GA.
+
+    :param configs: one SimulationConfig per island, e.g. from make_islands().
+    :param seed: seed of the run; island i draws from a stream seeded with (seed, i).
+    :param days: days to simulate, configs[0].days by default.
+    :param migrate_every: migration every this many days, configs[0].ga_every by default.
+    :param migrants: genomes every island sends per migration.
+    :param topology: "ring", "full" or "random".
+    :param processes: run every island in its own process; False runs them in turn in this process.
+    :param max_immigrants: most genomes an island takes per migration, None for all but its fittest builder.
+    :return: dict with the final stats and a summary per island, and global stats; migrants_moved
+             counts the genomes placed, not the ones sent.
+    """
+    if topology not in TOPOLOGIES:
+        raise ValueError(f"unknown topology {topology!r}, expected one of {', '.join(TOPOLOGIES)}")
+    days = configs[0].days if days is None else days
+    every = configs[0].ga_every if migrate_every is None else migrate_every
+    migrations = []
+    previous = events.silence()
+    try:
+        run = _run_in_workers if processes else _run_in_process
+        results = run(configs, seed, days, every, migrants, max_immigrants, topology, migrations)
+    finally:
+        events.configure(*previous)
+    every_agent = [agent for island in results for agent in island['agents']]
+    return {
+        'seed': seed,
+        'topology': topology,
+        'islands': results,
+        'migrations': len(migrations),
+        'migrants_moved': sum(island['immigrants'] for island in results),
+        'global': island_summary(every_agent),
+    }
+
+
+def cli(argv=None):
+    parser = argparse.ArgumentParser(prog="evobuildsim islands", description="Run an island-model GA with migration.")
+    parser.add_argument('--islands', type=int, default=4)
+    parser.add_argument('--days', type=int, default=150)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--engine', choices=['object', 'array'], default='object')
+    parser.add_argument('--migrate-every', type=int, default=None, help="days between migrations (default: ga_every)")
+    parser.add_argument('--migrants', type=int, default=1, help="genomes every island sends per migration")
+    parser.add_argument('--max-immigrants', type=int, default=None,
+                        help="most genomes an island takes per migration (default: all but its fittest builder)")
+    parser.add_argument('--topology', choices=TOPOLOGIES, default='ring')
+    parser.add_argument('--in-process', action='store_true', help="run the islands in turn in this process")
+    parser.add_argument('--out', default=None)
+    args = parser.parse_args(argv)
+
+    configs = make_islands(SimulationConfig(days=args.days, engine=args.engine), args.islands)
+    result = run_islands(configs, args.seed, migrate_every=args.migrate_every, migrants=args.migrants,
+                         topology=args.topology, processes=not args.in_process,
+                         max_immigrants=args.max_immigrants)
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(result, f, indent=2)
+    for island in result['islands']:
+        summary = island['summary']
+        print(f"island {island['island']}: {summary['houses']} houses, best {summary['best_fitness']:.4f}, "
+              f"mean {summary['mean_fitness']:.4f}, {summary['genotypes']} genotypes", file=sys.stderr)
+    summary = result['global']
+    print(f"all islands: {summary['houses']} houses, best {summary['best_fitness']:.4f} ({summary['best_genome']}), "
+          f"{summary['genotypes']} genotypes, {result['migrants_moved']} migrants in {result['migrations']} migrations",
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    cli()
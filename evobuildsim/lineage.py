@@ -0,0 +1,412 @@
+"""
+Genealogy of the builders' strategies.
+
+perform_crossover swaps genes between agents in place and perform_mutation overwrites them, so
+the agents themselves don't remember where their strategy came from. LineageStore gives every
+strategy an id and records every event that makes a new one as a fixed-width record:
+
+    generation  day of the event (mutation and GA days are the generations), founders get the day before the run
+    parent_a    id of the strategy the agent had before, -1 for founders
+    parent_b    id of the partner's strategy in a crossover, -1 otherwise
+    agent       column of the agent that carries the new strategy (its position in store.agents)
+    genome      packed genome of the new strategy (genome.encode)
+    kind        FOUNDER, MUTATION, CROSSOVER or SCREENED (the surrogate put the parent genome back)
+    changed     bit mask of the genes that differ from parent_a, bit i for GENES[i]
+    fitness     fitness of the agent when its strategy changed
+
+The child id is the position of the record, so parents always come before their children.
+Records are held in one array per field (28 bytes per record) and appended to records.bin next
+to a small JSON schema on flush(), like the history store; nothing is rewritten once written.
+
+    with LineageStore.create("lineage", agents) as lineage:
+        main(300, material_agent, agents, lineage=lineage)
+
+    lineage = LineageStore.open("lineage")
+    strategy = lineage.current("Florida Man")
+    lineage.ancestors(strategy), lineage.descendants(0), lineage.record(strategy)
+    lineage.export_trait_frequencies("traits.csv")     # share of every gene value after every generation
+
+    evobuildsim run --days 300 --lineage lineage
+    evobuildsim lineage ancestors lineage --agent "Florida Man"
+    evobuildsim lineage traits lineage --csv traits.csv
+"""
+import argparse
+import csv
+import json
+import os
+import struct
+from array import array
+from collections import deque
+
+from .genome import BUILD_ORDERS, PRICES, decode, encode
+from .selection import fitness
+
+
+GENES = ('build_order', 'priority_houses', 'buyprice', 'sellprice')
+FOUNDER, MUTATION, CROSSOVER, SCREENED = range(4)
+KINDS = ('founder', 'mutation', 'crossover', 'screened')
+FIELDS = ('generation', 'parent_a', 'parent_b', 'agent', 'genome', 'kind', 'changed', 'fitness')
+RECORD = struct.Struct("<IiiIHBBd")
+TYPECODES = ('I', 'i', 'i', 'I', 'H', 'B', 'B', 'd')
+RECORDS_FILE = "records.bin"
+SCHEMA_FILE = "schema.json"
+
+
+def changed_genes(old, new):
+    """Bit mask of the genes two (build_order, priority_houses, buyprice, sellprice) genomes differ in."""
+    mask = 0
+    for bit, (old_gene, new_gene) in enumerate(zip(old, new)):
+        if old_gene != new_gene:
+            mask |= 1 << bit
+    return mask
+
+
+def gene_names(mask):
+    return tuple(gene for bit, gene in enumerate(GENES) if mask & (1 << bit))
+
+
+class LineageStore:
+    """
+    Use create() to start a store for a roster and open() to read (or extend) an existing one.
+
+    :param directory: directory with the records and their schema, None to keep the records in memory only.
+    :param flush_every: append the new records to the file once this many have piled up.
+    """
+
+    def __init__(self, directory=None, flush_every=65536):
+        self.directory = directory
+        self.flush_every = flush_every
+        self.agents = []
+        self.columns = {field: array(typecode) for field, typecode in zip(FIELDS, TYPECODES)}
+        self._flushed = 0
+        self._slots = {}      # id(agent) -> column
+        self._genomes = {}    # id(agent) -> genome tuple of its current strategy
+        self._current = []    # column -> id of the agent's current strategy
+        self._children = None
+        if directory is not None and os.path.exists(os.path.join(directory, SCHEMA_FILE)):
+            self._read()
+
+    @classmethod
+    def create(cls, directory, builder_agents, generation=0, flush_every=65536):
+        """
+        Start an empty store and record the agents' strategies as founders.
+
+        :param directory: None for a store in memory only.
+        :param generation: generation of the founders, e.g. the day of a restored snapshot.
+        """
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+            for name in (RECORDS_FILE, SCHEMA_FILE):
+                path = os.path.join(directory, name)
+                if os.path.exists(path):
+                    os.remove(path)
+        store = cls(directory, flush_every)
+        for agent in builder_agents:
+            store._slot(agent, generation)
+        store.flush()
+        return store
+
+    @classmethod
+    def open(cls, directory):
+        return cls(directory)
+
+    def _read(self):
+        with open(os.path.join(self.directory, SCHEMA_FILE)) as f:
+            schema = json.load(f)
+        if tuple(schema['fields']) != FIELDS or schema['record'] != RECORD.format:
+            raise ValueError(f"{self.directory} was written with another record layout")
+        self.agents = schema['agents']
+        with open(os.path.join(self.directory, RECORDS_FILE), 'rb') as f:
+            data = f.read()
+        data = data[:len(data) - len(data) % RECORD.size]  # a record cut short by a crash is dropped
+        appenders = [self.columns[field].append for field in FIELDS]
+        for record in RECORD.iter_unpack(data):
+            for append, value in zip(appenders, record):
+                append(value)
+        self._flushed = len(self)
+        self._current = [-1] * len(self.agents)
+        for strategy, column in enumerate(self.columns['agent']):
+            self._current[column] = strategy
+
+    def bind(self, builder_agents):
+        """Match agent objects to their columns by name, e.g. after reopening a store to extend a run."""
+        index = {name: column for column, name in enumerate(self.agents)}
+        for agent in builder_agents:
+            column = index[agent.name]
+            self._slots[id(agent)] = column
+            self._genomes[id(agent)] = decode(self.columns['genome'][self._current[column]])
+
+    def __len__(self):
+        return len(self.columns['generation'])
+
+    def _append(self, generation, parent_a, parent_b, column, genome, kind, changed, agent_fitness):
+        columns = self.columns
+        strategy = len(self)
+        columns['generation'].append(generation)
+        columns['parent_a'].append(parent_a)
+        columns['parent_b'].append(parent_b)
+        columns['agent'].append(column)
+        columns['genome'].append(encode(genome))
+        columns['kind'].append(kind)
+        columns['changed'].append(changed)
+        columns['fitness'].append(agent_fitness)
+        self._current[column] = strategy
+        self._children = None
+        if strategy + 1 - self._flushed >= self.flush_every:
+            self.flush()
+        return strategy
+
+    def _slot(self, agent, generation):
+        # the agent's column, new agents join as founders
+        column = self._slots.get(id(agent))
+        if column is None:
+            column = self._slots[id(agent)] = len(self.agents)
+            self.agents.append(agent.name)
+            self._current.append(-1)
+            genome = self._genomes[id(agent)] = agent.genome()
+            self._append(generation, -1, -1, column, genome, FOUNDER, 0, fitness(agent))
+        return column
+
+    # recording, called by main()
+
+    def record_changes(self, day, builder_agents, screened=False):
+        """
+        Give every agent whose genome changed since its last record a new strategy, e.g. after perform_mutation.
+
+        :param screened: the changes are the surrogate putting parent genomes back, not mutations.
+        """
+        genomes = self._genomes
+        kind = SCREENED if screened else MUTATION
+        for agent in builder_agents:
+            column = self._slot(agent, day)
+            genome = agent.genome()
+            old = genomes[id(agent)]
+            if genome != old:
+                genomes[id(agent)] = genome
+                self._append(day, self._current[column], -1, column, genome, kind, changed_genes(old, genome), fitness(agent))
+
+    def record_crossover(self, day, selected_agents):
+        """
+        Record the crossover of one batch of selected parents, right after perform_crossover swapped their genes.
+
+        The records are made from the genomes after the whole batch, so an agent may only be in one pair
+        of it; main() crosses over and records the selected parents one pair at a time.
+        """
+        seen = set()
+        for first in range(0, len(selected_agents) - 1, 2):
+            pair = {id(agent): agent for agent in selected_agents[first:first + 2]}
+            repeated = seen.intersection(pair)
+            if repeated:
+                raise ValueError(f"{pair[repeated.pop()].name} is in two pairs of one crossover batch, "
+                                 f"record every pair on its own")
+            seen.update(pair)
+        for first in range(0, len(selected_agents) - 1, 2):
+            agent_a, agent_b = selected_agents[first], selected_agents[first + 1]
+            column_a, column_b = self._slot(agent_a, day), self._slot(agent_b, day)
+            parent_a, parent_b = self._current[column_a], self._current[column_b]
+            pair = ((agent_a, column_a, parent_a, parent_b),) if agent_a is agent_b else \
+                ((agent_a, column_a, parent_a, parent_b), (agent_b, column_b, parent_b, parent_a))
+            for agent, column, own, partner in pair:
+                genome = agent.genome()
+                changed = changed_genes(self._genomes[id(agent)], genome)
+                self._genomes[id(agent)] = genome
+                self._append(day, own, partner, column, genome, CROSSOVER, changed, fitness(agent))
+
+    def flush(self):
+        """Append the records added since the last flush to the file."""
+        if self.directory is None:
+            return
+        if self._flushed < len(self):
+            pack = RECORD.pack
+            rows = zip(*(column[self._flushed:] for column in (self.columns[field] for field in FIELDS)))
+            with open(os.path.join(self.directory, RECORDS_FILE), 'ab') as f:
+                f.write(b''.join(pack(*row) for row in rows))
+            self._flushed = len(self)
+        schema = {'fields': list(FIELDS), 'record': RECORD.format, 'agents': self.agents}
+        with open(os.path.join(self.directory, SCHEMA_FILE), 'w') as f:
+            json.dump(schema, f)
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # queries
+
+    def current(self, agent_name):
+        """Id of the strategy an agent has now."""
+        return self._current[self.agents.index(agent_name)]
+
+    def record(self, strategy):
+        """One record as a dict, with the genome decoded and the kind and changed genes by name."""
+        values = {field: self.columns[field][strategy] for field in FIELDS}
+        values['id'] = strategy
+        values['agent'] = self.agents[values['agent']]
+        values['genome'] = decode(values['genome'])
+        values['kind'] = KINDS[values['kind']]
+        values['changed'] = gene_names(values['changed'])
+        return values
+
+    def ancestors(self, strategy, generations=None):
+        """
+        Ids of every strategy `strategy` descends from, through both parents, nearest first.
+
+        :param generations: only go this many records back.
+        """
+        parent_a, parent_b = self.columns['parent_a'], self.columns['parent_b']
+        seen, found = {strategy}, []
+        queue = deque([(strategy, 0)])
+        while queue:
+            current, depth = queue.popleft()
+            if generations is not None and depth >= generations:
+                continue
+            for parent in (parent_a[current], parent_b[current]):
+                if parent >= 0 and parent not in seen:
+                    seen.add(parent)
+                    found.append(parent)
+                    queue.append((parent, depth + 1))
+        return found
+
+    def line(self, strategy):
+        """The chain of strategies an agent slot went through to `strategy`, following parent_a back to a founder."""
+        parent_a = self.columns['parent_a']
+        chain = [strategy]
+        while parent_a[chain[-1]] >= 0:
+            chain.append(parent_a[chain[-1]])
+        return chain[::-1]
+
+    def _child_index(self):
+        # children of every strategy in compressed rows: children[offsets[i]:offsets[i + 1]]
+        if self._children is None:
+            n = len(self)
+            parent_a, parent_b = self.columns['parent_a'], self.columns['parent_b']
+            # a pair that crossed over with itself has the same parent twice, it's one child
+            second = array('i', (b if b != a else -1 for a, b in zip(parent_a, parent_b)))
+            offsets = array('I', bytes(4 * (n + 1)))
+            for parents in (parent_a, second):
+                for parent in parents:
+                    if parent >= 0:
+                        offsets[parent + 1] += 1
+            total = 0
+            for position in range(1, n + 1):
+                total += offsets[position]
+                offsets[position] = total
+            fill = array('I', offsets)
+            children = array('I', bytes(4 * total))
+            for parents in (parent_a, second):
+                for child, parent in enumerate(parents):
+                    if parent >= 0:
+                        children[fill[parent]] = child
+                        fill[parent] += 1
+            self._children = (offsets, children)
+        return self._children
+
+    def children(self, strategy):
+        offsets, children = self._child_index()
+        return list(children[offsets[strategy]:offsets[strategy + 1]])
+
+    def descendants(self, strategy, generations=None):
+        """Ids of every strategy with `strategy` among its ancestors, nearest first."""
+        offsets, children = self._child_index()
+        seen, found = {strategy}, []
+        queue = deque([(strategy, 0)])
+        while queue:
+            current, depth = queue.popleft()
+            if generations is not None and depth >= generations:
+                continue
+            for child in children[offsets[current]:offsets[current + 1]]:
+                if child not in seen:
+                    seen.add(child)
+                    found.append(child)
+                    queue.append((child, depth + 1))
+        return found
+
+    def trait_frequencies(self):
+        """
+        How many agents carry every gene value after every generation.
+
+        :return: rows (generation, gene, value, count, share); build orders read like 'floor>garret>hall'.
+        """
+        # one counter per (gene, value), in this order
+        labels = ([('build_order', '>'.join(order)) for order in BUILD_ORDERS] + [('priority_houses', 1), ('priority_houses', 2)]
+                  + [('buyprice', price) for price in range(1, PRICES + 1)] + [('sellprice', price) for price in range(1, PRICES + 1)])
+        offsets = (0, len(BUILD_ORDERS), len(BUILD_ORDERS) + 2, len(BUILD_ORDERS) + 2 + PRICES)
+        order_index = {order: index for index, order in enumerate(BUILD_ORDERS)}
+        decoded = {}  # code -> its counters, there are only 768 genomes
+
+        def counters(code):
+            if code not in decoded:
+                build_order, priority_houses, buyprice, sellprice = decode(code)
+                decoded[code] = (offsets[0] + order_index[build_order], offsets[1] + priority_houses - 1,
+                                 offsets[2] + buyprice - 1, offsets[3] + sellprice - 1)
+            return decoded[code]
+
+        counts = [0] * len(labels)
+        carried = {}  # column -> code of the agent's strategy
+        rows = []
+        generations, agents, genomes = self.columns['generation'], self.columns['agent'], self.columns['genome']
+        last = len(self) - 1
+        for position, (column, code) in enumerate(zip(agents, genomes)):
+            old = carried.get(column)
+            if old != code:
+                for counter in counters(code):
+                    counts[counter] += 1
+                if old is not None:
+                    for counter in counters(old):
+                        counts[counter] -= 1
+                carried[column] = code
+            if position == last or generations[position + 1] != generations[position]:
+                generation, population = generations[position], len(carried)
+                rows.extend((generation, gene, value, count, count / population) for (gene, value), count in zip(labels, counts))
+        return rows
+
+    def export_trait_frequencies(self, path):
+        """Write trait_frequencies() to a CSV file."""
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(('generation', 'gene', 'value', 'count', 'share'))
+            writer.writerows(self.trait_frequencies())
+
+
+def _print_records(lineage, strategies):
+    for strategy in strategies:
+        record = lineage.record(strategy)
+        build_order, priority_houses, buyprice, sellprice = record['genome']
+        parents = ', '.join(str(parent) for parent in (record['parent_a'], record['parent_b']) if parent >= 0) or '-'
+        print(f"{strategy:>8} day {record['generation']:>5} {record['kind']:<9} {record['agent']:<24} "
+              f"parents {parents:<14} {'>'.join(build_order)} x{priority_houses} buy {buyprice} sell {sellprice} "
+              f"changed {','.join(record['changed']) or '-'} fitness {record['fitness']:.4f}")
+
+
+def cli(argv=None):
+    parser = argparse.ArgumentParser(prog="evobuildsim lineage", description="Query a lineage store written by evobuildsim run --lineage.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    for name, help_text in (('ancestors', "the strategies a strategy descends from"),
+                            ('descendants', "the strategies that descend from a strategy")):
+        query = commands.add_parser(name, help=help_text)
+        query.add_argument('directory')
+        target = query.add_mutually_exclusive_group(required=True)
+        target.add_argument('--agent', help="start from the strategy this agent has now")
+        target.add_argument('--id', type=int, help="start from this strategy id")
+        query.add_argument('--generations', type=int, default=None, help="only go this many records deep")
+    traits = commands.add_parser('traits', help="share of every gene value after every generation")
+    traits.add_argument('directory')
+    traits.add_argument('--csv', default='trait_frequencies.csv')
+    args = parser.parse_args(argv)
+
+    lineage = LineageStore.open(args.directory)
+    if args.command == 'traits':
+        lineage.export_trait_frequencies(args.csv)
+        print(f"trait frequencies over {len(lineage)} records written to {args.csv}")
+        return
+    strategy = lineage.current(args.agent) if args.agent is not None else args.id
+    found = getattr(lineage, args.command)(strategy, args.generations)
+    _print_records(lineage, [strategy] + sorted(found))
+
+
+if __name__ == "__main__":
+    cli()
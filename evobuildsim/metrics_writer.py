@@ -0,0 +1,204 @@
+"""
+Append-only, columnar per-day metrics.
+
+write_stats_to_excel reads the whole agent_stats.xlsx back, appends and rewrites it on every
+run, and it only ever sees the last day. MetricsWriter instead records one row per agent per
+day and streams them to a new Arrow IPC (or Parquet) file per run inside a metrics directory.
+Rows are collected into batches and written on a background thread, so the day loop never
+waits for the disk, and nothing that was written before is ever read back or rewritten.
+
+Excel/CSV stay available as an explicit conversion step after the run:
+
+    evobuildsim metrics export metrics --csv agent_stats_daily.csv --excel agent_stats_daily.xlsx
+"""
+import argparse
+import os
+import queue
+import threading
+import time
+import uuid
+
+
+COLUMNS = [
+    ('run_id', 'string'),
+    ('day', 'int32'),
+    ('agent', 'string'),
+    ('priority_houses', 'int8'),
+    ('build_order', 'string'),
+    ('buyprice', 'int8'),
+    ('sellprice', 'int8'),
+    ('money', 'int64'),
+    ('houses_built', 'int32'),
+    ('excess_total', 'int32'),
+    ('fitness', 'float64'),
+]
+
+FORMATS = {'arrow': '.arrows', 'parquet': '.parquet'}
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+    except ImportError as error:
+        raise ImportError("the metrics writer needs pyarrow: pip install pyarrow") from error
+    return pyarrow
+
+
+def _schema(pa):
+    return pa.schema([(name, getattr(pa, type_name)()) for name, type_name in COLUMNS])
+
+
+class MetricsWriter:
+    """
+    Streams per-agent, per-day rows into <directory>/metrics-<run_id>.<ext>.
+
+    Use it as a context manager (or call close()) so the last batch is written:
+
+        with MetricsWriter("metrics") as metrics:
+            main(days_to_simulate, metrics=metrics)
+
+    :param directory: metrics directory, created if needed. Every run adds one file to it.
+    :param format: "arrow" for an Arrow IPC stream, "parquet" for Parquet row groups.
+    :param batch_rows: rows collected before a batch is handed to the writer thread.
+    :param run_id: identifier stored with every row, a random one by default.
+    """
+
+    def __init__(self, directory="metrics", format="arrow", batch_rows=65536, run_id=None):
+        if format not in FORMATS:
+            raise ValueError(f"unknown metrics format {format!r}, expected one of {sorted(FORMATS)}")
+        self.pa = _require_pyarrow()
+        os.makedirs(directory, exist_ok=True)
+        self.run_id = run_id or time.strftime("%Y%m%d-%H%M%S-") + uuid.uuid4().hex[:8]
+        self.path = os.path.join(directory, f"metrics-{self.run_id}{FORMATS[format]}")
+        self.format = format
+        self.batch_rows = batch_rows
+        self.schema = _schema(self.pa)
+        self._columns = {name: [] for name, _ in COLUMNS}
+        self._rows = 0
+        self._queue = queue.Queue(maxsize=8)
+        self._error = None
+        self._thread = threading.Thread(target=self._write_loop, name="metrics-writer", daemon=True)
+        self._thread.start()
+
+    def record_day(self, day, builder_agents):
+        """Add one row per agent for the given day. Only appends to in-memory column lists."""
+        columns = self._columns
+        for agent in builder_agents:
+            columns['run_id'].append(self.run_id)
+            columns['day'].append(day)
+            columns['agent'].append(agent.name)
+            columns['priority_houses'].append(agent.priority_houses)
+            columns['build_order'].append(', '.join(agent.build_order))
+            columns['buyprice'].append(agent.buyprice)
+            columns['sellprice'].append(agent.sellprice)
+            columns['money'].append(agent.money)
+            columns['houses_built'].append(agent.houses_built)
+            columns['excess_total'].append(sum(agent.excess_materials.values()))
+            columns['fitness'].append(agent.houses_built + (agent.money / 1000000))
+        self._rows += len(builder_agents)
+        if self._rows >= self.batch_rows:
+            self.flush()
+
+    def flush(self):
+        """Hand the collected rows to the writer thread."""
+        if self._error is not None:
+            raise self._error
+        if self._rows:
+            self._queue.put(self._columns)
+            self._columns = {name: [] for name, _ in COLUMNS}
+            self._rows = 0
+
+    def close(self):
+        """Write the remaining rows, wait for the writer thread and close the file."""
+        try:
+            self.flush()
+        finally:
+            # stop the thread even when it failed, it drains the queue until it sees None
+            self._queue.put(None)
+            self._thread.join()
+        if self._error is not None:
+            raise self._error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _write_loop(self):
+        pa = self.pa
+        writer = None
+        try:
+            if self.format == 'parquet':
+                import pyarrow.parquet as pq
+                writer = pq.ParquetWriter(self.path, self.schema)
+            else:
+                writer = pa.ipc.new_stream(pa.OSFile(self.path, 'wb'), self.schema)
+            while True:
+                columns = self._queue.get()
+                if columns is None:
+                    break
+                batch = pa.record_batch([pa.array(columns[name], type=field.type) for name, field in
+                                         zip(columns, self.schema)], schema=self.schema)
+                writer.write_batch(batch)  # a record batch, or one row group for parquet
+        except Exception as error:  # surfaced to the simulation on the next flush/close
+            self._error = error
+            # keep draining so the day loop never blocks on a full queue
+            while self._queue.get() is not None:
+                pass
+        finally:
+            if writer is not None:
+                writer.close()
+
+
+def read_metrics(directory="metrics"):
+    """Read every metrics file in the directory into one pyarrow Table."""
+    pa = _require_pyarrow()
+    tables = []
+    for file_name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, file_name)
+        if file_name.endswith(FORMATS['arrow']):
+            with pa.OSFile(path, 'rb') as source:
+                tables.append(pa.ipc.open_stream(source).read_all())
+        elif file_name.endswith(FORMATS['parquet']):
+            import pyarrow.parquet as pq
+            tables.append(pq.read_table(path))
+    if not tables:
+        return _schema(pa).empty_table()
+    return pa.concat_tables(tables)
+
+
+def export_metrics(directory="metrics", csv_path=None, excel_path=None, final_day_only=False):
+    """
+    Convert the metrics directory to CSV and/or Excel after a run.
+
+    :param final_day_only: keep only the last recorded day of every run, like agent_stats.csv.
+    :return: the exported pandas DataFrame.
+    """
+    df = read_metrics(directory).to_pandas()
+    if final_day_only and not df.empty:
+        last_day = df.groupby('run_id')['day'].transform('max')
+        df = df[df['day'] == last_day]
+    if csv_path:
+        df.to_csv(csv_path, index=False)
+    if excel_path:
+        df.to_excel(excel_path, index=False)
+    return df
+
+
+def cli(argv=None):
+    parser = argparse.ArgumentParser(description="Convert streamed simulation metrics.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    export = commands.add_parser('export', help="export a metrics directory to CSV/Excel")
+    export.add_argument('directory', nargs='?', default='metrics')
+    export.add_argument('--csv', default=None)
+    export.add_argument('--excel', default=None)
+    export.add_argument('--final-day-only', action='store_true')
+    args = parser.parse_args(argv)
+
+    df = export_metrics(args.directory, args.csv, args.excel, args.final_day_only)
+    print(f"Exported {len(df)} rows from {args.directory}")
+
+
+if __name__ == "__main__":
+    cli()
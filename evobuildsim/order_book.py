@@ -0,0 +1,140 @@
+"""
+Per-material order book for trading days.
+
+Every builder with excess of a material posts a sell order priced by its sellprice multiplier,
+and every builder that still needs the material posts a buy order with its buyprice multiplier
+as limit. Each book is cleared with price-time priority: the highest bid is served first from
+the cheapest asks, ties go to whoever comes first in the builder list, and a trade executes at
+the seller's ask (material price x sellprice), as the old trading round did. Sorting the two
+sides is O(N log N) per material and the matching itself is a single linear pass.
+
+A seller's ask shrinks with every fill, so it never sells more than its excess. The original
+trading round compared every buyer against the seller's starting excess, so the same units could
+be sold (and paid for) several times; runs therefore differ from the original simulation from
+the first trading day on (day 5 with the default trade_every).
+"""
+from typing import NamedTuple
+
+from . import events
+
+
+class Trade(NamedTuple):
+    material: str
+    seller: str
+    buyer: str
+    quantity: int
+    unit_price: int
+    cost: int
+
+
+class Order:
+    __slots__ = ('agent', 'quantity', 'price', 'sequence')
+
+    def __init__(self, agent, quantity, price, sequence):
+        self.agent = agent
+        self.quantity = quantity
+        self.price = price        # price multiplier: sellprice for asks, buyprice for bids
+        self.sequence = sequence  # position in the builder list, the "time" in price-time priority
+
+
+class OrderBook:
+    """
+    Bids and asks for one material.
+
+    :param material: the material traded in this book.
+    :param base_price: MaterialAgent price of one unit, multiplied by the ask to get the trade price.
+    """
+
+    def __init__(self, material, base_price):
+        self.material = material
+        self.base_price = base_price
+        self.asks = []
+        self.bids = []
+
+    def add_ask(self, agent, quantity, sequence):
+        self.asks.append(Order(agent, quantity, agent.sellprice, sequence))
+
+    def add_bid(self, agent, quantity, sequence):
+        self.bids.append(Order(agent, quantity, agent.buyprice, sequence))
+
+    def clear(self):
+        """
+        Match bids against asks and settle the trades on the agents.
+
+        The buyer receives the units as excess materials and its need goes down, the seller's
+        excess goes down, and the money moves from buyer to seller. A buyer only takes as many
+        units as it can pay for.
+
+        :return: list of Trade records in execution order.
+        """
+        asks = sorted(self.asks, key=lambda order: (order.price, order.sequence))
+        bids = sorted(self.bids, key=lambda order: (-order.price, order.sequence))
+        material = self.material
+        trades = []
+        head = 0  # first ask with units left
+
+        for bid in bids:
+            while head < len(asks) and asks[head].quantity <= 0:
+                head += 1
+            if head == len(asks) or asks[head].price > bid.price:
+                break  # bids only get lower from here on, nothing else can match
+
+            buyer = bid.agent
+            position = head
+            while bid.quantity > 0 and position < len(asks):
+                ask = asks[position]
+                if ask.price > bid.price:
+                    break
+                if ask.quantity <= 0 or ask.agent is buyer:
+                    position += 1  # no self-trades; an agent has at most one ask per book
+                    continue
+
+                unit_price = self.base_price * ask.price
+                quantity = min(bid.quantity, ask.quantity, buyer.money // unit_price)
+                if quantity <= 0:
+                    break  # can't afford the cheapest ask left, the others cost more
+                cost = quantity * unit_price
+                seller = ask.agent
+
+                buyer.money -= cost
+                buyer.materials_needed[material] -= quantity
+                buyer.excess_materials[material] = buyer.excess_materials.get(material, 0) + quantity
+                seller.money += cost
+                seller.excess_materials[material] -= quantity
+                bid.quantity -= quantity
+                ask.quantity -= quantity
+
+                trades.append(Trade(material, seller.name, buyer.name, quantity, unit_price, cost))
+                if events.info_enabled:
+                    events.emit(events.Trade(buyer.name, seller.name, material, quantity, cost))
+                if ask.quantity == 0:
+                    position += 1
+
+        return trades
+
+
+def build_order_books(builder_agents, prices):
+    """Post every builder's excess as asks and its current needs as bids, one book per material."""
+    books = {material: OrderBook(material, price) for material, price in prices.items()}
+    for sequence, agent in enumerate(builder_agents):
+        for material, quantity in agent.excess_materials.items():
+            if quantity > 0 and material in books:
+                books[material].add_ask(agent, quantity, sequence)
+        for material, quantity in agent.materials_needed.items():
+            if quantity > 0 and material in books:
+                books[material].add_bid(agent, quantity, sequence)
+    return books
+
+
+def clear_order_books(builder_agents, prices):
+    """
+    Run one trading round through per-material order books.
+
+    :param builder_agents: builders with up to date materials_needed.
+    :param prices: MaterialAgent.prices.
+    :return: the trade ledger, a list of Trade records.
+    """
+    ledger = []
+    for book in build_order_books(builder_agents, prices).values():
+        ledger.extend(book.clear())
+    return ledger
@@ -0,0 +1,554 @@
+"""
+Structure-of-arrays engine for the BuildingAgent population.
+
+The object model keeps every agent's construction progress, needs and excess materials
+in nested string-keyed dicts and walks them one agent at a time. This engine holds the
+whole population as NumPy arrays instead:
+
+    progress  agents x houses x parts x materials   (acquired units per part)
+    excess    agents x materials                    (spare units)
+    money     agents                                 (SEK)
+
+and runs the daily request, build-completion, sell and focus-switch steps as batched
+array operations. House types (houses.py) come in as a catalog compiled into
+types x parts x materials requirement tensors; every agent's row of them is picked by its
+type index, so a population building a mix of types is checked and sold in the same ops.
+For the same seed it produces exactly the same results as calling request_materials() +
+switch_focus() for every agent in list order.
+
+All requests of a day are cleared against the MaterialAgent stock in one batch, under one of
+the CLEARING_RULES:
+
+    sequential      first come first served in list order, identical to the serial process_request calls
+    pro_rata        scarce materials are split in proportion to the units requested
+    price_weighted  scarce materials are split in proportion to units requested x buyprice
+
+Whatever rule splits the stock, every agent pays the list price for what it gets, materials
+in request order, and units an agent can no longer afford stay in the stock.
+"""
+import random
+from itertools import chain
+
+import numpy as np
+
+from .houses import STANDARD, HouseCatalog, HouseType
+
+
+MAX_HOUSES = 2        # priority_houses is either 1 or 2
+
+
+def clear_sequential(inventory, prices, money, mats, qty, weights=None):
+    """
+    Serve every agent's request against the material inventory in list order.
+
+    This is the batched equivalent of calling MaterialAgent.process_request for every
+    agent, one after the other: an agent only sees what earlier agents left in the
+    inventory, and inside one request the materials are paid for in order, so money spent
+    on the first material limits what the next one can afford.
+
+    Each take only depends on takes of earlier agents and on earlier materials of the
+    same agent, so the dependencies form a DAG and a Jacobi iteration over the whole
+    population reaches the exact serial answer. In practice only the few agents around
+    the point where a material runs out change between iterations, so it converges in a
+    handful of passes.
+
+    :param inventory: int array (materials,) of units in stock.
+    :param prices: int array (materials,) of unit prices.
+    :param money: int array (agents,) of money before the request.
+    :param mats: int array (agents, slots) of material indices in request order, -1 for unused slots.
+    :param qty: int array (agents, slots) of requested quantities, 0 for nothing requested.
+    :param weights: unused, the list order is the priority.
+    :return: (takes, money_after, inventory_after)
+    """
+    n_agents, n_slots = mats.shape
+    rows = np.arange(n_agents)
+    valid = (mats >= 0) & (qty > 0)
+    safe_mats = np.where(mats >= 0, mats, 0)
+    slot_prices = prices[safe_mats]
+
+    takes = np.zeros_like(qty)
+    while True:
+        # units taken per material by each agent, then what was left for each agent
+        taken_by_material = np.zeros((n_agents, len(inventory)), dtype=qty.dtype)
+        for slot in range(n_slots):
+            taken_by_material[rows, safe_mats[:, slot]] += np.where(valid[:, slot], takes[:, slot], 0)
+        taken_before = np.cumsum(taken_by_material, axis=0) - taken_by_material
+        available = inventory[safe_mats] - taken_before[rows[:, None], safe_mats]
+
+        new_takes = np.zeros_like(qty)
+        remaining_money = money.copy()
+        for slot in range(n_slots):
+            price = slot_prices[:, slot]
+            take = np.minimum(np.minimum(qty[:, slot], remaining_money // price), available[:, slot])
+            take = np.where(valid[:, slot] & (available[:, slot] > 0), np.maximum(take, 0), 0)
+            new_takes[:, slot] = take
+            remaining_money -= take * price
+
+        if np.array_equal(new_takes, takes):
+            break
+        takes = new_takes
+
+    inventory_after = inventory - taken_by_material.sum(axis=0)
+    return takes, remaining_money, inventory_after
+
+
+def _split_stock(inventory, mats, qty, weights):
+    """
+    Split every material's stock over the requests for it in proportion to qty x weight.
+
+    Materials with enough stock fill every request. For the others each request first gets
+    the floor of its share (never more than it asked for), then the units left over by the
+    rounding go one pass down the requests, highest weight first and list order on ties.
+
+    :return: int array (agents, slots) of allocated units.
+    """
+    n_agents, n_slots = mats.shape
+    flat_mats, flat_qty = mats.ravel(), qty.ravel()
+    requested = np.flatnonzero((flat_mats >= 0) & (flat_qty > 0))
+    material, wanted = flat_mats[requested], flat_qty[requested]
+    weight = np.broadcast_to(np.asarray(weights, dtype=np.float64)[:, None], mats.shape).ravel()[requested]
+
+    demand = np.bincount(material, weights=wanted, minlength=len(inventory))
+    weighted_demand = np.bincount(material, weights=wanted * weight, minlength=len(inventory))
+    scarce = demand[material] > inventory[material]
+    share = np.divide(wanted * weight, weighted_demand[material], out=np.zeros(len(wanted)),
+                      where=weighted_demand[material] > 0)
+    allocated = np.where(scarce, np.minimum(np.floor(share * inventory[material]).astype(wanted.dtype), wanted), wanted)
+
+    # rounding leftovers, one cumulative pass per material in priority order
+    leftover = inventory - np.bincount(material, weights=allocated, minlength=len(inventory)).astype(inventory.dtype)
+    order = np.lexsort((requested, -weight, material))
+    residual = (wanted - allocated)[order]
+    ordered_material = material[order]
+    running = np.cumsum(residual) - residual
+    group_start = np.searchsorted(ordered_material, ordered_material)  # first position of each material
+    before = running - running[group_start]
+    allocated[order] += np.clip(leftover[ordered_material] - before, 0, residual)
+
+    allocation = np.zeros(n_agents * n_slots, dtype=qty.dtype)
+    allocation[requested] = allocated
+    return allocation.reshape(mats.shape)
+
+
+def _pay_in_order(inventory, prices, money, mats, allocation):
+    # every agent pays for its allocation material by material, what it can't afford goes back to the stock
+    takes = np.zeros_like(allocation)
+    remaining_money = money.copy()
+    slot_prices = prices[np.where(mats >= 0, mats, 0)]
+    for slot in range(mats.shape[1]):
+        take = np.minimum(allocation[:, slot], remaining_money // slot_prices[:, slot])
+        takes[:, slot] = take
+        remaining_money -= take * slot_prices[:, slot]
+    bought = takes > 0
+    inventory_after = inventory - np.bincount(mats[bought], weights=takes[bought], minlength=len(inventory)).astype(inventory.dtype)
+    return takes, remaining_money, inventory_after
+
+
+def clear_pro_rata(inventory, prices, money, mats, qty, weights=None):
+    """
+    Split scarce materials in proportion to the units each agent requested (list order breaks
+    rounding ties). Arguments and return value as clear_sequential; weights are ignored.
+    """
+    allocation = _split_stock(inventory, mats, qty, np.ones(len(money)))
+    return _pay_in_order(inventory, prices, money, mats, allocation)
+
+
+def clear_price_weighted(inventory, prices, money, mats, qty, weights=None):
+    """
+    Split scarce materials in proportion to units requested x the agent's weight, normally its
+    buyprice multiplier, so agents willing to pay more get a bigger part of a short supply.
+
+    :param weights: float array (agents,), all ones when None.
+    """
+    weights = np.ones(len(money)) if weights is None else weights
+    allocation = _split_stock(inventory, mats, qty, weights)
+    return _pay_in_order(inventory, prices, money, mats, allocation)
+
+
+CLEARING_RULES = {
+    'sequential': clear_sequential,
+    'pro_rata': clear_pro_rata,
+    'price_weighted': clear_price_weighted,
+}
+
+
+class PopulationEngine:
+    """
+    Array-backed state of a whole BuildingAgent population plus the MaterialAgent stock.
+
+    Build it with from_agents() and run request days with request_day(). The engine can stay
+    alive over any number of request days: it sorts the population (sort_by_fitness()) and skips
+    idle days (idle_request_draws(), skip_idle()) on its own rows, so the agent objects only need
+    to be brought up to date with write_back() before something reads them (trading, mutation,
+    crossover, stats, hooks). write_back() only copies the house parts, excess and needs that
+    changed since the engine last loaded or wrote them. After code that changes some of the
+    objects, follow() reloads just those; after anything else, load() again.
+    """
+
+    # per-agent arrays, in row order; sort_by_fitness permutes all of them
+    ROW_ARRAYS = ('progress', 'excess', 'money', 'houses_built', 'priority_houses', 'buyprice', 'current_focus',
+                  'build_order', 'house_type', 'n_houses', 'last_needs', 'last_needs_mats', 'agent_requirements',
+                  'agent_part_materials', 'agent_sell_price', 'fitness_score', 'dirty_parts', 'excess_dirty',
+                  'needs_dirty')
+
+    def __init__(self, house_types, prices, forced_buy_chance=0.2, forced_buy_amount=1, clearing='sequential'):
+        """
+        :param house_types: houses.HouseCatalog or list of HouseType the agents build, or a single
+                            part -> {material: units} dict like BuildingAgent.part_requirements.
+        :param prices: MaterialAgent.prices, material -> unit price.
+        :param forced_buy_chance: chance per needed material to be forced to buy extra units.
+        :param forced_buy_amount: number of extra units in a forced buy.
+        :param clearing: how the day's requests share the stock, one of CLEARING_RULES.
+        """
+        if clearing not in CLEARING_RULES:
+            raise ValueError(f"unknown clearing rule {clearing!r}, expected one of {tuple(CLEARING_RULES)}")
+        if isinstance(house_types, dict):
+            house_types = [HouseType('custom', house_types, STANDARD.sell_price)]
+        catalog = house_types if isinstance(house_types, HouseCatalog) else HouseCatalog(house_types, prices)
+        self.catalog = catalog
+        self.type_index = catalog.index
+        self.parts = list(catalog.parts)
+        self.materials = list(catalog.materials)
+        self.part_index = {part: i for i, part in enumerate(self.parts)}
+        self.material_index = {material: i for i, material in enumerate(self.materials)}
+        self.forced_buy_chance = forced_buy_chance
+        self.forced_buy_amount = forced_buy_amount
+        self.clearing = clearing
+
+        n_parts, n_materials = len(self.parts), len(self.materials)
+        self.type_requirements = np.array(catalog.requirements, dtype=np.int64)  # types x parts x materials
+        self.sell_prices = np.array(catalog.sell_prices, dtype=np.int64)
+        # materials of every part in the order the object model walks them, -1 padded, per type
+        slots = max(len(requirements) for house_type in catalog for requirements in house_type.part_requirements.values())
+        self.type_part_materials = np.full((len(catalog), n_parts, slots), -1, dtype=np.int64)
+        # per type, every (part, material) of a house in HouseProgress.parts order as positions in a
+        # flattened parts x materials row, which parts the type has, and the material names per part
+        self.type_positions = []
+        self.type_parts = np.zeros((len(catalog), n_parts), dtype=bool)
+        for t, house_type in enumerate(catalog):
+            positions = []
+            for part, requirements in house_type.part_requirements.items():
+                self.type_parts[t, self.part_index[part]] = True
+                for slot, material in enumerate(requirements):
+                    self.type_part_materials[t, self.part_index[part], slot] = self.material_index[material]
+                    positions.append(self.part_index[part] * n_materials + self.material_index[material])
+            self.type_positions.append(np.array(positions, dtype=np.int64))
+        self.type_part_names = [[tuple(house_type.part_requirements.get(part, ())) for part in self.parts]
+                                for house_type in catalog]
+
+        self.prices = np.array([prices[material] for material in self.materials], dtype=np.int64)
+        self.inventory = np.zeros(n_materials, dtype=np.int64)
+        self.n_agents = 0
+
+    @classmethod
+    def from_agents(cls, builder_agents, material_agent, forced_buy_chance=0.2, forced_buy_amount=1, clearing='sequential'):
+        """Create an engine holding the current state of the given agents and material agent."""
+        house_types = list({agent.house_type.name: agent.house_type for agent in builder_agents}.values()) or [STANDARD]
+        engine = cls(house_types, material_agent.prices, forced_buy_chance, forced_buy_amount, clearing)
+        engine.load(builder_agents, material_agent)
+        return engine
+
+    def load(self, builder_agents, material_agent):
+        """(Re)load the population state from the object model, keeping the list order."""
+        self._read_agents(builder_agents)
+        self.load_market(material_agent)
+
+    def _read_agents(self, builder_agents):
+        n_agents = len(builder_agents)
+        n_parts, n_materials = self.type_requirements.shape[1:]
+        slots = self.type_part_materials.shape[2]
+        self.n_agents = n_agents
+        self.agents = list(builder_agents)  # the objects in row order
+        self.money = np.zeros(n_agents, dtype=np.int64)
+        self.houses_built = np.zeros(n_agents, dtype=np.int64)
+        self.priority_houses = np.zeros(n_agents, dtype=np.int64)
+        self.buyprice = np.zeros(n_agents, dtype=np.float64)
+        self.current_focus = np.zeros(n_agents, dtype=np.int64)
+        self.n_houses = np.zeros(n_agents, dtype=np.int64)
+        self.house_type = np.zeros(n_agents, dtype=np.int64)
+        self.build_order = np.zeros((n_agents, n_parts), dtype=np.int64)
+        self.excess = np.zeros((n_agents, n_materials), dtype=np.int64)
+        self.progress = np.zeros((n_agents, MAX_HOUSES, n_parts, n_materials), dtype=np.int64)
+        self.agent_requirements = np.zeros((n_agents, n_parts, n_materials), dtype=np.int64)
+        self.agent_part_materials = np.zeros((n_agents, n_parts, slots), dtype=np.int64)
+        self.agent_sell_price = np.zeros(n_agents, dtype=np.int64)
+        self.last_needs = np.zeros((n_agents, slots), dtype=np.int64)
+        self.last_needs_mats = np.zeros((n_agents, slots), dtype=np.int64)
+        self.fitness_score = np.zeros(n_agents, dtype=np.float64)
+        self.scored = False
+        # what differs from the objects: parts of houses, excess, materials_needed
+        self.dirty_parts = np.zeros((n_agents, MAX_HOUSES, n_parts), dtype=bool)
+        self.excess_dirty = np.zeros(n_agents, dtype=bool)
+        self.needs_dirty = np.zeros(n_agents, dtype=bool)
+        self._read_rows(builder_agents, np.arange(n_agents))
+
+    def _read_rows(self, builder_agents, rows):
+        # fill the given rows from their agent objects
+        agents = [builder_agents[row] for row in rows.tolist()]
+        part_index, materials = self.part_index, self.materials
+        self.money[rows] = [agent.money for agent in agents]
+        self.houses_built[rows] = [agent.houses_built for agent in agents]
+        self.priority_houses[rows] = [agent.priority_houses for agent in agents]
+        self.buyprice[rows] = [agent.buyprice for agent in agents]
+        self.current_focus[rows] = [agent.current_focus_house for agent in agents]
+        self.n_houses[rows] = [len(agent.construction_progress) for agent in agents]
+        self.house_type[rows] = [self.type_index[agent.house_type.name] for agent in agents]
+        self.build_order[rows] = np.fromiter((part_index[part] for agent in agents for part in agent.build_order),
+                                             dtype=np.int64, count=self.build_order.shape[1] * len(rows)).reshape(len(rows), -1)
+        # non-material keys in an agent's excess are left alone on the object
+        zeros = [0] * len(materials)
+        self.excess[rows] = np.fromiter(chain.from_iterable(map(agent.excess_materials.get, materials, zeros) for agent in agents),
+                                        dtype=np.int64, count=len(materials) * len(rows)).reshape(len(rows), -1)
+
+        # HouseProgress part dicts keep the order of their type's part_requirements, so every house
+        # reads out as one flat run of values in its type's layout
+        self.progress[rows] = 0
+        flat_progress = self.progress.reshape(self.n_agents, MAX_HOUSES, -1)
+        house_type, n_houses = self.house_type[rows], self.n_houses[rows]
+        for t, positions in enumerate(self.type_positions):
+            for h in range(MAX_HOUSES):
+                selected = np.flatnonzero((house_type == t) & (n_houses > h))
+                if not len(selected):
+                    continue
+                houses = [agents[position].construction_progress[h].parts for position in selected.tolist()]
+                values = np.fromiter(chain.from_iterable(map(dict.values, chain.from_iterable(map(dict.values, houses)))),
+                                     dtype=np.int64, count=len(houses) * len(positions))
+                flat_progress[rows[selected][:, None], h, positions] = values.reshape(len(houses), len(positions))
+
+        # every agent's requirements and per-part material order, picked by its type
+        self.agent_requirements[rows] = self.type_requirements[self.house_type[rows]]       # parts x materials
+        self.agent_part_materials[rows] = self.type_part_materials[self.house_type[rows]]   # parts x slots
+        self.agent_sell_price[rows] = self.sell_prices[self.house_type[rows]]
+        self.last_needs[rows] = 0
+        # -2 matches no needs, so the next request day writes these agents' materials_needed
+        self.last_needs_mats[rows] = -2
+        self.dirty_parts[rows] = False
+        self.excess_dirty[rows] = False
+        self.needs_dirty[rows] = False
+
+    def follow(self, builder_agents, changed):
+        """
+        Catch up with changes made to the objects while the rows were current (write_back() first):
+        take over the list order and reload the rows of the `changed` agents, e.g. the ones
+        perform_mutation changed or the parents perform_crossover crossed over.
+        """
+        if len(builder_agents) != self.n_agents:
+            self._read_agents(builder_agents)
+            return
+        if any(agent is not row_agent for agent, row_agent in zip(builder_agents, self.agents)):
+            row_of = {id(agent): row for row, agent in enumerate(self.agents)}
+            self._permute(np.array([row_of[id(agent)] for agent in builder_agents], dtype=np.int64))
+            self.agents = list(builder_agents)
+        if changed:
+            changed_ids = {id(agent) for agent in changed}
+            rows = np.array([row for row, agent in enumerate(builder_agents) if id(agent) in changed_ids], dtype=np.int64)
+            self._read_rows(builder_agents, rows)
+
+    def load_market(self, material_agent):
+        """Take over the MaterialAgent stock, e.g. after a restock."""
+        self.inventory = np.array([material_agent.inventory.get(material, 0) for material in self.materials], dtype=np.int64)
+
+    def write_market(self, material_agent):
+        """Copy the stock back onto the MaterialAgent."""
+        for material, quantity in zip(self.materials, self.inventory.tolist()):
+            material_agent.inventory[material] = quantity
+
+    def house_needs(self, house):
+        """
+        Vectorized HouseProgress.needs for one house of every agent.
+
+        :param house: int array (agents,) with the house index of every agent.
+        :return: (has_part, current_part, mats, needs) where mats/needs are (agents, slots)
+                 arrays with the material indices and missing units of the current part.
+        """
+        rows = np.arange(self.n_agents)
+        house_progress = self.progress[rows, house]                        # agents x parts x materials
+        deficit = np.maximum(self.agent_requirements - house_progress, 0)
+        incomplete = (deficit > 0).any(axis=2)                              # agents x parts
+        incomplete_in_order = incomplete[rows[:, None], self.build_order]
+        has_part = incomplete_in_order.any(axis=1)
+        current_part = self.build_order[rows, incomplete_in_order.argmax(axis=1)]
+
+        mats = self.agent_part_materials[rows, current_part]
+        mats = np.where(has_part[:, None], mats, -1)
+        safe_mats = np.where(mats >= 0, mats, 0)
+        needs = np.where(mats >= 0, deficit[rows[:, None], current_part[:, None], safe_mats], 0)
+        return has_part, current_part, mats, needs
+
+    def current_needs(self):
+        """Vectorized check_materials_needed for every agent's focus house, see house_needs()."""
+        return self.house_needs(self.current_focus)
+
+    def _set_needs(self, mats, needs):
+        # materials_needed as the object model would have left it; only rows that changed get written back
+        needs_mats = np.where(needs > 0, mats, -1)
+        self.needs_dirty |= (needs != self.last_needs).any(axis=1) | (needs_mats != self.last_needs_mats).any(axis=1)
+        self.last_needs, self.last_needs_mats = needs, needs_mats
+
+    def request_day(self, random_source=None, rolls=None):
+        """
+        Run one non-trading day for the whole population: every agent requests the materials
+        for the current part of its focus house, the market clears all requests in one batch
+        under the engine's clearing rule, completed houses are sold, and agents with two houses
+        switch focus.
+
+        :param random_source: callable returning floats in [0, 1), consumed in the same order as
+                              the object model. Defaults to random.random for seed parity.
+        :param rolls: pre-drawn forced-buy rolls, agents x materials in self.materials order
+                      (rng.RngStreams.forced_buy_block); random_source is not used then.
+        :return: number of houses completed this day.
+        """
+        random_source = random_source or random.random
+        rows = np.arange(self.n_agents)
+        has_part, current_part, mats, needs = self.current_needs()
+        # the object model sets materials_needed to the needs before buying, with the full dict even when
+        # a needed unit is unaffordable
+        self._set_needs(mats, needs)
+        needed = needs > 0
+        safe_mats = np.where(mats >= 0, mats, 0)
+        slot_prices = self.prices[safe_mats]
+
+        # one forced-buy roll per needed material, agent by agent, like the object model
+        if rolls is not None:
+            rolls = np.where(needed, rolls[rows[:, None], safe_mats], 1.0)
+        else:
+            rolls = np.ones(needs.shape)
+            n_rolls = int(needed.sum())
+            if n_rolls:
+                rolls[needed] = [random_source() for _ in range(n_rolls)]
+
+        affordable = np.minimum(needs, self.money[:, None] // slot_prices)
+        forced = needed & (rolls < self.forced_buy_chance) & \
+            (self.money[:, None] >= (affordable + self.forced_buy_amount) * slot_prices)
+        requested = np.where(needed, affordable + np.where(forced, self.forced_buy_amount, 0), 0)
+
+        clear = CLEARING_RULES[self.clearing]
+        takes, self.money, self.inventory = clear(self.inventory, self.prices, self.money, mats, requested, self.buyprice)
+
+        # needed units go into the focus house, anything above that becomes excess
+        into_house = np.minimum(needs, takes)
+        slot_rows = np.broadcast_to(rows[:, None], mats.shape)[needed]
+        np.add.at(self.progress, (slot_rows, self.current_focus[slot_rows], current_part[slot_rows], mats[needed]),
+                  into_house[needed])
+        np.add.at(self.excess, (slot_rows, mats[needed]), (takes - into_house)[needed])
+
+        # a house is only checked for completion when the part just worked on got completed
+        requested_any = (requested > 0).any(axis=1)
+        focus_progress = self.progress[rows, self.current_focus]
+        part_done = (focus_progress[rows, current_part] >= self.agent_requirements[rows, current_part]).all(axis=1)
+        # per-agent counts of the day, read by the instrumentation
+        self.last_purchases = (takes > 0).sum(axis=1)
+        self.last_parts_completed = requested_any & has_part & part_done
+        house_done = requested_any & has_part & part_done & \
+            (focus_progress >= self.agent_requirements).all(axis=(1, 2))
+        self.houses_built += house_done
+        self.progress[rows[house_done], self.current_focus[house_done]] = 0
+        self.money += house_done * self.agent_sell_price
+        # what write_back has to copy: the parts that got units, sold houses, new excess
+        filled = into_house > 0
+        filled_rows = slot_rows[filled[needed]]
+        self.dirty_parts[filled_rows, self.current_focus[filled_rows], current_part[filled_rows]] = True
+        self.dirty_parts[rows[house_done], self.current_focus[house_done]] = True
+        self.excess_dirty |= (takes > into_house).any(axis=1)
+
+        two_houses = self.priority_houses == 2
+        self.current_focus[two_houses] = 1 - self.current_focus[two_houses]
+        return int(house_done.sum())
+
+    def sort_by_fitness(self, builder_agents):
+        """
+        sort_agents_by_fitness on the rows: order the agents (and the rows with them) by houses
+        built plus money in millions, best first, keeping the list order on ties.
+        """
+        scores = self.houses_built + self.money / 1000000
+        order = np.argsort(-scores, kind='stable')
+        self.fitness_score = scores
+        self.scored = True
+        if (order[1:] > order[:-1]).all():
+            return
+        self._permute(order)
+        builder_agents[:] = self.agents = [builder_agents[row] for row in order.tolist()]
+
+    def _permute(self, order):
+        for name in self.ROW_ARRAYS:
+            setattr(self, name, getattr(self, name)[order])
+
+    def idle_request_draws(self):
+        """simulation.idle_request_draws on the rows: None if anyone could buy something on the next two request days."""
+        if (self.n_houses != self.priority_houses).any() or (self.current_focus >= self.n_houses).any():
+            return None
+        draws = [0, 0]
+        for offset in (0, 1):
+            _, _, mats, needs = self.house_needs((self.current_focus + offset) % self.n_houses)
+            needed = needs > 0
+            safe_mats = np.where(mats >= 0, mats, 0)
+            if (needed & (self.inventory[safe_mats] > 0) & (self.money[:, None] >= self.prices[safe_mats])).any():
+                return None
+            draws[offset] = int(needed.sum())
+        return draws
+
+    def skip_idle(self, days):
+        """Advance the focus and needs over `days` idle request days, like simulation.skip_idle_days (the draws are burnt there)."""
+        focus = (self.current_focus + days - 1) % self.n_houses
+        _, _, mats, needs = self.house_needs(focus)
+        self._set_needs(mats, needs)
+        two_houses = self.n_houses == 2
+        self.current_focus[two_houses] = (focus[two_houses] + 1) % 2
+
+    def write_back(self, builder_agents, material_agent):
+        """
+        Bring the agent objects and the material agent up to date with the rows. Money, houses
+        built, focus and fitness scores are copied for every agent; construction progress, excess
+        and materials_needed only where they changed since the last load or write_back.
+        """
+        for agent, money, houses_built, focus in zip(builder_agents, self.money.tolist(), self.houses_built.tolist(),
+                                                     self.current_focus.tolist()):
+            agent.money = money
+            agent.houses_built = houses_built
+            agent.current_focus_house = focus
+        if self.scored:
+            for agent, score in zip(builder_agents, self.fitness_score.tolist()):
+                agent.fitness_score = score
+
+        # values come out as flat lists of ints, consumed a part (or agent) at a time: a nested tolist()
+        # of a few 100k rows makes the garbage collector rescan the whole population, repeatedly
+
+        # the parts that changed, in row order so every agent's houses are visited once
+        rows, houses, parts = np.nonzero(self.dirty_parts)
+        if len(rows):
+            house_types = self.house_type[rows]
+            house_progress = self.progress[rows, houses]                                   # changed x parts x materials
+            deficit = np.maximum(self.agent_requirements[rows] - house_progress, 0).sum(axis=2)
+            completed = ((deficit == 0) & self.type_parts[house_types]).sum(axis=1)
+            part_materials = self.agent_part_materials[rows, parts]                        # changed x slots, -1 padded
+            values = house_progress[np.arange(len(rows))[:, None], parts[:, None], np.maximum(part_materials, 0)]
+            values = iter(values[part_materials >= 0].tolist())
+            remaining = deficit[np.arange(len(rows)), parts]
+            part_names, material_names = self.parts, self.type_part_names
+            for row, h, p, t, part_remaining, parts_completed in zip(rows.tolist(), houses.tolist(), parts.tolist(),
+                                                                    house_types.tolist(), remaining.tolist(),
+                                                                    completed.tolist()):
+                house = builder_agents[row].construction_progress[h]
+                part = part_names[p]
+                house.parts[part].update(zip(material_names[t][p], values))
+                house.remaining[part] = part_remaining
+                house.parts_completed = parts_completed
+
+        materials = self.materials
+        rows = np.flatnonzero(self.excess_dirty)
+        excess = iter(self.excess[rows].ravel().tolist())
+        for row in rows.tolist():
+            agent_excess = builder_agents[row].excess_materials
+            for material, quantity in zip(materials, excess):
+                if quantity or material in agent_excess:
+                    agent_excess[material] = quantity
+
+        rows = np.flatnonzero(self.needs_dirty)
+        slots = range(self.last_needs.shape[1])
+        mats, needs = iter(self.last_needs_mats[rows].ravel().tolist()), iter(self.last_needs[rows].ravel().tolist())
+        for row in rows.tolist():
+            builder_agents[row].materials_needed = {materials[m]: quantity for _, m, quantity in zip(slots, mats, needs) if m >= 0}
+        self.dirty_parts[:] = False
+        self.excess_dirty[:] = False
+        self.needs_dirty[:] = False
+        self.write_market(material_agent)
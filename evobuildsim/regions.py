@@ -0,0 +1,305 @@
+"""
+Regional mode: one world split into markets that run in their own processes.
+
+Every region has its own MaterialAgent (inventory and restock schedule), its own resident
+builders and its own random stream, and runs the normal day loop with main(). On exchange
+days (the trading days by default) the regions first trade locally as usual, then post what
+they still have in excess and still need to the coordinator. The coordinator clears one order
+book per material over all regions, with the same price-time priority as a local trading day
+(ties go to the lower region, then to the agent's place in its region), and sends every region
+its fills. Regions only wait for each other on exchange days; in between they run freely.
+
+Each region seeds its random stream from (seed, region index) and the coordinator handles the
+regions in index order, so a run depends only on the seed and the region configs, not on how
+the processes get scheduled. processes=False runs the regions in turn in this process, with
+the same results.
+
+    configs = split_world(SimulationConfig(roster=scaled_roster(4000)), regions=4)
+    result = run_regions(configs, seed=7)
+
+Usage:
+    evobuildsim regions --regions 4 --agents 4000 --days 50 --seed 7
+"""
+import argparse
+import json
+import multiprocessing
+import queue
+import random
+import sys
+import traceback
+from contextlib import contextmanager
+
+from . import events, simulation
+from .config import SimulationConfig
+from .order_book import build_order_books
+from .runner import agent_final_stats
+
+
+def split_world(config=None, regions=2):
+    """
+    Deal a config's roster round-robin over `regions` configs with the same settings.
+
+    :return: list of SimulationConfig, one per region.
+    """
+    config = config or SimulationConfig()
+    roster = simulation.DEFAULT_ROSTER if config.roster is None else config.roster
+    if len(roster) < regions:
+        raise ValueError(f"{len(roster)} agents can't fill {regions} regions")
+    return [config.replace(roster=list(roster[region::regions])) for region in range(regions)]
+
+
+def exchange_days(days, every, start_day=1):
+    return [day for day in range(start_day, days + 1) if day % every == 0]
+
+
+class Region:
+    """
+    One market and its builders, stepping through the days with main().
+
+    :param index: position of the region, also part of its random seed.
+    :param config: SimulationConfig of the region (roster, restock schedule, ...).
+    :param seed: seed of the whole run.
+    """
+
+    def __init__(self, index, config, seed):
+        self.index = index
+        self.day = 0
+        stream = random.Random(f"{seed}/{index}")
+        if config.rng == "streams":
+            config = config.replace(rng_seed=stream.getrandbits(63))
+        self.config = config
+        self.random_state = stream.getstate()
+        with self.own_random():
+            self.material_agent, self.agents = simulation.create_world(config)
+
+    @contextmanager
+    def own_random(self):
+        # the simulation draws from the random module; give it this region's stream while the region runs
+        outside = random.getstate()
+        random.setstate(self.random_state)
+        try:
+            yield
+        finally:
+            self.random_state = random.getstate()
+            random.setstate(outside)
+
+    def run_until(self, day):
+        if day > self.day:
+            with self.own_random():
+                simulation.main(day, self.material_agent, self.agents, config=self.config, write_stats=False,
+                                start_day=self.day + 1)
+            self.day = day
+
+    def orders(self):
+        """Leftover excess and needs after the local trading day, one tuple per agent that has any."""
+        posted = []
+        for position, agent in enumerate(self.agents):
+            needs = {material: quantity for material, quantity in agent.check_materials_needed().items() if quantity > 0}
+            excess = {material: quantity for material, quantity in agent.excess_materials.items()
+                      if quantity > 0 and material in self.material_agent.prices}
+            if needs or excess:
+                posted.append((position, agent.money, agent.buyprice, agent.sellprice, excess, needs))
+        return posted
+
+    def apply_fills(self, fills):
+        """Settle the cross-region trades of the day, then build with what came in, like a local trading day."""
+        for position, money, excess, needs in fills:
+            agent = self.agents[position]
+            agent.money += money
+            for material, quantity in excess.items():
+                agent.excess_materials[material] = agent.excess_materials.get(material, 0) + quantity
+            for material, quantity in needs.items():
+                agent.materials_needed[material] -= quantity
+        if fills:
+            simulation.use_excess_in_construction(self.agents)
+
+    def result(self):
+        return {
+            'region': self.index,
+            'agents': [agent_final_stats(agent) for agent in self.agents],
+            'inventory': dict(self.material_agent.inventory),
+        }
+
+
+class _Trader:
+    # stand-in for a remote agent in the coordinator's order books
+    __slots__ = ('name', 'region', 'position', 'money', 'buyprice', 'sellprice', 'excess_materials', 'materials_needed')
+
+    def __init__(self, region, position, money, buyprice, sellprice, excess, needs):
+        self.name = f"{region}:{position}"
+        self.region = region
+        self.position = position
+        self.money = money
+        self.buyprice = buyprice
+        self.sellprice = sellprice
+        self.excess_materials = dict(excess)
+        self.materials_needed = dict(needs)
+
+
+def clear_exchange(orders, prices):
+    """
+    Clear one exchange day.
+
+    :param orders: per region (in region order), the list posted by Region.orders().
+    :param prices: MaterialAgent prices.
+    :return: (fills per region, trade ledger)
+    """
+    traders = [_Trader(region, *order) for region, posted in enumerate(orders) for order in posted]
+    before = [(trader.money, dict(trader.excess_materials), dict(trader.materials_needed)) for trader in traders]
+    ledger = []
+    for book in build_order_books(traders, prices).values():
+        ledger.extend(book.clear())
+
+    fills = [[] for _ in orders]
+    for trader, (money, excess, needs) in zip(traders, before):
+        if trader.money != money:
+            fills[trader.region].append((
+                trader.position,
+                trader.money - money,
+                {material: trader.excess_materials.get(material, 0) - excess.get(material, 0)
+                 for material in trader.excess_materials if trader.excess_materials[material] != excess.get(material, 0)},
+                {material: needs[material] - quantity for material, quantity in trader.materials_needed.items()
+                 if quantity != needs[material]},
+            ))
+    return fills, ledger
+
+
+def _summary(seed, regions, ledger):
+    cross = [trade for trade in ledger if trade.seller.split(':')[0] != trade.buyer.split(':')[0]]
+    return {
+        'seed': seed,
+        'regions': regions,
+        'total_houses': sum(agent['houses_built'] for region in regions for agent in region['agents']),
+        'cross_region_trades': len(cross),
+        'cross_region_units': sum(trade.quantity for trade in cross),
+        'exchange_trades': len(ledger),
+    }
+
+
+def _region_worker(index, config, seed, days, every, inbox, outbox):
+    try:
+        events.silence()
+        region = Region(index, config, seed)
+        for day in exchange_days(days, every):
+            region.run_until(day)
+            outbox.put((index, 'orders', region.orders()))
+            region.apply_fills(inbox.get())
+        region.run_until(days)
+        outbox.put((index, 'result', region.result()))
+    except BaseException:
+        outbox.put((index, 'error', traceback.format_exc()))
+
+
+def _collect(outbox, processes, kind):
+    # one message per region, in region order whatever order they arrive in
+    received = [None] * len(processes)
+    for _ in processes:
+        while True:
+            try:
+                index, got, payload = outbox.get(timeout=1.0)
+                break
+            except queue.Empty:
+                for process in processes:
+                    if process.exitcode not in (None, 0):
+                        raise RuntimeError(f"region worker {process.name} died with exit code {process.exitcode}")
+        if got == 'error':
+            raise RuntimeError(f"region {index} failed:\n{payload}")
+        if got != kind:
+            raise RuntimeError(f"region {index} sent {got!r}, expected {kind!r}")
+        received[index] = payload
+    return received
+
+
+def _run_in_process(configs, seed, days, every, prices, ledger):
+    regions = [Region(index, config, seed) for index, config in enumerate(configs)]
+    for day in exchange_days(days, every):
+        for region in regions:
+            region.run_until(day)
+        fills, trades = clear_exchange([region.orders() for region in regions], prices)
+        ledger.extend(trades)
+        for region, region_fills in zip(regions, fills):
+            region.apply_fills(region_fills)
+    for region in regions:
+        region.run_until(days)
+    return [region.result() for region in regions]
+
+
+def _run_in_workers(configs, seed, days, every, prices, ledger):
+    outbox = multiprocessing.Queue()
+    inboxes = [multiprocessing.Queue() for _ in configs]
+    workers = [
+        multiprocessing.Process(target=_region_worker, name=f"region-{index}",
+                                args=(index, config, seed, days, every, inboxes[index], outbox))
+        for index, config in enumerate(configs)
+    ]
+    for worker in workers:
+        worker.start()
+    try:
+        for _ in exchange_days(days, every):
+            fills, trades = clear_exchange(_collect(outbox, workers, 'orders'), prices)
+            ledger.extend(trades)
+            for inbox, region_fills in zip(inboxes, fills):
+                inbox.put(region_fills)
+        return _collect(outbox, workers, 'result')
+    finally:
+        for worker in workers:
+            worker.join(timeout=5)
+            if worker.is_alive():
+                worker.terminate()
+
+
+def run_regions(configs, seed=0, days=None, exchange_every=None, processes=True):
+    """
+    Run a regional world.
+
+    :param configs: one SimulationConfig per region, e.g. from split_world().
+    :param seed: seed of the run; region i draws from a stream seeded with (seed, i).
+    :param days: days to simulate, configs[0].days by default.
+    :param exchange_every: cross-region exchange every this many days, configs[0].trade_every by default.
+    :param processes: run every region in its own process; False runs them in turn in this process.
+    :return: dict with the final stats per region and the cross-region trade totals.
+    """
+    days = configs[0].days if days is None else days
+    every = configs[0].trade_every if exchange_every is None else exchange_every
+    prices = simulation.MaterialAgent().prices
+    ledger = []
+    previous = events.silence()
+    try:
+        run = _run_in_workers if processes else _run_in_process
+        results = run(configs, seed, days, every, prices, ledger)
+    finally:
+        events.configure(*previous)
+    return _summary(seed, results, ledger)
+
+
+def cli(argv=None):
+    parser = argparse.ArgumentParser(prog="evobuildsim regions", description="Run a world split into regional markets.")
+    parser.add_argument('--regions', type=int, default=2)
+    parser.add_argument('--agents', type=int, default=None, help="total agents (default: the twelve default agents)")
+    parser.add_argument('--days', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--engine', choices=['object', 'array'], default='object')
+    parser.add_argument('--exchange-every', type=int, default=None, help="days between cross-region exchanges (default: trade_every)")
+    parser.add_argument('--inventory-multiplier', type=int, default=None,
+                        help="warehouse size of every region (default: grows with the agents per region, 3 for up to 15)")
+    parser.add_argument('--in-process', action='store_true', help="run the regions in turn in this process")
+    parser.add_argument('--out', default=None)
+    args = parser.parse_args(argv)
+
+    roster = simulation.scaled_roster(args.agents) if args.agents else None
+    multiplier = args.inventory_multiplier
+    if multiplier is None:
+        # like benchmark._world: every region's warehouse grows with its share of the agents so big runs don't sell out
+        multiplier = max(3, (args.agents or len(simulation.DEFAULT_ROSTER)) // args.regions // 4)
+    configs = split_world(SimulationConfig(days=args.days, engine=args.engine, roster=roster,
+                                           inventory_multiplier=multiplier), args.regions)
+    result = run_regions(configs, args.seed, exchange_every=args.exchange_every, processes=not args.in_process)
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(result, f, indent=2)
+    print(f"{args.regions} regions, {result['total_houses']} houses, "
+          f"{result['cross_region_trades']} cross-region trades ({result['cross_region_units']} units)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    cli()
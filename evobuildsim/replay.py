@@ -0,0 +1,369 @@
+"""
+Record a run's random decisions and replay any stretch of it with full tracing.
+
+Every stochastic decision of the simulation (forced-buy rolls, mutation rolls, shuffles and new
+prices, selection points, the draws skipped idle days burn) comes out of the random module's
+Mersenne Twister. record_run() binds a TapeRandom into the random module for the duration of a
+fast, silent run; it hands out exactly what the global generator would have, and appends the
+32-bit words it used to a tape, marked by day and by phase of the day. Snapshots of the world
+are taken every snapshot_every days.
+
+replay() restores the nearest snapshot before the days of interest, binds a TapeRandom that
+reads the words back from the tape at that day's position, and runs forward with debug events on
+for the chosen days only (and, optionally, only the events about one agent). Since the tape holds
+words rather than calls, it doesn't matter that a traced replay runs days a silent run skipped;
+the same words come out either way, and the replay ends in the same world as the recording.
+
+    agents, tape = record_run(50, config=SimulationConfig(), snapshot_every=10)
+    tape.save("run.tape")
+    replay(Tape.load("run.tape"), 43, agent="Florida Man")      # restores day 40, traces day 43
+
+    evobuildsim replay record --days 50 --out run.tape
+    evobuildsim replay show run.tape --day 43 --to 44 --agent "Florida Man"
+
+With SimulationConfig(rng="streams") the draws come from per-day streams (rng.py) and the tape
+stays empty; replay() then only needs the snapshots.
+"""
+import argparse
+import pickle
+import random
+import struct
+import sys
+import zlib
+from array import array
+
+from . import events
+from .config import SimulationConfig
+from .instrumentation import NullInstruments
+from .snapshot import Snapshot
+
+
+MAGIC = b"EBTAPE"
+TAPE_VERSION = 1
+_HEADER = struct.Struct("<6sHQ")  # magic, version, payload length
+_BIG_ENDIAN = sys.byteorder == "big"
+
+
+class TapeExhausted(RuntimeError):
+    """A replay asked for more random words than the recording used, so it went a different way."""
+
+
+def _bound_functions():
+    # the random module's functions are bound methods of one hidden Random instance
+    return {name: function for name, function in vars(random).items()
+            if getattr(function, '__self__', None) is random._inst}
+
+
+class TapeRandom(random.Random):
+    """
+    random.Random that records the Mersenne Twister words it uses, or plays them back.
+
+    :param words: array('I') to play back from, None to record into a new one.
+    :param position: index of the first word to play back.
+    """
+
+    def __init__(self, words=None, position=0):
+        self.replaying = words is not None
+        self.words = array('I') if words is None else words
+        self.position = position
+        super().__init__()
+
+    def _take(self, count):
+        if self.replaying:
+            start, self.position = self.position, self.position + count
+            if self.position > len(self.words):
+                raise TapeExhausted(f"the replay needs word {self.position} of a tape with {len(self.words)}")
+            return self.words[start:self.position]
+        if count == 1:
+            drawn = array('I', (super().getrandbits(32),))
+        else:
+            # one call, the generator fills the words in order, least significant first
+            drawn = array('I')
+            drawn.frombytes(super().getrandbits(32 * count).to_bytes(4 * count, 'little'))
+            if _BIG_ENDIAN:
+                drawn.byteswap()
+        self.words.extend(drawn)
+        return drawn
+
+    def random(self):
+        # the same two words and arithmetic as the C implementation
+        a, b = self._take(2)
+        return ((a >> 5) * 67108864.0 + (b >> 6)) * (1.0 / 9007199254740992.0)
+
+    def getrandbits(self, k):
+        if k <= 0:
+            return 0
+        words = self._take((k + 31) // 32)
+        if k <= 32:
+            return words[0] >> (32 - k)
+        if k % 32:
+            words = array('I', words)
+            words[-1] >>= 32 - k % 32
+        if _BIG_ENDIAN:
+            words = array('I', words)
+            words.byteswap()
+        return int.from_bytes(words.tobytes(), 'little')
+
+    def bind(self):
+        """Make the random module's functions use this generator. :return: what unbind() needs."""
+        previous = _bound_functions()
+        for name in previous:
+            setattr(random, name, getattr(self, name))
+        return previous
+
+    @staticmethod
+    def unbind(previous):
+        for name, function in previous.items():
+            setattr(random, name, function)
+
+
+class Tape:
+    """
+    The random words of one recorded run, where every day and phase ends in them, and snapshots.
+
+    :param config: SimulationConfig of the run.
+    """
+
+    def __init__(self, config, words=None, day_ends=None, segments=None, snapshots=None):
+        self.config = config
+        self.words = array('I') if words is None else words
+        self.day_ends = {} if day_ends is None else day_ends        # day -> words used by the end of it
+        self.segments = [] if segments is None else segments        # (day, phase, words used by the end of it)
+        self.snapshots = {} if snapshots is None else snapshots     # day -> Snapshot at the end of it
+
+    @property
+    def last_day(self):
+        return max(self.day_ends, default=0)
+
+    def day_start(self, day):
+        """Position of the first word of `day`."""
+        earlier = [end for recorded, end in self.day_ends.items() if recorded < day]
+        return max(earlier, default=0)
+
+    def phases(self, day):
+        """(phase, words) of every phase of a day that drew anything, in order."""
+        position, phases = self.day_start(day), []
+        for segment_day, phase, end in self.segments:
+            if segment_day == day:
+                if end > position:
+                    phases.append((phase, end - position))
+                position = end
+        return phases
+
+    def draws(self, day):
+        """The words a day used; random() takes two of them, getrandbits(k) k/32 rounded up."""
+        return self.words[self.day_start(day):self.day_ends.get(day, self.day_start(day))]
+
+    def save(self, path, compress_level=1):
+        state = {
+            'config': self.config.to_dict(),
+            'words': self.words.tobytes(),
+            'big_endian': _BIG_ENDIAN,
+            'day_ends': self.day_ends,
+            'segments': self.segments,
+            'snapshots': {day: snapshot.payload for day, snapshot in self.snapshots.items()},
+        }
+        data = zlib.compress(pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL), compress_level)
+        with open(path, 'wb') as f:
+            f.write(_HEADER.pack(MAGIC, TAPE_VERSION, len(data)))
+            f.write(data)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            magic, version, length = _HEADER.unpack(f.read(_HEADER.size))
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a decision tape")
+            if version != TAPE_VERSION:
+                raise ValueError(f"{path} has tape version {version}, this code reads version {TAPE_VERSION}")
+            state = pickle.loads(zlib.decompress(f.read(length)))
+        words = array('I')
+        words.frombytes(state['words'])
+        if state['big_endian'] != _BIG_ENDIAN:
+            words.byteswap()
+        snapshots = {day: Snapshot(day, payload) for day, payload in state['snapshots'].items()}
+        return cls(SimulationConfig.from_dict(state['config']), words, state['day_ends'], state['segments'], snapshots)
+
+
+class _TapeMarks(NullInstruments):
+    # instruments for main() that mark where every phase and day ends on the tape
+    def __init__(self, tape, source):
+        self.tape = tape
+        self.source = source
+        self.day = None
+
+    def begin_day(self, day):
+        self.day = day
+
+    def stop(self, phase, started, calls=1):
+        self.tape.segments.append((self.day, phase, len(self.source.words)))
+
+    def end_day(self, day):
+        self.tape.day_ends[day] = len(self.source.words)
+
+
+class _TraceWindow(NullInstruments):
+    # instruments for main() that turn the events on for the traced days only
+    def __init__(self, first_day, last_day, sink, level):
+        self.first_day = first_day
+        self.last_day = last_day
+        self.sink = sink
+        self.level = level
+        self.previous = None
+
+    def activate(self):
+        self.previous = events.silence()
+
+    def begin_day(self, day):
+        if self.first_day <= day <= self.last_day:
+            events.configure(self.sink, self.level)
+        else:
+            events.silence()
+
+    def deactivate(self):
+        events.configure(*self.previous)
+
+
+class AgentFilterSink:
+    """
+    Passes on the events about one agent: its purchases, trades, sales, mutations and crossovers,
+    and the trace lines that mention it or no agent at all (day headers and the like).
+
+    :param names: every agent's name, to tell traces about other agents apart.
+    """
+
+    def __init__(self, sink, agent, names):
+        self.sink = sink
+        self.agent = agent
+        self.others = [name for name in names if name != agent]
+
+    def write(self, event):
+        if isinstance(event, events.Trace):
+            text = event.text
+            if self.agent in text or not any(name in text for name in self.others):
+                self.sink.write(event)
+        elif self.agent in (getattr(event, 'agent', None), getattr(event, 'agent_a', None), getattr(event, 'agent_b', None)):
+            self.sink.write(event)
+        elif not hasattr(event, 'agent') and not hasattr(event, 'agent_a'):
+            self.sink.write(event)
+
+    def flush(self):
+        self.sink.flush()
+
+    def close(self):
+        self.sink.close()
+
+
+def record_run(days_to_simulate, material_agent=None, agents=None, config=None, snapshot_every=10, on_day_end=None,
+               **main_kwargs):
+    """
+    Run main() silently while recording every random word it uses and a snapshot every
+    snapshot_every days (plus one of the world it starts from).
+
+    :param main_kwargs: further main() arguments, e.g. metrics or fitness_cache; not instruments,
+                        the recorder uses them to mark the days and phases.
+    :return: (agents, Tape)
+    """
+    from .simulation import create_world, main
+
+    config = config or SimulationConfig()
+    if material_agent is None or agents is None:
+        new_material_agent, new_agents = create_world(config)
+        material_agent = new_material_agent if material_agent is None else material_agent
+        agents = new_agents if agents is None else agents
+    start_day = main_kwargs.pop('start_day', 1)
+    main_kwargs.setdefault('write_stats', False)
+
+    tape = Tape(config)
+    source = TapeRandom()
+    source.setstate(random.getstate())
+    tape.words = source.words
+    tape.snapshots[start_day - 1] = Snapshot.capture(start_day - 1, material_agent, agents, source.getstate())
+
+    def snapshot_day(day, material_agent, builder_agents):
+        if day % snapshot_every == 0 or day == days_to_simulate:
+            tape.snapshots[day] = Snapshot.capture(day, material_agent, builder_agents, source.getstate())
+        if on_day_end is not None:
+            on_day_end(day, material_agent, builder_agents)
+
+    previous_events = events.silence()
+    previous_random = source.bind()
+    try:
+        agents = main(days_to_simulate, material_agent, agents, config=config, start_day=start_day,
+                      on_day_end=snapshot_day, instruments=_TapeMarks(tape, source), **main_kwargs)
+    finally:
+        TapeRandom.unbind(previous_random)
+        events.configure(*previous_events)
+    # the random module carries on from where the run left it, as if it had drawn the words itself
+    random.setstate(source.getstate())
+    return agents, tape
+
+
+def replay(tape, first_day, last_day=None, agent=None, sink=None, level=events.DEBUG):
+    """
+    Re-run the days first_day..last_day of a recorded run with tracing on, starting from the
+    nearest snapshot before first_day.
+
+    :param last_day: last day to trace, first_day by default.
+    :param agent: only pass on the events about this agent.
+    :param sink: where the traced events go, a ConsoleSink by default.
+    :param level: lowest event level traced.
+    :return: (material_agent, agents) at the end of last_day.
+    """
+    from .simulation import main
+
+    last_day = first_day if last_day is None else last_day
+    if not tape.snapshots or first_day <= min(tape.snapshots) or last_day > tape.last_day:
+        raise ValueError(f"days {first_day}..{last_day} are outside the recorded run "
+                         f"({min(tape.snapshots, default=0) + 1}..{tape.last_day})")
+    base = max(day for day in tape.snapshots if day < first_day)
+    _, material_agent, agents = tape.snapshots[base].restore(set_random_state=False)
+    if agent is not None:
+        sink = AgentFilterSink(sink or events.ConsoleSink(), agent, [builder.name for builder in agents])
+    # skipping idle days and stopping early decide from what came before; the words are the same without them
+    config = tape.config.replace(skip_idle=False, stop_entropy=None, stop_plateau=None, stop_rank_stable=None)
+
+    source = TapeRandom(tape.words, tape.day_ends.get(base, 0))
+    previous_random = source.bind()
+    try:
+        agents = main(last_day, material_agent, agents, config=config, write_stats=False, start_day=base + 1,
+                      instruments=_TraceWindow(first_day, last_day, sink or events.ConsoleSink(), level))
+    finally:
+        TapeRandom.unbind(previous_random)
+    if source.position != tape.day_ends[last_day]:
+        raise TapeExhausted(f"the replay used {source.position} words by the end of day {last_day}, "
+                            f"the recording {tape.day_ends[last_day]}")
+    return material_agent, agents
+
+
+def cli(argv=None):
+    parser = argparse.ArgumentParser(prog="evobuildsim replay", description="Record a run's random decisions and replay days of it.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    record = commands.add_parser('record', help="run silently and write a decision tape")
+    record.add_argument('--days', type=int, default=50)
+    record.add_argument('--seed', type=int, default=None, help="seed the random module (the tape replays unseeded runs too)")
+    record.add_argument('--engine', choices=('object', 'array'), default='object')
+    record.add_argument('--snapshot-every', type=int, default=10)
+    record.add_argument('--out', default='run.tape')
+    show = commands.add_parser('show', help="replay days of a tape with debug tracing")
+    show.add_argument('tape')
+    show.add_argument('--day', type=int, required=True, help="first day to trace")
+    show.add_argument('--to', type=int, default=None, help="last day to trace (default: --day)")
+    show.add_argument('--agent', default=None, help="only trace the events about this agent")
+    show.add_argument('--level', choices=tuple(events.LEVEL_NAMES), default='debug')
+    args = parser.parse_args(argv)
+
+    if args.command == 'record':
+        if args.seed is not None:
+            random.seed(args.seed)
+        _, tape = record_run(args.days, config=SimulationConfig(days=args.days, engine=args.engine),
+                             snapshot_every=args.snapshot_every)
+        tape.save(args.out)
+        print(f"{len(tape.words)} random words over {tape.last_day} days and {len(tape.snapshots)} snapshots "
+              f"written to {args.out}", file=sys.stderr)
+    else:
+        replay(Tape.load(args.tape), args.day, args.to, args.agent, level=events.LEVEL_NAMES[args.level])
+
+
+if __name__ == "__main__":
+    cli()
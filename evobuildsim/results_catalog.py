@@ -0,0 +1,385 @@
+"""
+SQLite catalog of simulation results across runs.
+
+agent_stats.csv only piles up final-day rows, with nothing saying which run, seed or config they
+came from. The catalog keeps every run as a row of its own, next to the config it ran with:
+
+    configs       one row per distinct SimulationConfig (by digest), the config as JSON
+    runs          config, seed, days, start/finish/record timestamps, code version, source, and the
+                  day and reason of an early stop (convergence.py)
+    agents        agent names
+    final_stats   one row per agent per run, the columns of agent_stats.csv plus the packed genome
+    daily_stats   optional, one row per agent per day (money, houses, genome, fitness)
+    genome_stats  count, sum and sum of squares of the final fitness per (config, genome),
+                  kept up to date on insert so genome rankings never scan final_stats
+
+Every run goes in with bulk inserts in one transaction, the file is in WAL mode so readers
+don't block a writer, and final/daily stats are indexed by run, agent and genome. Queries take a
+config slice, a dict of SimulationConfig fields that must match:
+
+    with ResultsCatalog("results.sqlite") as catalog:
+        catalog.record_replicas(run_replicas(range(100), config))
+        catalog.top_genomes({'mutation_rate': 0.1, 'days': 50}, limit=10)
+
+    evobuildsim replicas --seeds 0-99 --results results.sqlite
+    evobuildsim results top --db results.sqlite --where mutation_rate=0.1 --limit 10
+    evobuildsim results import-csv agent_stats.csv --db results.sqlite
+"""
+import argparse
+import csv
+import json
+import math
+import os
+import sqlite3
+import sys
+import time
+from dataclasses import fields
+
+from .config import SimulationConfig
+from .genome import decode, encode
+from .runner import agent_final_stats
+from .selection import fitness
+
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS configs (config_id INTEGER PRIMARY KEY, digest TEXT UNIQUE, config TEXT)",
+    "CREATE TABLE IF NOT EXISTS runs (run_id INTEGER PRIMARY KEY, config_id INTEGER REFERENCES configs, seed INTEGER,"
+    " days INTEGER, started REAL, finished REAL, recorded REAL, code_version TEXT, source TEXT, stop_day INTEGER,"
+    " stop_reason TEXT)",
+    "CREATE INDEX IF NOT EXISTS runs_config ON runs (config_id, seed)",
+    "CREATE TABLE IF NOT EXISTS agents (agent_id INTEGER PRIMARY KEY, name TEXT UNIQUE)",
+    "CREATE TABLE IF NOT EXISTS final_stats (run_id INTEGER, agent_id INTEGER, genome INTEGER, priority_houses INTEGER,"
+    " build_order TEXT, buyprice INTEGER, sellprice INTEGER, fitness REAL, houses_built INTEGER, money INTEGER,"
+    " excess_items INTEGER, PRIMARY KEY (run_id, agent_id)) WITHOUT ROWID",
+    "CREATE INDEX IF NOT EXISTS final_agent ON final_stats (agent_id, run_id)",
+    "CREATE INDEX IF NOT EXISTS final_genome ON final_stats (genome, fitness)",
+    "CREATE TABLE IF NOT EXISTS daily_stats (run_id INTEGER, day INTEGER, agent_id INTEGER, genome INTEGER,"
+    " money INTEGER, houses_built INTEGER, fitness REAL, PRIMARY KEY (run_id, day, agent_id)) WITHOUT ROWID",
+    "CREATE INDEX IF NOT EXISTS daily_agent ON daily_stats (agent_id, run_id, day)",
+    "CREATE TABLE IF NOT EXISTS genome_stats (config_id INTEGER, genome INTEGER, count INTEGER, total REAL,"
+    " total_sq REAL, best REAL, PRIMARY KEY (config_id, genome)) WITHOUT ROWID",
+)
+CONFIG_FIELDS = frozenset(f.name for f in fields(SimulationConfig))
+UNKNOWN_CONFIG = "unknown"  # digest of the config of imported rows that don't say what they ran with
+# agent_stats.csv header -> final_stats column
+CSV_COLUMNS = {
+    'Name': 'name',
+    'Priority Houses': 'priority_houses',
+    'Build Order': 'build_order',
+    'Buy Price Multiplier': 'buyprice',
+    'Sell Price Multiplier': 'sellprice',
+    'Fitness Score': 'fitness',
+    'Amount of Houses Built': 'houses_built',
+    'Money': 'money',
+    'Number of Excess Material Items': 'excess_items',
+}
+
+
+def _genome_code(build_order, priority_houses, buyprice, sellprice):
+    # None for genomes outside the 768 genotype space, e.g. hand-edited rows
+    try:
+        return encode((build_order, priority_houses, buyprice, sellprice))
+    except (KeyError, ValueError):
+        return None
+
+
+class DailyStats:
+    """
+    on_day_end hook for main() that collects the daily_stats rows of a run for record_run().
+
+    :param every: keep every this many days.
+    """
+
+    def __init__(self, every=1):
+        self.every = every
+        self.rows = []
+
+    def __call__(self, day, material_agent, builder_agents):
+        if day % self.every:
+            return
+        add = self.rows.append
+        for agent in builder_agents:
+            add((day, agent.name, _genome_code(agent.build_order, agent.priority_houses, agent.buyprice, agent.sellprice),
+                 agent.money, agent.houses_built, fitness(agent)))
+
+
+class ResultsCatalog:
+    """
+    :param path: SQLite file, created with its tables and indexes if needed.
+    """
+
+    def __init__(self, path="results.sqlite"):
+        self.path = path
+        # autocommit mode, every write below opens its own transaction
+        self.connection = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        for statement in SCHEMA:
+            self.connection.execute(statement)
+        self._agent_ids = {}
+        self._code_version = None
+
+    @property
+    def code_version(self):
+        if self._code_version is None:
+            from .sweep import code_version
+            self._code_version = code_version()
+        return self._code_version
+
+    # writing
+
+    def _config_id(self, config):
+        if config is None:
+            digest, text = UNKNOWN_CONFIG, None
+        else:
+            digest, text = config.digest(), json.dumps(config.to_dict(), sort_keys=True)
+        self.connection.execute("INSERT OR IGNORE INTO configs (digest, config) VALUES (?, ?)", (digest, text))
+        return self.connection.execute("SELECT config_id FROM configs WHERE digest = ?", (digest,)).fetchone()[0]
+
+    def _agent_id_map(self, names):
+        missing = [name for name in set(names) if name not in self._agent_ids]
+        if missing:
+            self.connection.executemany("INSERT OR IGNORE INTO agents (name) VALUES (?)", [(name,) for name in missing])
+            for start in range(0, len(missing), 500):
+                chunk = missing[start:start + 500]
+                query = f"SELECT name, agent_id FROM agents WHERE name IN ({','.join('?' * len(chunk))})"
+                self._agent_ids.update(self.connection.execute(query, chunk).fetchall())
+        return self._agent_ids
+
+    def _insert(self, config, runs, code_version, source):
+        """
+        Insert runs of one config in a single transaction.
+
+        :param runs: list of (seed, days, started, finished, agent_stats, daily_rows, stop_day, stop_reason),
+                     agent_stats as runner.agent_final_stats() dicts, daily_rows as DailyStats rows.
+        :return: the new run ids.
+        """
+        now = time.time()
+        connection = self.connection
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            config_id = self._config_id(config)
+            agent_ids = self._agent_id_map([agent['name'] for run in runs for agent in run[4]]
+                                           + [row[1] for run in runs for row in run[5] or ()])
+            run_ids, final_rows, daily_rows, genomes = [], [], [], {}
+            for seed, days, started, finished, agent_stats, daily, stop_day, stop_reason in runs:
+                run_id = connection.execute(
+                    "INSERT INTO runs (config_id, seed, days, started, finished, recorded, code_version, source,"
+                    " stop_day, stop_reason) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (config_id, seed, days, started, finished, now, code_version, source, stop_day, stop_reason)).lastrowid
+                run_ids.append(run_id)
+                for agent in agent_stats:
+                    build_order = tuple(agent['build_order'])
+                    genome = _genome_code(build_order, agent['priority_houses'], agent['buyprice'], agent['sellprice'])
+                    final_rows.append((run_id, agent_ids[agent['name']], genome, agent['priority_houses'],
+                                       ', '.join(build_order), agent['buyprice'], agent['sellprice'], agent['fitness'],
+                                       agent['houses_built'], agent['money'], agent['excess_items']))
+                    if genome is not None:
+                        count, total, total_sq, best = genomes.get(genome, (0, 0.0, 0.0, -math.inf))
+                        value = agent['fitness']
+                        genomes[genome] = (count + 1, total + value, total_sq + value * value, max(best, value))
+                for day, name, genome, money, houses_built, value in daily or ():
+                    daily_rows.append((run_id, day, agent_ids[name], genome, money, houses_built, value))
+            connection.executemany("INSERT INTO final_stats VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", final_rows)
+            if daily_rows:
+                connection.executemany("INSERT OR REPLACE INTO daily_stats VALUES (?, ?, ?, ?, ?, ?, ?)", daily_rows)
+            connection.executemany(
+                "INSERT INTO genome_stats VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (config_id, genome) DO UPDATE SET"
+                " count = count + excluded.count, total = total + excluded.total,"
+                " total_sq = total_sq + excluded.total_sq, best = max(best, excluded.best)",
+                [(config_id, genome) + values for genome, values in genomes.items()])
+        except BaseException:
+            connection.execute("ROLLBACK")
+            self._agent_ids.clear()  # ids of names inserted in this transaction are gone again
+            raise
+        connection.execute("COMMIT")
+        return run_ids
+
+    def record_run(self, config, seed, builder_agents, started=None, finished=None, daily=None, source="run",
+                   convergence=None):
+        """
+        Record the final stats of one finished run.
+
+        :param seed: seed the run was started with, None if it wasn't seeded.
+        :param daily: optional DailyStats (or its rows) collected during the run.
+        :param convergence: the run's convergence.ConvergenceMonitor, to record an early stop.
+        :return: the run id.
+        """
+        rows = daily.rows if isinstance(daily, DailyStats) else daily
+        agent_stats = [agent_final_stats(agent) for agent in builder_agents]
+        stop_day, stop_reason = (None, None) if convergence is None else (convergence.stop_day, convergence.stop_reason)
+        return self._insert(config, [(seed, config.days, started, finished, agent_stats, rows, stop_day, stop_reason)],
+                            self.code_version, source)[0]
+
+    def record_replicas(self, results, source="replicas"):
+        """
+        Record every seed of a runner.run_replicas() (or a sweep point's) result in one transaction.
+
+        :return: the new run ids, in seed order.
+        """
+        config = SimulationConfig.from_dict(results['config'])
+        runs = [(result['seed'], config.days, None, None, result['agents'], None, result.get('stop_day'),
+                 result.get('stop_reason')) for result in results['per_seed']]
+        return self._insert(config, runs, self.code_version, source)
+
+    def import_csv(self, path, config=None):
+        """
+        Import an agent_stats.csv written by write_stats_to_csv.
+
+        The file has no run boundaries, so a new run starts whenever a name comes back that the
+        current run already has. The runs get no seed and the given config (None for unknown);
+        runs that stopped early keep their stop day and reason.
+
+        :return: number of runs imported.
+        """
+        runs, current, stops = [], [], []
+        with open(path, newline='') as f:
+            for row in csv.DictReader(f):
+                values = {column: row[header] for header, column in CSV_COLUMNS.items()}
+                if any(agent['name'] == values['name'] for agent in current):
+                    runs.append(current)
+                    current = []
+                if not current:
+                    stop_day = row.get('Stop Day') or None
+                    stops.append((stop_day and int(float(stop_day)), row.get('Stop Reason') or None))
+                for column in ('priority_houses', 'buyprice', 'sellprice', 'houses_built', 'money', 'excess_items'):
+                    values[column] = int(float(values[column]))
+                values['fitness'] = float(values['fitness'])
+                values['build_order'] = values['build_order'].split(', ')
+                current.append(values)
+        if current:
+            runs.append(current)
+        days = config.days if config is not None else None
+        self._insert(config, [(None, days, None, None, agents, None, stop_day, stop_reason)
+                              for agents, (stop_day, stop_reason) in zip(runs, stops)], None,
+                     f"csv:{os.path.basename(path)}")
+        return len(runs)
+
+    # querying
+
+    def _config_filter(self, where):
+        """SQL condition on configs.config for a config slice, with its parameters."""
+        conditions, parameters = [], []
+        for name, value in (where or {}).items():
+            if name not in CONFIG_FIELDS:
+                raise ValueError(f"unknown config field {name!r}")
+            if value is None:
+                conditions.append(f"json_extract(config, '$.{name}') IS NULL")
+            else:
+                conditions.append(f"json_extract(config, '$.{name}') = ?")
+                parameters.append(json.dumps(value, separators=(',', ':')) if isinstance(value, (list, dict)) else value)
+        if not conditions:
+            return "1", []
+        return "config IS NOT NULL AND " + " AND ".join(conditions), parameters
+
+    def runs(self, where=None):
+        """Runs whose config matches the slice, as dicts."""
+        condition, parameters = self._config_filter(where)
+        cursor = self.connection.execute(
+            "SELECT run_id, seed, days, started, finished, recorded, code_version, source, stop_day, stop_reason, digest"
+            " FROM runs"
+            f" JOIN configs USING (config_id) WHERE config_id IN (SELECT config_id FROM configs WHERE {condition})"
+            " ORDER BY run_id", parameters)
+        names = [column[0] for column in cursor.description]
+        return [dict(zip(names, row)) for row in cursor]
+
+    def config(self, run_id):
+        """SimulationConfig of a run, None if it is unknown."""
+        row = self.connection.execute("SELECT config FROM runs JOIN configs USING (config_id) WHERE run_id = ?",
+                                      (run_id,)).fetchone()
+        return None if row is None or row[0] is None else SimulationConfig.from_dict(json.loads(row[0]))
+
+    def final_stats(self, run_id):
+        """Final-day stats of every agent of a run, by fitness, in the agent_final_stats() format."""
+        cursor = self.connection.execute(
+            "SELECT name, priority_houses, build_order, buyprice, sellprice, fitness, houses_built, money, excess_items"
+            " FROM final_stats JOIN agents USING (agent_id) WHERE run_id = ? ORDER BY fitness DESC", (run_id,))
+        names = [column[0] for column in cursor.description]
+        rows = [dict(zip(names, row)) for row in cursor]
+        for row in rows:
+            row['build_order'] = row['build_order'].split(', ')
+        return rows
+
+    def daily_stats(self, run_id, agent=None):
+        """(day, agent, genome, money, houses_built, fitness) rows of a run, optionally of one agent."""
+        query = ("SELECT day, name, genome, money, houses_built, fitness FROM daily_stats JOIN agents USING (agent_id)"
+                 " WHERE run_id = ?")
+        if agent is None:
+            return self.connection.execute(query + " ORDER BY day, agent_id", (run_id,)).fetchall()
+        return self.connection.execute(query + " AND name = ? ORDER BY day", (run_id, agent)).fetchall()
+
+    def top_genomes(self, where=None, limit=10, min_count=1):
+        """
+        Genomes with the best mean final fitness over the runs of a config slice.
+
+        :param where: dict of SimulationConfig fields to match, e.g. {'mutation_rate': 0.1}; None for all runs.
+        :param min_count: leave out genomes with fewer final-day samples.
+        :return: list of dicts with the genome fields, count, mean, stdev and best, best mean first.
+        """
+        condition, parameters = self._config_filter(where)
+        rows = self.connection.execute(
+            "SELECT genome, SUM(count) AS n, SUM(total) AS t, SUM(total_sq), MAX(best) FROM genome_stats"
+            f" WHERE config_id IN (SELECT config_id FROM configs WHERE {condition})"
+            " GROUP BY genome HAVING n >= ? ORDER BY t / n DESC LIMIT ?", parameters + [min_count, limit]).fetchall()
+        top = []
+        for genome, count, total, total_sq, best in rows:
+            build_order, priority_houses, buyprice, sellprice = decode(genome)
+            mean = total / count
+            variance = max(total_sq - total * mean, 0.0) / (count - 1) if count > 1 else 0.0
+            top.append({'build_order': ', '.join(build_order), 'priority_houses': priority_houses, 'buyprice': buyprice,
+                        'sellprice': sellprice, 'count': count, 'mean': mean, 'stdev': math.sqrt(variance), 'best': best})
+        return top
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _parse_where(items):
+    where = {}
+    for item in items:
+        name, _, text = item.partition('=')
+        try:
+            where[name] = json.loads(text)
+        except ValueError:
+            where[name] = text
+    return where
+
+
+def cli(argv=None):
+    parser = argparse.ArgumentParser(prog="evobuildsim results", description="Query and fill the SQLite results catalog.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    top = commands.add_parser('top', help="genomes with the best mean final fitness")
+    runs = commands.add_parser('runs', help="list the runs of a config slice")
+    importer = commands.add_parser('import-csv', help="import an agent_stats.csv")
+    importer.add_argument('csv', nargs='?', default='agent_stats.csv')
+    for command in (top, runs, importer):
+        command.add_argument('--db', default='results.sqlite', help="catalog file (default: results.sqlite)")
+    for command in (top, runs):
+        command.add_argument('--where', action='append', default=[], metavar='FIELD=VALUE',
+                             help="config field the runs must have, values are read as JSON, e.g. mutation_rate=0.1")
+    top.add_argument('--limit', type=int, default=10)
+    top.add_argument('--min-count', type=int, default=1)
+    args = parser.parse_args(argv)
+
+    with ResultsCatalog(args.db) as catalog:
+        if args.command == 'import-csv':
+            print(f"{catalog.import_csv(args.csv)} runs imported from {args.csv} into {args.db}", file=sys.stderr)
+        elif args.command == 'runs':
+            for run in catalog.runs(_parse_where(args.where)):
+                print(json.dumps(run))
+        else:
+            for row in catalog.top_genomes(_parse_where(args.where), args.limit, args.min_count):
+                print(f"{row['mean']:8.4f} ± {row['stdev']:.4f}  n={row['count']:<6} best {row['best']:.4f}  "
+                      f"{row['build_order']} | {row['priority_houses']} | {row['buyprice']} | {row['sellprice']}")
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,98 @@
+"""
+Per-purpose random streams.
+
+By default the simulation draws everything from the global random module, in the order the
+agents happen to be in, which is what keeps runs identical to the original script. With
+SimulationConfig(rng="streams") main() takes its randomness from RngStreams instead:
+
+    forced_buy  one uniform per agent per material per request day
+    mutation    four gene rolls, a build order, a buyprice and a sellprice per agent per mutation day
+    selection   a random.Random per GA day for the parent selection operator
+
+Every block is drawn in one NumPy call from a generator seeded with (root seed, purpose, day),
+and an agent's row in it is the rank of its name among all agents. A draw therefore depends
+on who and when it is for, not on the order the agents are walked in, on the engine, on
+skipped idle days or on the process the agent runs in. Needs numpy.
+
+    main(50, config=SimulationConfig(rng="streams", rng_seed=7))
+"""
+import random
+
+from .simulation import MATERIAL_COLUMN
+
+
+PURPOSES = {'forced_buy': 1, 'mutation': 2, 'selection': 3}
+MATERIALS = tuple(MATERIAL_COLUMN)
+
+
+def _require_numpy():
+    try:
+        import numpy
+    except ImportError as error:
+        raise ImportError('rng="streams" needs numpy: pip install numpy') from error
+    return numpy
+
+
+class RngStreams:
+    """
+    :param root_seed: seed every stream is derived from.
+    """
+
+    def __init__(self, root_seed=0):
+        self.np = _require_numpy()
+        self.root_seed = root_seed
+        self._rows = {}
+
+    def bind(self, builder_agents):
+        """Give every agent its row: the rank of its name, so any ordering of the same agents gets the same rows."""
+        names = sorted(agent.name for agent in builder_agents)
+        if len(set(names)) != len(names):
+            raise ValueError('rng="streams" keys the draws by agent name, the names must be unique')
+        self._rows = {name: row for row, name in enumerate(names)}
+
+    def rows(self, builder_agents):
+        """Row of every agent, in the agents' order, as an int array."""
+        if len(self._rows) != len(builder_agents):
+            self.bind(builder_agents)
+        try:
+            rows = [self._rows[agent.name] for agent in builder_agents]
+        except KeyError:
+            self.bind(builder_agents)
+            rows = [self._rows[agent.name] for agent in builder_agents]
+        return self.np.array(rows, dtype=self.np.intp)
+
+    def generator(self, purpose, day):
+        np = self.np
+        return np.random.Generator(np.random.PCG64(np.random.SeedSequence([self.root_seed, PURPOSES[purpose], day])))
+
+    def forced_buy_block(self, day, builder_agents, materials=MATERIALS):
+        """
+        Forced-buy rolls of a request day, shape agents x materials in the agents' order.
+
+        :param materials: column order, e.g. the population engine's materials.
+        """
+        rows = self.rows(builder_agents)
+        block = self.generator('forced_buy', day).random((len(self._rows), len(MATERIALS)))[rows]
+        if tuple(materials) != MATERIALS:
+            block = block[:, [MATERIAL_COLUMN[material] for material in materials]]
+        return block
+
+    def forced_buy_rows(self, day, builder_agents):
+        """The same rolls as lists, one per agent, indexed by MATERIAL_COLUMN, for request_materials."""
+        return self.forced_buy_block(day, builder_agents).tolist()
+
+    def mutation_rows(self, day, builder_agents):
+        """
+        Mutation draws of a mutation day for perform_mutation, one list per agent: four uniform
+        gene rolls, a build order permutation index (0..5), a buyprice and a sellprice (1..8).
+        """
+        rows = self.rows(builder_agents)
+        generator = self.generator('mutation', day)
+        n = len(self._rows)
+        rolls = generator.random((n, 4))
+        values = self.np.column_stack((generator.integers(0, 6, n), generator.integers(1, 9, (n, 2))))
+        return [roll + value for roll, value in zip(rolls[rows].tolist(), values[rows].tolist())]
+
+    def selection(self, day):
+        """A random.Random for the parent selection of a GA day."""
+        return random.Random(int(self.np.random.SeedSequence([self.root_seed, PURPOSES['selection'], day]).generate_state(1)[0]))
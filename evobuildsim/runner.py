@@ -0,0 +1,217 @@
+"""
+Multi-seed replica runner.
+
+The runner builds an isolated world from a config for every seed, fans the seeds out over a
+ProcessPoolExecutor and aggregates the final stats per seed. Every replica seeds the random module itself and starts from a fresh world,
+so the per-seed results do not depend on the worker count or the chunking.
+
+Usage:
+    evobuildsim replicas --seeds 0-99 --days 50 --workers 8 --chunksize 4 --out replicas.json
+"""
+import argparse
+import json
+import random
+import statistics
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from . import events, simulation
+from .config import SimulationConfig
+from .convergence import ConvergenceMonitor
+
+
+def agent_final_stats(agent):
+    """Final-day stats of one agent, the same columns as write_stats_to_csv."""
+    return {
+        'name': agent.name,
+        'priority_houses': agent.priority_houses,
+        'build_order': list(agent.build_order),
+        'buyprice': agent.buyprice,
+        'sellprice': agent.sellprice,
+        'fitness': agent.houses_built + (agent.money / 1000000),
+        'houses_built': agent.houses_built,
+        'money': agent.money,
+        'excess_items': sum(agent.excess_materials.values()),
+    }
+
+
+def run_replica(config, seed, fitness_cache=None):
+    """
+    Run one seeded simulation in a fresh world and return its final stats, with the day and the
+    reason it stopped early on (None if it ran all days, see convergence.py).
+
+    :param fitness_cache: optional fitness_cache.FitnessCache passed on to main().
+    """
+    random.seed(seed)
+    if config.rng == "streams":
+        config = config.replace(rng_seed=seed)
+    material_agent, agents = simulation.create_world(config)
+    monitor = ConvergenceMonitor.from_config(config)
+    previous = events.silence()
+    try:
+        agents = simulation.main(config.days, material_agent=material_agent, agents=agents, config=config,
+                                 write_stats=False, fitness_cache=fitness_cache,
+                                 convergence=monitor if monitor.active else None)
+    finally:
+        events.configure(*previous)
+    return {'seed': seed, 'agents': [agent_final_stats(agent) for agent in agents],
+            'stop_day': monitor.stop_day, 'stop_reason': monitor.stop_reason}
+
+
+def _run_chunk(config, seeds, fitness_snapshot=None):
+    if fitness_snapshot is None:
+        return [run_replica(config, seed) for seed in seeds]
+    # every replica reads the snapshot taken before any of them ran and hands back what it recorded
+    from .fitness_cache import FitnessCache
+    results = []
+    for seed in seeds:
+        cache = FitnessCache(snapshot=fitness_snapshot)
+        result = run_replica(config, seed, cache)
+        result['fitness_samples'] = [(key, (stats.count, stats.mean, stats.m2)) for key, stats in cache.pending.items()]
+        results.append(result)
+    return results
+
+
+def aggregate(per_seed):
+    """
+    Aggregate per-seed results into per-agent and per-genome summaries.
+
+    :param per_seed: list of run_replica() results.
+    :return: dict with the replica count, per-agent fitness stats and per-genome fitness stats.
+    """
+    by_agent = {}
+    by_genome = {}
+    houses = []
+    stopped = {}
+    stop_days = []
+    for result in per_seed:
+        houses.append(sum(agent['houses_built'] for agent in result['agents']))
+        if result.get('stop_reason') is not None:
+            stopped[result['stop_reason']] = stopped.get(result['stop_reason'], 0) + 1
+            stop_days.append(result['stop_day'])
+        for agent in result['agents']:
+            by_agent.setdefault(agent['name'], []).append(agent['fitness'])
+            genome = (', '.join(agent['build_order']), agent['priority_houses'], agent['buyprice'], agent['sellprice'])
+            by_genome.setdefault(genome, []).append(agent['fitness'])
+
+    def describe(values):
+        return {
+            'count': len(values),
+            'mean': statistics.fmean(values),
+            'stdev': statistics.stdev(values) if len(values) > 1 else 0.0,
+            'min': min(values),
+            'max': max(values),
+        }
+
+    genomes = [
+        dict(describe(values), build_order=genome[0], priority_houses=genome[1], buyprice=genome[2], sellprice=genome[3])
+        for genome, values in by_genome.items()
+    ]
+    genomes.sort(key=lambda row: row['mean'], reverse=True)
+    return {
+        'replicas': len(per_seed),
+        'total_houses': describe(houses) if houses else None,
+        'stopped_early': dict(sorted(stopped.items())),
+        'stop_day': describe(stop_days) if stop_days else None,
+        'agents': {name: describe(values) for name, values in sorted(by_agent.items())},
+        'genomes': genomes,
+    }
+
+
+def run_replicas(seeds, config=None, workers=None, chunksize=1, fitness_cache_path=None):
+    """
+    Run one replica per seed on a process pool.
+
+    :param seeds: iterable of integer seeds.
+    :param config: SimulationConfig, defaults to SimulationConfig().
+    :param workers: number of worker processes, None for os.cpu_count(), 0 to run in this process.
+    :param chunksize: number of seeds handed to a worker at a time, at least 1.
+    :param fitness_cache_path: SQLite file of a FitnessCache, None for no cache. Every replica reads the
+                               cache as it was before the first one started, and what they all recorded
+                               is added to it at the end, so the results don't depend on workers or chunksize.
+    :return: dict with 'config', 'per_seed' (ordered by seed) and 'summary'.
+    """
+    if chunksize < 1:
+        raise ValueError(f"chunksize must be at least 1, got {chunksize}")
+    config = config or SimulationConfig()
+    seeds = sorted(set(seeds))
+    chunks = [seeds[i:i + chunksize] for i in range(0, len(seeds), chunksize)]
+    snapshot = None
+    if fitness_cache_path is not None:
+        from .fitness_cache import FitnessCache
+        with FitnessCache(fitness_cache_path) as cache:
+            snapshot = cache.snapshot(config)
+
+    if workers == 0:
+        per_seed = [result for chunk in chunks for result in _run_chunk(config, chunk, snapshot)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            per_seed = [result for chunk in pool.map(_run_chunk, [config] * len(chunks), chunks,
+                                                     [snapshot] * len(chunks)) for result in chunk]
+
+    per_seed.sort(key=lambda result: result['seed'])
+    if fitness_cache_path is not None:
+        from .fitness_cache import FitnessStats
+        with FitnessCache(fitness_cache_path) as cache:
+            for result in per_seed:
+                cache.merge({key: FitnessStats(*values) for key, values in result.pop('fitness_samples')})
+    return {'config': config.to_dict(), 'per_seed': per_seed, 'summary': aggregate(per_seed)}
+
+
+def parse_seeds(text):
+    """Parse '0-99', '1,5,9' or a mix like '0-9,42' into a list of seeds."""
+    seeds = []
+    for piece in text.split(','):
+        if '-' in piece:
+            low, high = piece.split('-')
+            seeds.extend(range(int(low), int(high) + 1))
+        elif piece:
+            seeds.append(int(piece))
+    return seeds
+
+
+def cli(argv=None):
+    parser = argparse.ArgumentParser(description="Run seeded simulation replicas on a process pool.")
+    parser.add_argument('--seeds', default='0-9', help="seeds to run, e.g. 0-99 or 1,5,9 (default 0-9)")
+    parser.add_argument('--days', type=int, default=50)
+    parser.add_argument('--engine', choices=['object', 'array'], default='object')
+    parser.add_argument('--clearing', choices=['sequential', 'pro_rata', 'price_weighted'], default='sequential')
+    parser.add_argument('--workers', type=int, default=None, help="worker processes, 0 runs in-process (default: cpu count)")
+    parser.add_argument('--chunksize', type=int, default=1, help="seeds handed to a worker at a time (default 1)")
+    parser.add_argument('--rng', choices=['global', 'streams'], default='global')
+    parser.add_argument('--fitness-cache', default=None, metavar='PATH', help="genotype fitness cache shared between runs")
+    parser.add_argument('--surrogate', action='store_true', help="pre-screen offspring with the fitness cache")
+    parser.add_argument('--stop-entropy', type=float, default=None, metavar='BITS',
+                        help="stop a replica once its genotype entropy is at or below this")
+    parser.add_argument('--stop-plateau', type=int, default=None, metavar='CHECKS',
+                        help="stop a replica after this many mutation/GA days in a row without fitness gains")
+    parser.add_argument('--plateau-tolerance', type=float, default=0.01, metavar='FRACTION',
+                        help="fitness growth relative to its level that still counts as no gain (default 0.01)")
+    parser.add_argument('--stop-rank-stable', type=int, default=None, metavar='CHECKS',
+                        help="stop a replica after this many mutation/GA days in a row with a stable fitness ranking")
+    parser.add_argument('--results', default=None, metavar='PATH', help="also record every run in this SQLite results catalog")
+    parser.add_argument('--out', default=None, help="write the results as JSON to this file instead of stdout")
+    args = parser.parse_args(argv)
+    if args.chunksize < 1:
+        parser.error("--chunksize must be at least 1")
+
+    config = SimulationConfig(days=args.days, engine=args.engine, clearing=args.clearing, rng=args.rng,
+                              surrogate=args.surrogate, stop_entropy=args.stop_entropy, stop_plateau=args.stop_plateau,
+                              plateau_tolerance=args.plateau_tolerance, stop_rank_stable=args.stop_rank_stable)
+    results = run_replicas(parse_seeds(args.seeds), config, workers=args.workers, chunksize=args.chunksize,
+                           fitness_cache_path=args.fitness_cache)
+    if args.results:
+        from .results_catalog import ResultsCatalog
+        with ResultsCatalog(args.results) as catalog:
+            catalog.record_replicas(results)
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"{results['summary']['replicas']} replicas written to {args.out}")
+    else:
+        json.dump(results['summary'], sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    cli()
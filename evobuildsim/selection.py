@@ -0,0 +1,127 @@
+"""
+Parent selection operators for the genetic algorithm.
+
+The fitness table is built once per generation (one fitness evaluation per agent and one
+cumulative sum), after which picks are cheap:
+
+    roulette   bisect on the cumulative fitness, O(log n) per pick
+    alias      Vose's alias method, O(1) per pick after an O(n) build
+    sus        stochastic universal sampling, all k picks in one O(n + k) sweep
+    tournament best of `tournament_size` random agents, O(size) per pick
+
+"roulette" draws exactly the same random numbers as the original linear-scan
+roulette_wheel_selection, so it selects the same agents for the same seed.
+"""
+import random
+from bisect import bisect_right
+from itertools import accumulate
+
+
+OPERATORS = ('roulette', 'alias', 'sus', 'tournament')
+
+
+def fitness(agent):
+    """Fitness of an agent: houses built plus money in millions."""
+    return agent.houses_built + (agent.money / 1000000)
+
+
+class FitnessTable:
+    """
+    Fitness scores and cumulative fitness of one generation.
+
+    :param agents: the population, in the order the wheel is laid out.
+    """
+
+    def __init__(self, agents):
+        self.agents = list(agents)
+        self.scores = [fitness(agent) for agent in self.agents]
+        self.cumulative = list(accumulate(self.scores))
+        self.total = sum(self.scores)  # sum of all fitness scores
+        self._alias = None
+
+    def roulette(self, count, rng=random):
+        """Pick `count` agents with a random point on the wheel each, located by bisection."""
+        selected = []
+        for _ in range(count):
+            selection_point = rng.uniform(0, self.total)  # Random point on the roulette wheel
+            index = bisect_right(self.cumulative, selection_point)
+            if index < len(self.agents):  # a point at the very end of the wheel selects nobody, as before
+                selected.append(self.agents[index])
+        return selected
+
+    def alias(self, count, rng=random):
+        """Pick `count` agents in O(1) each with Vose's alias method."""
+        if self._alias is None:
+            self._alias = self._build_alias()
+        probability, alias = self._alias
+        n = len(self.agents)
+        selected = []
+        for _ in range(count):
+            column = int(rng.random() * n)
+            selected.append(self.agents[column if rng.random() < probability[column] else alias[column]])
+        return selected
+
+    def _build_alias(self):
+        n = len(self.agents)
+        scaled = [score * n / self.total for score in self.scores]
+        probability, alias = [1.0] * n, list(range(n))
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            low, high = small.pop(), large.pop()
+            probability[low], alias[low] = scaled[low], high
+            scaled[high] -= 1.0 - scaled[low]
+            (small if scaled[high] < 1.0 else large).append(high)
+        return probability, alias
+
+    def stochastic_universal(self, count, rng=random):
+        """Pick `count` agents with evenly spaced pointers from a single random start."""
+        if count <= 0:
+            return []
+        step = self.total / count
+        pointer = rng.uniform(0, step)
+        selected = []
+        index = 0
+        for _ in range(count):
+            while index < len(self.agents) - 1 and self.cumulative[index] <= pointer:
+                index += 1
+            selected.append(self.agents[index])
+            pointer += step
+        return selected
+
+    def tournament(self, count, tournament_size=3, rng=random):
+        """Pick `count` agents, each the fittest of `tournament_size` agents drawn at random."""
+        n = len(self.agents)
+        size = min(tournament_size, n)
+        selected = []
+        for _ in range(count):
+            contestants = rng.sample(range(n), size)
+            selected.append(self.agents[max(contestants, key=self.scores.__getitem__)])
+        return selected
+
+    def select(self, count, operator='roulette', tournament_size=3, rng=random):
+        """Pick `count` parents with the given operator (see OPERATORS)."""
+        if operator not in OPERATORS:
+            raise ValueError(f"unknown selection operator {operator!r}, expected one of {OPERATORS}")
+        if not self.agents or count <= 0:
+            return []
+        if operator == 'tournament':
+            return self.tournament(count, tournament_size, rng)
+        if self.total <= 0:
+            return []  # nothing to weigh the wheel with
+        if operator == 'roulette':
+            return self.roulette(count, rng)
+        if operator == 'alias':
+            return self.alias(count, rng)
+        return self.stochastic_universal(count, rng)
+
+
+def select_parents(builder_agents, parents=4, operator='roulette', tournament_size=3, rng=random):
+    """Build the generation's fitness table once and pick `parents` agents from it."""
+    return FitnessTable(builder_agents).select(parents, operator, tournament_size, rng)
+
+
+def selection_batches(selected_agents, batch_size=2):
+    """Split selected parents into batches for perform_crossover (pairs by default)."""
+    for start in range(0, len(selected_agents), batch_size):
+        yield selected_agents[start:start + batch_size]
@@ -0,0 +1,1089 @@
+import random
+import os
+from collections.abc import Mapping
+from itertools import repeat
+from . import events
+from . import instrumentation
+from .events import DEBUG, INFO
+from .instrumentation import NULL_INSTRUMENTS
+from .order_book import clear_order_books
+from .selection import select_parents, selection_batches
+from .config import SimulationConfig
+from .convergence import ConvergenceMonitor
+from .houses import STANDARD, HouseType, resolve as resolve_house_type
+"""
+This Multi-Agent System (MAS) is an simulation platform that models a competitive environment where multiple building agents, 
+each with unique strategies, compete to construct houses as efficiently and profitably as possible.
+The system integrates simple economic behaviors, 
+trading dynamics, and evolutionary algorithms to explore and optimize construction strategies under variable market conditions.
+Each agent in the simulation possesses individualized attributes like build order, financial strategies (buyprice and sellprice),
+and the capability to work on multiple houses simultaneously. This diversity introduces a rich variety of tactics and outcomes.
+The system includes a Material Agent that manages a market with a finite inventory of construction materials. 
+Agents will strategically purchase these materials, build houses, and sell them for profit.
+a forced buy can occur, where an agent is forced to buy 3 extra units of a material, for some extra randomness in the system.
+ On reoccuring trading days, agents can trade excess materials among themselves. This feature introduces an 
+additional layer of strategy as agents must decide when to buy, sell, or trade based on their current needs and future projections.
+The simulation incorporates genetic algorithms to drive evolutionary improvements in agent strategies. Every few days, agents undergo a roullete wheel 
+selection process based on their 'fitness', which considers both the number of houses built and their financial health. 
+Successful strategies are crossbred, promoting the development of more effective building strategies over time.
+To maintain genetic diversity and adaptability, the system occasionally mutates agent attributes. This mutation can alter build orders, financial strategies, 
+and the number of houses an agent aims to build simultaneously, allowing the system to explore new and potentially more effective strategies.
+Comprehensive tracking of each agent's performance is conducted, including the number of houses builtz    , remaining funds, and material inventory. 
+This data is periodically saved to external files in Excel and CSV formats for further analysis and visualization
+Below are some static requirements and prices for building a house and buying materials.
+
+Requirements to build 1 house:
+Total Windows: 8 (bedrooms) + 3 (living room) + 1 (hall) + 3 (garret) = 15 windows
+Total Doors: 4 (bedrooms) + 2 (bathrooms) + 1 (living room) + 1 (garret) = 8 doors (interior)
+Total Outside Doors: 1 (hall) = 1 outside door
+Total Wall Modules: 4 (bedrooms) + 2 (bathrooms) + 1 (living room) + 1 (hall) + 1 (garret) = 9 wall modules
+Total Toilet Seats: 2 (bathrooms) = 2 toilet seats
+Total Tabs: 2 (bathrooms) = 2 tabs
+Total Shower Cabins: 2 (bathrooms) = 2 shower cabins
+
+Requirements for 4 building agents to build 2 houses each. 
+Total Windows: 15 windows/house * 8 houses = 120 windows
+Total Interior Doors: 8 doors/house * 8 houses = 64 interior doors
+Total Outside Doors: 1 outside door/house * 8 houses = 8 outside doors
+Total Wall Modules: 9 wall modules/house * 8 houses = 72 wall modules
+Total Toilet Seats: 2 toilet seats/house * 8 houses = 16 toilet seats
+Total Tabs: 2 tabs/house * 8 houses = 16 tabs
+Total Shower Cabins: 2 shower cabins/house * 8 houses = 16 shower cabins
+
+Warehouse storage capacity for each item with 80% of the requirements for 8 houses:
+rounded down to the nearest whole number
+Windows: 120 * 0.8 = 96 windows
+Interior Doors: 64 * 0.8 = 51 interior doors
+Outside Doors: 8 * 0.8 = 6 outside doors
+Wall Modules: 72 * 0.8 = 57 wall modules 
+Toilet Seats: 16 * 0.8 = 12 toilet seats
+Tabs: 16 * 0.8 = 12 tabs
+Shower Cabins: 16 * 0.8 = 12 shower cabins
+
+requirements for each section of the house:
+Floor: 4 bedrooms, 2 bathrooms, 1 living room.
+Floor components: 
+4 bedrooms = 8 windows, 4 doors, 4 wall modules
+2 bathrooms =  2 doors, 2 wall modules, 2 toilet seats, 2 tabs, 2 shower cabins
+1 living room = 3 windows, 1 door, 1 wall module
+total floor requirements : 11 windows, 7 doors, 7 wall modules, 2 toilet seats, 2 tabs, 2 shower cabins
+
+Hall: 1 outside-door, 1 window, 1 wall module
+Garret: 3 windows, 1 door, 1 wall module
+
+prices
+Item           Quantity    Price    Description
+Door           1           2500     Inside door for the rooms and the toilet, etc.
+Outside-Door   1           8500     door only for hall
+Window         1           3450     All windows are the same.
+Wall-Module    1           75000    A 4-wall module making a room
+Toilet-Seat    1           2995
+Tab            1           2350
+Shower Cabin   1           8300
+
+total cost for 1 house:
+15 windows * 3450 = 51750
+8 doors * 2500 = 20000
+1 outside door * 8500 = 8500
+9 wall modules * 75000 = 675000
+2 toilet seats * 2995 = 5990
+2 tabs * 2350 = 4700
+2 shower cabins * 8300 = 16600
+total cost = 782540
+sell price = 900000
+"""
+
+
+# Warehouse storage capacity for each item, 80% of the requirements for 8 houses (see above)
+WAREHOUSE_CAPACITY = {
+    'doors': 51,
+    'outside_doors': 6,
+    'windows': 96,
+    'wall_modules': 57,
+    'toilet_seats': 12,
+    'tabs': 12,
+    'shower_cabins': 12,
+}
+# column of every material in per-agent forced-buy rolls (rng.RngStreams)
+MATERIAL_COLUMN = {material: column for column, material in enumerate(WAREHOUSE_CAPACITY)}
+# build order permutations a streams mutation picks from, as positions in the current order
+ORDER_PERMUTATIONS = ((0, 1, 2), (0, 2, 1), (1, 0, 2), (1, 2, 0), (2, 0, 1), (2, 1, 0))
+
+
+class MaterialAgent:
+    def __init__(self, inventory_multiplier=3):
+        """
+        :param inventory_multiplier: stock this many times WAREHOUSE_CAPACITY, 3 for the 12 default builders.
+        """
+        self.capacity = {material: quantity * inventory_multiplier for material, quantity in WAREHOUSE_CAPACITY.items()}
+        self.inventory = dict(self.capacity)
+        self.prices = {
+        'doors': 2500,
+        'outside_doors': 8500,
+        'windows': 3450,
+        'wall_modules': 75000,
+        'toilet_seats': 2995,
+        'tabs': 2350,
+        'shower_cabins': 8300,
+        }
+
+    def restock_materials(self):
+        # back to full capacity, 80% of 2 houses each for 4*3 builders by default
+        for material, quantity in self.capacity.items(): # Iterate over the restock quantities
+            self.inventory[material] = quantity  # Reset to maximum capacity
+
+    def process_request(self, materials_requested, building_agent):
+        materials_provided = {}
+        for material, quantity_requested in materials_requested.items():
+            available_quantity = self.inventory.get(material, 0)
+            
+            if available_quantity > 0:
+                cost_per_unit = self.prices[material]
+                affordable_quantity = min(quantity_requested, building_agent.money // cost_per_unit, available_quantity)
+
+                if affordable_quantity > 0:
+                    cost = affordable_quantity * cost_per_unit
+                    building_agent.money -= cost
+                    self.inventory[material] -= affordable_quantity
+                    materials_provided[material] = affordable_quantity
+                    if events.info_enabled:
+                        events.emit(events.Purchase(building_agent.name, material, affordable_quantity, cost))
+                    if instrumentation.enabled:
+                        instrumentation.count_purchase(building_agent.name)
+                elif events.debug_enabled:
+                    events.trace(DEBUG, f"{building_agent.name} cannot afford any units of {material}.")
+            elif events.debug_enabled:
+                # Report when there is not enough material in the inventory
+                events.trace(DEBUG, f"Not enough {material} in inventory for {building_agent.name}'s request.")
+
+        return materials_provided
+
+
+
+    def __repr__(self):
+        """
+        Representation of a MaterialAgent object for debugging and logging.
+        """
+        return f"MaterialAgent Inventory: {self.inventory}"
+
+
+
+class HouseProgress(Mapping):
+    """
+    Construction progress of one house.
+
+    Reads like the old progress dict (house[part][material], items(), printing), but every change
+    goes through add()/set(), which keep a running count of missing units per part and the number
+    of completed parts. "What do I need next", "is this part done" and "is this house done" are
+    then lookups instead of rescans of part_requirements.
+    """
+
+    __slots__ = ('house_type', 'requirements', 'parts', 'remaining', 'parts_completed')
+
+    def __init__(self, house_type=STANDARD):
+        """
+        :param house_type: houses.HouseType to build, or a part -> {material: required units} dict.
+        """
+        if not isinstance(house_type, HouseType):
+            house_type = HouseType('custom', house_type, STANDARD.sell_price)
+        self.house_type = house_type
+        self.requirements = house_type.part_requirements
+        self.parts = {part: dict(materials) for part, materials in house_type.empty_parts.items()}
+        self.remaining = dict(house_type.totals)
+        self.parts_completed = sum(1 for missing in self.remaining.values() if missing == 0)
+
+    def reset(self):
+        """Back to an empty house of the same type, refilling the part dicts in place."""
+        for part, empty in self.house_type.empty_parts.items():
+            self.parts[part].update(empty)
+        self.remaining.update(self.house_type.totals)
+        self.parts_completed = sum(1 for missing in self.remaining.values() if missing == 0)
+
+    def __getitem__(self, part):
+        return self.parts[part]
+
+    def __iter__(self):
+        return iter(self.parts)
+
+    def __len__(self):
+        return len(self.parts)
+
+    def __repr__(self):
+        return repr(self.parts)
+
+    def set(self, part, material, quantity):
+        """Set the acquired units of a material for a part and update the deficit counters."""
+        required = self.requirements[part][material]
+        was_done = self.remaining[part] == 0
+        self.remaining[part] += max(required - quantity, 0) - max(required - self.parts[part][material], 0)
+        self.parts[part][material] = quantity
+        self.parts_completed += (self.remaining[part] == 0) - was_done
+
+    def add(self, part, material, quantity):
+        self.set(part, material, self.parts[part][material] + quantity)
+
+    def part_done(self, part):
+        return self.remaining[part] == 0
+
+    def is_complete(self):
+        return self.parts_completed == len(self.parts)
+
+    def current_part(self, build_order):
+        """First unfinished part in the build order, None when the house is complete."""
+        for part in build_order:
+            if self.remaining[part]:
+                return part
+        return None
+
+    def needs(self, build_order):
+        """Missing units per material for the current part, {} when the house is complete."""
+        part = self.current_part(build_order)
+        if part is None:
+            return {}
+        acquired = self.parts[part]
+        return {material: required - acquired[material]
+                for material, required in self.requirements[part].items() if required > acquired[material]}
+
+
+class BuildingAgent:
+
+    # requirements of the standard house, an agent's own type is in self.house_type (see houses.py)
+    part_requirements = STANDARD.part_requirements
+
+
+# Overall, attributes initialized inside __init__ are specific to each instance and may vary depending on the parameters passed during object creation, 
+# while attributes initialized outside __init__ are shared among all instances of the class and have default values defined within the class.
+
+
+    def __init__(self, name, priority_houses, build_order, buyprice, sellprice, money, house_type=None):
+        """
+        Initializes a BuildingAgent object with given attributes.
+
+        :param priority_houses: An integer indicating the number of houses the agent prefers to build simultaneously (1 or 2).
+        :param build_order: A list of strings indicating the preferred build order for parts of the house, e.g., ['floor', 'garret', 'hall'].
+        :param money: A float representing the amount of money the agent is holding.
+        :param house_type: houses.HouseType or the name of a built-in one, the standard house by default.
+        """
+        self.house_type = resolve_house_type(house_type)
+        self.priority_houses = priority_houses
+        self.current_focus_house = 0
+        self.build_order = build_order
+        self.money = money
+        self.name = name
+        self.houses_built = 0
+        self.buyprice = buyprice
+        self.sellprice = sellprice
+        self.strategy_attributes = {'name': name, 'build_order': build_order, 'priority_houses': priority_houses, 'buyprice': buyprice, 'sellprice': sellprice}
+
+        self.construction_progress = [self.new_house() for _ in range(priority_houses)]
+
+        self.materials_needed = {'doors': 0, 'outside_doors': 0, 'windows': 0, 'wall_modules': 0, 'toilet_seats': 0, 'tabs': 0, 'shower_cabins': 0}
+        self.excess_materials = {'doors': 0, 'outside_doors': 0, 'windows': 0, 'wall_modules': 0, 'toilet_seats': 0, 'tabs': 0, 'shower_cabins': 0}
+
+
+
+    def __repr__(self):
+        """
+        Representation of a BuildingAgent object for debugging and logging.
+        """
+        return f"BuildingAgent Name: {self.name}, Priority Houses: {self.priority_houses}, Build Order: {self.build_order}, Money: {self.money}, Houses Built: {self.houses_built}, Buy Price: {self.buyprice}, Sell Price: {self.sellprice}"
+
+    def new_house(self):
+        """Empty construction progress for a house of the agent's type."""
+        return HouseProgress(self.house_type)
+
+    def genome(self):
+        """The strategy genome (build_order, priority_houses, buyprice, sellprice) as a hashable tuple."""
+        return (tuple(self.build_order), self.priority_houses, self.buyprice, self.sellprice)
+
+    def set_genome(self, genome):
+        """
+        Adopt a strategy genome. Houses dropped by a lower priority_houses give their materials
+        back as excess, a higher one starts a new house.
+        """
+        build_order, priority_houses, buyprice, sellprice = genome
+        self.build_order = list(build_order)
+        self.buyprice = buyprice
+        self.sellprice = sellprice
+        self.priority_houses = priority_houses
+        if self.current_focus_house >= priority_houses:
+            self.current_focus_house = 0
+        for removed_house in self.construction_progress[priority_houses:]:
+            for part_materials in removed_house.values():
+                for material, quantity in part_materials.items():
+                    self.excess_materials[material] = self.excess_materials.get(material, 0) + quantity
+        del self.construction_progress[priority_houses:]
+        while len(self.construction_progress) < priority_houses:
+            self.construction_progress.append(self.new_house())
+
+
+    def check_materials_needed(self):
+        # Reference the construction progress of the current focus house
+        current_progress = self.construction_progress[self.current_focus_house] #for priority houses = 2
+
+        # What is missing for the first unfinished part in the build order, the house keeps the deficits up to date
+        materials_needed = current_progress.needs(self.build_order)
+
+        # Update the agent's materials_needed attribute
+        self.materials_needed = materials_needed
+        if events.debug_enabled:
+            events.trace(DEBUG, f"materials needed for {self.name} {materials_needed}")
+
+        return materials_needed
+
+
+
+    def request_materials(self, material_agent, forced_buy_chance=0.2, forced_buy_amount=1, rolls=None):
+        """:param rolls: optional forced-buy rolls of this agent by MATERIAL_COLUMN, drawn from the random module if None."""
+        materials_needed = self.check_materials_needed()
+        affordable_materials_needed = {}
+
+        # Define current_progress at the start to ensure it's always available
+        current_progress = self.construction_progress[self.current_focus_house]
+
+        # Check how much of each needed material can be afforded
+        for material, quantity_needed in materials_needed.items():
+            cost_per_unit = material_agent.prices[material]
+            affordable_quantity = min(quantity_needed, self.money // cost_per_unit)
+            
+            # Random chance to be forced to buy extra units of a material
+            if (random.random() if rolls is None else rolls[MATERIAL_COLUMN[material]]) < forced_buy_chance:
+                excess_quantity = forced_buy_amount  # Fixed excess quantity
+                if self.money >= (affordable_quantity + excess_quantity) * cost_per_unit:
+                    affordable_quantity += excess_quantity  # Add excess quantity if affordable
+                    if events.info_enabled:
+                        events.emit(events.ForcedBuy(self.name, material, excess_quantity))
+
+            if affordable_quantity > 0:
+                affordable_materials_needed[material] = affordable_quantity
+
+        if affordable_materials_needed:
+            current_part = current_progress.current_part(self.build_order)
+            if current_part:
+                materials_provided = material_agent.process_request(affordable_materials_needed, self)
+                for material, quantity in materials_provided.items():
+                    # Update the focused house's progress with only the needed quantity
+                    needed_quantity = min(materials_needed[material], quantity)
+                    current_progress.add(current_part, material, needed_quantity)
+
+                    # Any excess quantity is added to excess materials
+                    excess_quantity = quantity - needed_quantity
+                    if excess_quantity > 0:
+                        self.excess_materials[material] = self.excess_materials.get(material, 0) + excess_quantity
+
+                # Check if the current part is completed
+                if current_progress.part_done(current_part):
+                    if events.info_enabled:
+                        events.emit(events.PartCompleted(self.name, current_part))
+                    if instrumentation.enabled:
+                        instrumentation.count_part_completed(self.name)
+                    
+                    # Check if all parts of the current house are completed
+                    if current_progress.is_complete():
+                        self.houses_built += 1
+                        self.reset_construction_progress(self.current_focus_house)  # Reset the completed house's progress
+                        self.sell_house()
+
+        # Report current construction progress
+        if events.debug_enabled:
+            events.trace(DEBUG, f"{self.name} is continuing construction. Current progress: {current_progress}")
+            events.trace(DEBUG, f"{self.name} has {self.money} SEK left.")
+            if self.priority_houses == 1:
+                events.trace(DEBUG, "")
+            if self.priority_houses == 2:
+                events.trace(DEBUG, f"{self.name} full construction progress: {self.construction_progress}\n")
+
+
+    def reset_construction_progress(self, house_index):
+        """Reset construction progress for the specified house."""
+        self.construction_progress[house_index].reset()
+
+
+    def switch_focus(self):
+        # Switch focus to the other house if priority_houses = 2
+        if self.priority_houses == 2:
+            self.current_focus_house = 1 - self.current_focus_house
+
+    def sell_house(self):
+        # Sell the house when all parts are completed
+            money_before = self.money
+            self.money += self.house_type.sell_price
+            if events.info_enabled:
+                events.emit(events.HouseSold(self.name, self.houses_built, self.house_type.sell_price, money_before, self.money))
+
+def conduct_trading_round(builder_agents, material_agent):
+    """
+    Trading day: builders trade excess materials through per-material order books
+    (see order_book.py), then put whatever they still have in excess into construction.
+
+    :return: the trade ledger, a list of order_book.Trade records.
+    """
+    # Ensure builders have updated their materials_needed list
+    for builder in builder_agents:
+        builder.check_materials_needed()
+
+    # Execute trades between builders, best price first
+    ledger = clear_order_books(builder_agents, material_agent.prices)
+
+    use_excess_in_construction(builder_agents)
+    return ledger
+
+
+def use_excess_in_construction(builder_agents):
+    # Attempt to use any remaining excess materials for construction
+    for builder in builder_agents:
+        if events.debug_enabled:
+            events.trace(DEBUG, f"Initial {builder.name} construction progress: {builder.construction_progress[builder.current_focus_house]}")
+
+        for material, quantity in builder.excess_materials.items():
+            if quantity > 0 and builder.materials_needed.get(material, 0) > 0:
+                # Determine how much of the excess material can be used for construction
+                use_quantity = min(quantity, builder.materials_needed[material])
+
+                # Update construction progress and excess materials
+                current_progress = builder.construction_progress[builder.current_focus_house]
+                for part in builder.build_order:
+                    if material in current_progress.requirements[part]:
+
+                        current_progress.set(part, material, min(current_progress[part].get(material, 0) + use_quantity, current_progress.requirements[part][material]))
+                        if events.debug_enabled:  # Report after update
+                            events.trace(DEBUG, f"{builder.name} put {use_quantity} units of excess {material} into his part {part}")
+
+                        break  
+
+                builder.excess_materials[material] -= use_quantity
+                builder.materials_needed[material] = max(builder.materials_needed[material] - use_quantity, 0)
+        if events.debug_enabled:
+            events.trace(DEBUG, f"Final {builder.name} construction progress: {builder.construction_progress[builder.current_focus_house]}")
+
+def calculate_fitness_scores(builder_agents):
+    fitness_scores = {}
+
+    for agent in builder_agents:
+        # Calculate the fitness score based on houses built and remaining money
+        score = agent.houses_built + (agent.money / 1000000)
+        fitness_scores[agent.name] = score
+        if events.debug_enabled:
+            events.trace(DEBUG, f"Fitness Score for {agent.name}: {score:.2f}")
+
+    return fitness_scores
+
+
+
+def sort_agents_by_fitness(builder_agents):
+    # Calculate fitness score for each agent and store it as an attribute
+    for agent in builder_agents:
+        agent.fitness_score = agent.houses_built + (agent.money / 1000000)
+
+    # Sort agents based on fitness score, from high to low
+    builder_agents.sort(key=lambda agent: agent.fitness_score, reverse=True)
+    # at the end of each day, sort the agents by fitness score and report the results
+    if events.debug_enabled:
+        for agent in builder_agents:
+            events.trace(DEBUG, f"{agent.name}: Fitness Score = {agent.fitness_score}")
+
+
+
+
+
+def write_stats_to_excel(builder_agents, start_money, forced_buy_chance, forced_buy_amount, file_name="agent_stats.xlsx",
+                         stop_reason=None, stop_day=None):
+    """:param stop_reason: why the run stopped early (convergence.REASONS), added to the rows with stop_day; None if it ran all days."""
+    # Prepare data for agents
+    agent_data = []
+    for agent in builder_agents:
+        agent_stats = {
+            "Name": agent.name,
+            "Priority Houses": agent.priority_houses,
+            "Build Order": ', '.join(agent.build_order),
+            "Buy Price Multiplier": agent.buyprice,
+            "Sell Price Multiplier": agent.sellprice,
+            "Fitness Score": agent.houses_built + (agent.money / 1000000),
+            "Amount of Houses Built": agent.houses_built,
+            "Money": agent.money,
+            "Number of Excess Material Items": sum(agent.excess_materials.values()),
+            "Start Money": None,  # Placeholder for non-agent stats
+            "Chance to Buy Excess Materials": None,  # Placeholder for non-agent stats
+            "Standard Amount of Forced Excess Items": None  # Placeholder for non-agent stats
+        }
+        if stop_reason is not None:
+            agent_stats["Stop Reason"] = stop_reason
+            agent_stats["Stop Day"] = stop_day
+        agent_data.append(agent_stats)
+
+
+    # Convert agent data to a DataFrame (pandas and openpyxl are only imported when stats are written)
+    import pandas as pd
+    df_agents = pd.DataFrame(agent_data)
+
+    # Check if the file already exists
+    if os.path.exists(file_name):
+        # File exists, read existing data and append new data
+        df_existing = pd.read_excel(file_name)
+        df_final = pd.concat([df_existing, df_agents], ignore_index=True)
+    else:
+        # File doesn't exist, add non-agent stats in the first row and then append agent stats
+        df_final = pd.concat([df_agents], ignore_index=True)
+
+    # Write the DataFrame to an Excel file, without the index
+    df_final.to_excel(file_name, index=False)
+
+    if events.info_enabled:
+        events.trace(INFO, f"Stats appended to {file_name}")
+
+def write_stats_to_csv(builder_agents, start_money, forced_buy_chance, forced_buy_amount, file_name="agent_stats.csv",
+                       stop_reason=None, stop_day=None):
+    """:param stop_reason: why the run stopped early (convergence.REASONS), added to the rows with stop_day; None if it ran all days."""
+    # Prepare data for agents
+    agent_data = []
+    for agent in builder_agents:
+        agent_stats = {
+            "Name": agent.name,
+            "Priority Houses": agent.priority_houses,
+            "Build Order": ', '.join(agent.build_order),
+            "Buy Price Multiplier": agent.buyprice,
+            "Sell Price Multiplier": agent.sellprice,
+            "Fitness Score": agent.houses_built + (agent.money / 1000000),
+            "Amount of Houses Built": agent.houses_built,
+            "Money": agent.money,
+            "Number of Excess Material Items": sum(agent.excess_materials.values())
+        }
+        if stop_reason is not None:
+            agent_stats["Stop Reason"] = stop_reason
+            agent_stats["Stop Day"] = stop_day
+        agent_data.append(agent_stats)
+
+    # Convert agent data to a DataFrame
+    import pandas as pd
+    df_agents = pd.DataFrame(agent_data)
+
+    header = None
+    if os.path.exists(file_name) and os.path.getsize(file_name):
+        with open(file_name, newline='') as f:
+            header = f.readline().rstrip('\r\n').split(',')
+    if header is not None and not set(df_agents.columns) <= set(header):
+        # the first early stop written onto an older file: rewrite it with the new columns, empty for the old rows
+        df_final = pd.concat([pd.read_csv(file_name), df_agents], ignore_index=True)
+        df_final["Stop Day"] = df_final["Stop Day"].astype("Int64")
+        df_final.to_csv(file_name, index=False)
+    else:
+        if header is not None:
+            df_agents = df_agents.reindex(columns=header)
+        # Append to CSV, without index, adding a header only if the file is new
+        with open(file_name, 'a', newline='') as f:
+            df_agents.to_csv(f, header=f.tell()==0, index=False)
+
+    if events.info_enabled:
+        events.trace(INFO, f"Stats appended to {file_name}")
+
+
+def extract_strategy_attributes(builder_agents):
+    strategy_attributes = []
+    for agent in builder_agents:
+        attributes = {
+            'build_order': agent.build_order,
+            'priority_houses': agent.priority_houses,
+            'buyprice': agent.buyprice,
+            'sellprice': agent.sellprice
+        }
+        strategy_attributes.append(attributes)
+    return strategy_attributes
+
+def roulette_wheel_selection(builder_agents, parents=4):
+    # Select 4 agents for crossover by default; the fitness table is built once and each pick is a bisection
+    return select_parents(builder_agents, parents, operator='roulette')
+
+
+
+def perform_crossover(selected_agents):
+    for i in range(0, len(selected_agents), 2):  # Iterate in pairs
+        if i+1 < len(selected_agents):  # Check if there's a pair
+            agent_a, agent_b = selected_agents[i], selected_agents[i+1]
+
+            # Before swapping priority_houses, handle changes in construction progress
+            for agent in (agent_a, agent_b):
+                if agent.priority_houses == 2:  # Agent is working on 2 houses
+                    # Check the counterpart's priority_houses to determine if it will change
+                    counterpart_priority = agent_b.priority_houses if agent == agent_a else agent_a.priority_houses
+                    if counterpart_priority == 1:  # If counterpart is working on only 1 house
+                        # Move materials from the second house to excess_materials
+                        for material, quantity in agent.construction_progress[1].items():
+                            agent.excess_materials[material] = agent.excess_materials.get(material, 0) + sum(quantity.values())
+                        # Remove the second dictionary in construction_progress
+                        agent.construction_progress.pop()
+                        agent.current_focus_house = 0  # Reset to the first house, like a mutation does
+
+            # Swap build_order and priority_houses
+            agent_a.build_order, agent_b.build_order = agent_b.build_order, agent_a.build_order
+            agent_a.priority_houses, agent_b.priority_houses = agent_b.priority_houses, agent_a.priority_houses
+            
+            # If an agent's priority_houses increased from 1 to 2, add a new dictionary to construction_progress
+            for agent in (agent_a, agent_b):
+                if len(agent.construction_progress) < agent.priority_houses:
+                    agent.construction_progress.append(agent.new_house())
+
+            # Swap buyprice and sellprice
+            agent_a.buyprice, agent_b.buyprice = agent_b.buyprice, agent_a.buyprice
+            agent_a.sellprice, agent_b.sellprice = agent_b.sellprice, agent_a.sellprice
+            if events.info_enabled:
+                events.emit(events.Crossover(agent_a.name, agent_b.name, ('build_order', 'priority_houses', 'buyprice', 'sellprice')))
+
+def perform_mutation(builder_agents, mutation_rate=0.1, draws=None):
+    """
+    :param draws: optional per-agent draws from rng.RngStreams.mutation_rows(), the random module is used if None.
+    :return: the agents that got at least one mutation, in list order.
+    """
+    mutated_agents = []
+    for position, agent in enumerate(builder_agents):
+        mutated = False  # Flag to track if any mutation occurred for the current agent
+        draw = None if draws is None else draws[position]
+
+        # Mutate build order with a chance defined by mutation_rate
+        if (random.random() if draw is None else draw[0]) < mutation_rate:
+            original_order = agent.build_order[:]
+            if draw is None:
+                random.shuffle(agent.build_order)
+            else:
+                agent.build_order[:] = [original_order[i] for i in ORDER_PERMUTATIONS[draw[4]]]
+            if events.info_enabled:
+                events.emit(events.Mutation(agent.name, 'build_order', original_order, agent.build_order[:]))
+            mutated = True
+
+        # Mutate priority houses with a chance defined by mutation_rate
+        if (random.random() if draw is None else draw[1]) < mutation_rate:
+            original_priority = agent.priority_houses
+            agent.priority_houses = 2 if agent == 1 else 1
+            if events.info_enabled:
+                events.emit(events.Mutation(agent.name, 'priority_houses', original_priority, agent.priority_houses))
+            mutated = True
+
+            # Adjust current_focus_house if priority_houses decreased
+            if original_priority > agent.priority_houses:
+                agent.current_focus_house = 0  # Reset to the first house
+
+        # Mutate buyprice and sellprice directly with a new random integer between 1 and 8
+        if (random.random() if draw is None else draw[2]) < mutation_rate:
+            original_buyprice = agent.buyprice
+            agent.buyprice = random.randint(1, 8) if draw is None else draw[5]
+            if events.info_enabled:
+                events.emit(events.Mutation(agent.name, 'buyprice', original_buyprice, agent.buyprice))
+            mutated = True
+
+        if (random.random() if draw is None else draw[3]) < mutation_rate:
+            original_sellprice = agent.sellprice
+            agent.sellprice = random.randint(1, 8) if draw is None else draw[6]
+            if events.info_enabled:
+                events.emit(events.Mutation(agent.name, 'sellprice', original_sellprice, agent.sellprice))
+            mutated = True
+
+        # Ensure construction_progress matches the mutated priority_houses
+        if mutated:
+            if agent.priority_houses < len(agent.construction_progress):
+                # Move materials from removed houses to excess_materials and adjust construction_progress
+                for removed_house in agent.construction_progress[agent.priority_houses:]:
+                    for material, quantity in removed_house.items():
+                        agent.excess_materials[material] = agent.excess_materials.get(material, 0) + sum(quantity.values())
+                agent.construction_progress = agent.construction_progress[:agent.priority_houses]
+                if events.debug_enabled:
+                    events.trace(DEBUG, f"{agent.name} construction progress adjusted due to mutation in priority houses.")
+
+            elif agent.priority_houses > len(agent.construction_progress):
+                # Add new houses if priority_houses increased due to mutation
+                for _ in range(agent.priority_houses - len(agent.construction_progress)):
+                    agent.construction_progress.append(agent.new_house())
+                if events.debug_enabled:
+                    events.trace(DEBUG, f"{agent.name} additional construction progress added due to mutation in priority houses.")
+            mutated_agents.append(agent)
+    return mutated_agents
+
+
+# every agent has a unique strategy
+# the agents at the top of the list starts with less money and the agents at the bottom of the list starts with more money
+# this ensures that the advantage of being first to buy materials is balanced by the disadvantage of having less money
+# after the first round of the competition, the agents are sorted by fitness score (houses built + (money/price of 1 house + 100k) (this happens every round aswell)
+# and since fitness score is also based on money, the bottom agents will likely be the first to buy materials in round 2.
+DEFAULT_ROSTER = [
+    {'name': "Krzysztof Wojcik", 'priority_houses': 1, 'build_order': ['floor', 'hall', 'garret'], 'buyprice': 1, 'sellprice': 2, 'money': 1500000},
+    {'name': "Ulf Stenhammare", 'priority_houses': 1, 'build_order': ['floor', 'garret', 'hall'], 'buyprice': 2, 'sellprice': 1, 'money': 1550000},
+    {'name': "Musa 1 of Mali", 'priority_houses': 1, 'build_order': ['garret', 'hall', 'floor'], 'buyprice': 1, 'sellprice': 1, 'money': 1600000},
+    {'name': "Florida Man", 'priority_houses': 1, 'build_order': ['garret', 'floor', 'hall'], 'buyprice': 2, 'sellprice': 3, 'money': 1650000},
+    {'name': "Thrall", 'priority_houses': 1, 'build_order': ['hall', 'floor', 'garret'], 'buyprice': 1, 'sellprice': 8, 'money': 1700000},
+    {'name': "Arthas Menethil", 'priority_houses': 1, 'build_order': ['hall', 'garret', 'floor'], 'buyprice': 8, 'sellprice': 1, 'money': 1750000},
+    {'name': "Kofi Dube", 'priority_houses': 2, 'build_order': ['floor', 'hall', 'garret'], 'buyprice': 4, 'sellprice': 3, 'money': 1800000},
+    {'name': "Kwame Juma", 'priority_houses': 2, 'build_order': ['floor', 'garret', 'hall'], 'buyprice': 4, 'sellprice': 5, 'money': 1850000},
+    {'name': "Heisenberg", 'priority_houses': 2, 'build_order': ['garret', 'hall', 'floor'], 'buyprice': 6, 'sellprice': 7, 'money': 1900000},
+    {'name': "Fabian", 'priority_houses': 2, 'build_order': ['garret', 'floor', 'hall'], 'buyprice': 5, 'sellprice': 6, 'money': 1950000},
+    {'name': "Robin", 'priority_houses': 2, 'build_order': ['hall', 'floor', 'garret'], 'buyprice': 6, 'sellprice': 5, 'money': 2000000},
+    {'name': "Hagarin", 'priority_houses': 2, 'build_order': ['hall', 'garret', 'floor'], 'buyprice': 3, 'sellprice': 4, 'money': 2550000},
+]
+
+
+def scaled_roster(n):
+    """n agents cycling through the default roster's strategies, with unique names."""
+    return [dict(DEFAULT_ROSTER[i % len(DEFAULT_ROSTER)], name=f"Agent{i + 1}") for i in range(n)]
+
+
+def next_event_day(day, config):
+    """First day from `day` on that restocks, trades, mutates or runs the GA."""
+    return min(-(-day // every) * every
+               for every in (config.restock_every, config.trade_every, config.mutate_every, config.ga_every))
+
+
+def idle_request_draws(builder_agents, material_agent):
+    """
+    Prove that request days can't change anything while the market and the genomes stay as they
+    are: for every house an agent will focus on, each needed material is out of stock or costs
+    more than the agent has, so request_materials buys nothing. All that is left of such a day
+    are the forced-buy draws (one random() per needed material) and the focus switches.
+
+    :return: [draws on the next request day, draws on the day after], None if someone could buy something.
+    """
+    inventory, prices = material_agent.inventory, material_agent.prices
+    draws = [0, 0]
+    for agent in builder_agents:
+        houses, focus, money = agent.construction_progress, agent.current_focus_house, agent.money
+        if len(houses) != agent.priority_houses or focus >= len(houses):
+            return None
+        for offset in (0, 1):
+            house = houses[(focus + offset) % len(houses)]
+            needs = house.needs(agent.build_order)
+            for material in needs:
+                if inventory.get(material, 0) > 0 and money >= prices[material]:
+                    return None
+            draws[offset] += len(needs)
+    return draws
+
+
+def skip_idle_days(first_day, last_day, agents, draws, per_day=None, burn=True, population=None):
+    """
+    Advance over idle request days without running them: burn the random draws they would
+    have made and switch the focus of the two-house agents like switch_focus would.
+
+    :param draws: idle_request_draws() result for first_day.
+    :param burn: advance the random module; False when the draws come from per-day rng streams.
+    :param per_day: optional callable(day) run at the end of every skipped day, in order, with
+                    the world (focus and random state included) as the full day would leave it.
+    :param population: the population_engine.PopulationEngine holding the agents' state, if any;
+                       it advances its rows instead of the objects (no per_day then).
+    """
+    def advance(days, offset):
+        total = sum(draws[(offset + day) % 2] for day in range(days)) if burn else 0
+        if total:
+            random.getrandbits(64 * total)  # two 32-bit words per random() call, one call
+        if population is not None:
+            population.skip_idle(days)
+            return
+        for agent in agents:
+            houses = agent.construction_progress
+            focus = (agent.current_focus_house + days - 1) % len(houses)
+            agent.materials_needed = houses[focus].needs(agent.build_order)
+            if len(houses) == 2:
+                agent.current_focus_house = (focus + 1) % 2
+
+    if per_day is None:
+        advance(last_day - first_day + 1, 0)
+        return
+    for day in range(first_day, last_day + 1):
+        advance(1, day - first_day)
+        per_day(day)
+
+
+def create_world(config=None):
+    """
+    Build a fresh, independent world: a new MaterialAgent and a new list of BuildingAgents.
+
+    :param config: SimulationConfig with the roster, start money, house types and inventory size, defaults to SimulationConfig().
+    :return: (material_agent, builder_agents)
+    """
+    config = config or SimulationConfig()
+    roster = DEFAULT_ROSTER if config.roster is None else config.roster
+    extra_types = {values['name']: HouseType.from_dict(values) for values in config.house_types or ()}
+    if len(extra_types) != len(config.house_types or ()):
+        raise ValueError("the names of config.house_types must be unique")
+    mix = config.house_mix
+    agents = []
+    for position, spec in enumerate(roster):
+        # build orders are shuffled in place by mutation, so every agent gets its own list
+        spec = dict(spec, build_order=list(spec['build_order']))
+        if config.start_money is not None:
+            spec['money'] = config.start_money
+        if spec.get('house_type') is None and mix:
+            spec['house_type'] = mix[position % len(mix)]
+        spec['house_type'] = resolve_house_type(spec.get('house_type'), extra_types)
+        agents.append(BuildingAgent(**spec))
+    return MaterialAgent(config.inventory_multiplier), agents
+
+
+def main(days_to_simulate, material_agent=None, agents=None, config=None, write_stats=True, metrics=None,
+         start_day=1, on_day_end=None, instruments=None, fitness_cache=None, history=None, convergence=None,
+         lineage=None):
+    """
+    Run the simulation for the given number of days.
+
+    :param material_agent: the market to use, a fresh one from create_world(config) by default.
+    :param agents: the builders to simulate, a fresh roster from create_world(config) by default.
+    :param config: SimulationConfig with the engine, schedules, GA and market settings, defaults to SimulationConfig().
+    :param write_stats: append the final day stats to agent_stats.xlsx and agent_stats.csv.
+    :param metrics: optional metrics_writer.MetricsWriter that records every agent on every day.
+    :param start_day: first day to simulate, e.g. the day after a restored snapshot.
+    :param on_day_end: optional callable(day, material_agent, agents) run after every day, e.g. to take snapshots.
+    :param instruments: optional instrumentation.Instrumentation that times the phases of every day.
+    :param fitness_cache: optional fitness_cache.FitnessCache; the final genotypes and their fitness are
+                          recorded in it (all of an agent's fitness for the genotype it ends with), and with
+                          config.surrogate it pre-screens offspring.
+    :param history: optional history.HistoryStore that keeps the full state of every agent on every day.
+    :param convergence: optional convergence.ConvergenceMonitor updated on every mutation and GA day; the run
+                        stops at the end of the day one of its rules fires. One is made from the config's stop
+                        rules if any is set.
+    :param lineage: optional lineage.LineageStore that records every crossover and mutation as a new strategy
+                    with its parents.
+    :return: the agents, sorted by fitness score.
+    """
+    config = config or SimulationConfig()
+    if material_agent is None or agents is None:
+        new_material_agent, new_agents = create_world(config)
+        material_agent = new_material_agent if material_agent is None else material_agent
+        agents = new_agents if agents is None else agents
+    instruments = NULL_INSTRUMENTS if instruments is None else instruments
+    if convergence is None:
+        convergence = ConvergenceMonitor.from_config(config)
+        if not convergence.active:
+            convergence = None
+    screening = fitness_cache is not None and config.surrogate
+    # the array engine clears a request day in one batch, the other clearing rules only exist there
+    batched = config.engine == "array" or config.clearing != "sequential"
+    if batched:
+        from .population_engine import PopulationEngine
+    streams = None
+    if config.rng == "streams":
+        from .rng import RngStreams
+        streams = RngStreams(config.rng_seed)
+    elif config.rng != "global":
+        raise ValueError(f"unknown rng {config.rng!r}, expected 'global' or 'streams'")
+
+    # batched runs keep the population engine from one request day to the next and only bring the
+    # agent objects up to date (stale is True until then) when something reads or changes them
+    population = None
+    stale = False
+
+    def materialise():
+        nonlocal stale
+        if stale:
+            population.write_back(agents, material_agent)
+            stale = False
+
+    def release():
+        # the objects are about to change in ways the engine can't follow(), it loads them again on the next request day
+        nonlocal population
+        materialise()
+        population = None
+
+    skipped_through = 0
+    per_day_records = (metrics is not None or history is not None or on_day_end is not None
+                       or instruments is not NULL_INSTRUMENTS)
+
+    def idle_day_done(day):
+        instruments.begin_day(day)
+        started = instruments.start()
+        if metrics is not None:
+            metrics.record_day(day, agents)
+        if history is not None:
+            history.record_day(day, agents)
+        if on_day_end is not None:
+            on_day_end(day, material_agent, agents)
+        instruments.stop('idle_days', started)
+        instruments.end_day(day)
+
+    instruments.activate()
+    try:
+        for day in range(start_day, days_to_simulate + 1):
+            if day <= skipped_through:
+                continue
+            if config.skip_idle and not events.debug_enabled:
+                # a plain request day; if nobody can buy anything, nothing changes until the next event day
+                # (the last day always runs, for the stats)
+                event_day = next_event_day(day, config)
+                last_idle = min(event_day - 1, days_to_simulate - 1)
+                if last_idle > day:
+                    if per_day_records:
+                        release()
+                    if population is None:
+                        draws = idle_request_draws(agents, material_agent)
+                    else:
+                        draws = population.idle_request_draws()
+                    if draws is not None:
+                        if events.info_enabled:
+                            events.trace(INFO, f"\nDays {day}-{last_idle}: nothing can be bought before day {event_day}, skipped.")
+                        if population is None:
+                            sort_agents_by_fitness(agents)
+                        else:
+                            population.sort_by_fitness(agents)
+                            stale = True
+                        skip_idle_days(day, last_idle, agents, draws, idle_day_done if per_day_records else None,
+                                       burn=streams is None, population=population)
+                        skipped_through = last_idle
+                        continue
+            instruments.begin_day(day)
+            if events.info_enabled:
+                events.trace(INFO, f"\nDay {day}:")
+            if day % config.restock_every == 0:
+                started = instruments.start()
+                material_agent.restock_materials()
+                if population is not None:
+                    population.load_market(material_agent)
+                if events.info_enabled:
+                    events.trace(INFO, f"MaterialAgent has restocked materials. {material_agent}")
+                instruments.stop('restock', started)
+
+            # happy trading my builders!
+            if day % config.trade_every == 0:
+                started = instruments.start()
+                if events.info_enabled:
+                    events.trace(INFO, "Trading Day!")
+                release()
+                ledger = conduct_trading_round(agents, material_agent)
+                instruments.count_trades(ledger)
+                instruments.stop('trading_day', started)
+
+            elif batched:
+                started = instruments.start()
+                if population is None:
+                    population = PopulationEngine.from_agents(agents, material_agent, config.forced_buy_chance,
+                                                              config.forced_buy_amount, config.clearing)
+                population.request_day(rolls=None if streams is None else
+                                        streams.forced_buy_block(day, agents, population.materials))
+                population.write_market(material_agent)
+                stale = True
+                instruments.count_engine_day(population, agents)
+                instruments.stop('request_materials', started, len(agents))
+
+            else:
+                started = instruments.start()
+                rolls = repeat(None) if streams is None else streams.forced_buy_rows(day, agents)
+                for agent, agent_rolls in zip(agents, rolls):
+                    agent.request_materials(material_agent, config.forced_buy_chance, config.forced_buy_amount, agent_rolls)
+                    if agent.priority_houses == 2:
+                        agent.switch_focus()  # Switch focus to the other house if priority_houses = 2
+                instruments.stop('request_materials', started, len(agents))
+
+
+
+            if day % config.mutate_every == 0:
+                started = instruments.start()
+                if events.info_enabled:
+                    events.trace(INFO, "Mutation day!")
+                # prescreening may put genomes back, the engine then reloads everyone
+                if screening:
+                    release()
+                else:
+                    materialise()
+                if screening:
+                    parent_genomes = [agent.genome() for agent in agents]
+                mutated = perform_mutation(agents, config.mutation_rate, None if streams is None else streams.mutation_rows(day, agents))
+                if population is not None:
+                    population.follow(agents, mutated)
+                if lineage is not None:
+                    lineage.record_changes(day, agents)
+                if screening:
+                    for agent, genome in zip(agents, parent_genomes):
+                        fitness_cache.prescreen(config, agent, genome)
+                    if lineage is not None:
+                        lineage.record_changes(day, agents, screened=True)
+                instruments.stop('mutation_day', started)
+
+
+            # Genetic Algorithm steps every 15th day
+            if day % config.ga_every == 0:
+                started = instruments.start()
+                if events.info_enabled:
+                    events.trace(INFO, "Genetic Algorithm day!:")
+                if screening:
+                    release()
+                else:
+                    materialise()
+                # Sort agents by fitness score
+                agents.sort(key=lambda agent: agent.houses_built + (agent.money / 1000000), reverse=True)
+                # Perform roulette wheel (or the configured) selection
+                selected_agents = select_parents(agents, config.parents, config.selection, config.tournament_size,
+                                                 random if streams is None else streams.selection(day))
+                if events.debug_enabled:
+                    events.trace(DEBUG, f"Selected agents for crossover:{selected_agents}")
+                    for agent in selected_agents:
+                        events.trace(DEBUG, f"Before the crossover, {agent.name} has the strategy attr: build order: {agent.build_order}, houses simultanious: {agent.priority_houses}, buyprice: {agent.buyprice}, sellprice: {agent.sellprice}")
+                # Perform crossover among selected agents
+                if screening:
+                    parent_genomes = {id(agent): (agent, agent.genome()) for agent in selected_agents}
+                for batch in selection_batches(selected_agents):
+                    perform_crossover(batch)
+                    if lineage is not None:
+                        lineage.record_crossover(day, batch)
+                if screening:
+                    for agent, genome in parent_genomes.values():
+                        fitness_cache.prescreen(config, agent, genome)
+                    if lineage is not None:
+                        lineage.record_changes(day, selected_agents, screened=True)
+                if population is not None:
+                    population.follow(agents, selected_agents)
+                if events.debug_enabled:
+                    events.trace(DEBUG, "Crossover completed.")
+                    for agent in selected_agents:
+                        events.trace(DEBUG, f"After the crossover, {agent.name} has the strategy attr build order: {agent.build_order}, houses simultanious: {agent.priority_houses}, buyprice: {agent.buyprice}, sellprice: {agent.sellprice}")
+                instruments.stop('ga_day', started)
+
+            if events.debug_enabled:
+                started = instruments.start()
+                release()
+                events.trace(DEBUG, "--------------------")
+                events.trace(DEBUG, f"\nEnd of day {day} summary:")
+                for agent in agents:
+                    events.trace(DEBUG, f"{agent.name} has built {agent.houses_built} houses. Current construction progress: {agent.construction_progress} money: {agent.money}")
+                    events.trace(DEBUG, f"{agent.name} excess materials {agent.excess_materials}\n")
+                events.trace(DEBUG, f"{material_agent}")
+                instruments.stop('day_summary', started)
+            started = instruments.start()
+            if population is not None and not events.debug_enabled:
+                population.sort_by_fitness(agents)
+                stale = True
+            else:
+                release()
+                sort_agents_by_fitness(agents)
+            instruments.stop('sort_agents', started)
+            if metrics is not None or history is not None or on_day_end is not None:
+                started = instruments.start()
+                # on_day_end may change the agents, the metrics and the history only read them
+                if on_day_end is not None:
+                    release()
+                else:
+                    materialise()
+                if metrics is not None:
+                    metrics.record_day(day, agents)
+                if history is not None:
+                    history.record_day(day, agents)
+                if on_day_end is not None:
+                    on_day_end(day, material_agent, agents)
+                instruments.stop('hooks', started)
+            stopping = False
+            if convergence is not None and (day % config.mutate_every == 0 or day % config.ga_every == 0):
+                started = instruments.start()
+                materialise()
+                stopping = convergence.update(day, agents) is not None
+                if stopping and events.info_enabled:
+                    events.emit(events.Converged(day, convergence.stop_reason, convergence.detail()))
+                instruments.stop('convergence', started)
+            if (day == days_to_simulate or stopping) and write_stats:
+                started = instruments.start()
+                materialise()
+                stop = {'stop_reason': convergence.stop_reason, 'stop_day': convergence.stop_day} if stopping else {}
+                write_stats_to_excel(agents, start_money=config.start_money, forced_buy_chance=config.forced_buy_chance, forced_buy_amount=config.forced_buy_amount, **stop)
+                write_stats_to_csv(agents, start_money=config.start_money, forced_buy_chance=config.forced_buy_chance, forced_buy_amount=config.forced_buy_amount, file_name="agent_stats.csv", **stop)
+                instruments.stop('write_stats', started, 2)
+            instruments.end_day(day)
+            if stopping:
+                break
+        release()
+    finally:
+        instruments.deactivate()
+    if fitness_cache is not None and days_to_simulate >= start_day:
+        fitness_cache.record_agents(config, agents)
+
+    return agents
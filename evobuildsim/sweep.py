@@ -0,0 +1,215 @@
+"""
+Parameter sweeps with a content-addressed result cache.
+
+A sweep is a list of SimulationConfig points (a full grid or a random design over some of the
+config fields) times a list of seeds. Every (config, seed) replica is cached on disk under the
+hash of the config, the seed and the code version, so re-running an overlapping sweep only
+simulates the points that were never run with this code before.
+
+Usage:
+    evobuildsim sweep --grid mutation_rate=0.05,0.1,0.2 --grid trade_every=3,5 --seeds 0-19 --workers 8
+    evobuildsim sweep --random 50 --space mutation_rate=0.0:0.5 --space parents=2,4,8 --seeds 0-9
+"""
+import argparse
+import glob
+import hashlib
+import itertools
+import json
+import os
+import random
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from .config import SimulationConfig
+from .runner import aggregate, parse_seeds, run_replica
+
+
+CACHE_DIR = ".sweep_cache"
+_PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def code_version():
+    """Hash of every Python source file of the simulation; any code change invalidates the cache."""
+    digest = hashlib.sha256()
+    for path in sorted(glob.glob(os.path.join(_PACKAGE_DIR, "*.py"))):
+        with open(path, 'rb') as f:
+            digest.update(os.path.basename(path).encode())
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+def grid(base=None, **axes):
+    """
+    Every combination of the given values.
+
+        grid(SimulationConfig(days=60), mutation_rate=[0.05, 0.1], trade_every=[3, 5])
+    """
+    base = base or SimulationConfig()
+    names = list(axes)
+    return [base.replace(**dict(zip(names, values))) for values in itertools.product(*(axes[name] for name in names))]
+
+
+def random_design(count, space, base=None, seed=0):
+    """
+    `count` points drawn at random from a space.
+
+    :param space: field -> list of choices, or a (low, high) tuple drawn uniformly
+                  (as an int when both bounds are ints).
+    """
+    base = base or SimulationConfig()
+    rng = random.Random(seed)
+    points = []
+    for _ in range(count):
+        changes = {}
+        for name, values in space.items():
+            if isinstance(values, tuple):
+                low, high = values
+                changes[name] = rng.randint(low, high) if isinstance(low, int) and isinstance(high, int) else rng.uniform(low, high)
+            else:
+                changes[name] = rng.choice(values)
+        points.append(base.replace(**changes))
+    return points
+
+
+class ResultCache:
+    """
+    Replica results on disk, one JSON file per (config, seed, code version).
+
+    :param directory: cache directory, created if needed.
+    :param version: code version the results belong to, code_version() by default.
+    """
+
+    def __init__(self, directory=CACHE_DIR, version=None):
+        self.directory = directory
+        self.version = version or code_version()
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, config, seed):
+        text = f"{config.digest()}:{seed}:{self.version}"
+        return hashlib.sha256(text.encode()).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + ".json")
+
+    def get(self, config, seed):
+        try:
+            with open(self._path(self.key(config, seed))) as f:
+                return json.load(f)['result']
+        except FileNotFoundError:
+            return None
+
+    def put(self, config, seed, result):
+        path = self._path(self.key(config, seed))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, 'w') as f:
+            json.dump({'config': config.to_dict(), 'seed': seed, 'version': self.version, 'result': result}, f)
+        os.replace(temporary, path)  # readers never see a half written file
+
+
+def run_sweep(points, seeds, workers=None, cache=None):
+    """
+    Run every point for every seed, taking what it can from the cache.
+
+    :param points: list of SimulationConfig.
+    :param seeds: iterable of integer seeds.
+    :param workers: worker processes, None for os.cpu_count(), 0 to run in this process.
+    :param cache: ResultCache, None for the default cache directory, False to disable caching.
+    :return: dict with one entry per point: its config, the aggregated summary and cache stats.
+    """
+    cache = ResultCache() if cache is None else cache
+    seeds = sorted(set(seeds))
+    results = {}
+    missing = []
+    for index, config in enumerate(points):
+        for seed in seeds:
+            cached = cache.get(config, seed) if cache else None
+            if cached is None:
+                missing.append((index, seed))
+            else:
+                results[index, seed] = cached
+
+    def store(index, seed, result):
+        results[index, seed] = result
+        if cache:
+            cache.put(points[index], seed, result)
+
+    if workers == 0:
+        for index, seed in missing:
+            store(index, seed, run_replica(points[index], seed))
+    elif missing:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(run_replica, points[index], seed): (index, seed) for index, seed in missing}
+            for future in as_completed(futures):
+                store(*futures[future], future.result())
+
+    computed = {(index, seed) for index, seed in missing}
+    return {
+        'code_version': cache.version if cache else code_version(),
+        'points': [
+            {
+                'config': config.to_dict(),
+                'computed': sum((index, seed) in computed for seed in seeds),
+                'cached': sum((index, seed) not in computed for seed in seeds),
+                'summary': aggregate([results[index, seed] for seed in seeds]),
+            }
+            for index, config in enumerate(points)
+        ],
+    }
+
+
+def _parse_value(text):
+    if text.lower() in ('true', 'false'):
+        return text.lower() == 'true'  # bool fields such as skip_idle and surrogate
+    for kind in (int, float):
+        try:
+            return kind(text)
+        except ValueError:
+            pass
+    return None if text == 'None' else text
+
+
+def _parse_axis(text):
+    name, _, values = text.partition('=')
+    if ':' in values:
+        low, high = values.split(':')
+        return name, (_parse_value(low), _parse_value(high))
+    return name, [_parse_value(value) for value in values.split(',')]
+
+
+def cli(argv=None):
+    parser = argparse.ArgumentParser(description="Sweep simulation parameters with a result cache.")
+    parser.add_argument('--grid', action='append', default=[], metavar='FIELD=V1,V2,...', help="grid axis")
+    parser.add_argument('--random', type=int, default=None, metavar='N', help="draw N random points from --space")
+    parser.add_argument('--space', action='append', default=[], metavar='FIELD=V1,V2|LOW:HIGH', help="random design axis")
+    parser.add_argument('--design-seed', type=int, default=0)
+    parser.add_argument('--days', type=int, default=50)
+    parser.add_argument('--seeds', default='0-9')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--cache', default=CACHE_DIR, help="cache directory")
+    parser.add_argument('--no-cache', action='store_true')
+    parser.add_argument('--out', default=None)
+    args = parser.parse_args(argv)
+
+    base = SimulationConfig(days=args.days)
+    if args.random:
+        points = random_design(args.random, dict(_parse_axis(axis) for axis in args.space), base, args.design_seed)
+    else:
+        points = grid(base, **dict(_parse_axis(axis) for axis in args.grid))
+
+    cache = False if args.no_cache else ResultCache(args.cache)
+    results = run_sweep(points, parse_seeds(args.seeds), workers=args.workers, cache=cache)
+    computed = sum(point['computed'] for point in results['points'])
+    cached = sum(point['cached'] for point in results['points'])
+    print(f"{len(points)} points, {computed} replicas simulated, {cached} from cache", file=sys.stderr)
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(results, f, indent=2)
+    else:
+        for point in results['points']:
+            changed = {name: value for name, value in point['config'].items() if value != getattr(base, name)}
+            print(json.dumps(changed), f"mean total houses {point['summary']['total_houses']['mean']:.2f}")
+
+
+if __name__ == "__main__":
+    cli()
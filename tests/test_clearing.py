@@ -0,0 +1,94 @@
+"""Tests for the batched clearing rules of the population engine (population_engine.py)."""
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from evobuildsim.population_engine import CLEARING_RULES, clear_price_weighted, clear_pro_rata
+
+RICH = 10 ** 9
+
+
+def clear(rule, inventory, requests, money=None, prices=None, weights=None):
+    """Clear one material per agent: requests is a list of units wanted of material 0."""
+    inventory = np.array(inventory, dtype=np.int64)
+    prices = np.ones(len(inventory), dtype=np.int64) if prices is None else np.array(prices, dtype=np.int64)
+    money = np.full(len(requests), RICH, dtype=np.int64) if money is None else np.array(money, dtype=np.int64)
+    mats = np.zeros((len(requests), 1), dtype=np.int64)
+    qty = np.array(requests, dtype=np.int64)[:, None]
+    weights = None if weights is None else np.array(weights, dtype=np.float64)
+    takes, money_after, inventory_after = rule(inventory, prices, money, mats, qty, weights)
+    return takes[:, 0].tolist(), money_after.tolist(), inventory_after.tolist()
+
+
+@pytest.mark.parametrize('name', sorted(CLEARING_RULES))
+def test_allocations_are_conserved(name):
+    rule = CLEARING_RULES[name]
+    rng = np.random.default_rng(5)
+    for _ in range(50):
+        n_agents, n_materials = rng.integers(1, 40), rng.integers(1, 5)
+        n_slots = rng.integers(1, n_materials + 1)
+        inventory = rng.integers(0, 60, n_materials)
+        prices = rng.integers(1, 500, n_materials)
+        money = rng.integers(0, 5000, n_agents)
+        # a request names every material at most once
+        mats = np.array([rng.permutation(n_materials)[:n_slots] for _ in range(n_agents)])
+        mats[rng.random(mats.shape) < 0.2] = -1
+        qty = np.where(mats >= 0, rng.integers(0, 10, (n_agents, n_slots)), 0)
+        weights = rng.integers(1, 4, n_agents).astype(np.float64)
+
+        takes, money_after, inventory_after = rule(inventory, prices, money, mats, qty, weights)
+        assert (takes >= 0).all() and (takes <= qty).all()
+        assert (takes[mats < 0] == 0).all()
+        taken = np.bincount(mats[mats >= 0], weights=takes[mats >= 0], minlength=n_materials).astype(np.int64)
+        assert (taken <= inventory).all()
+        assert (inventory_after == inventory - taken).all()
+        assert (money_after == money - (takes * prices[np.where(mats >= 0, mats, 0)]).sum(axis=1)).all()
+        assert (money_after >= 0).all()
+
+
+def test_enough_stock_fills_every_request():
+    for rule in (clear_pro_rata, clear_price_weighted):
+        assert clear(rule, [50], [10, 20, 5], weights=[1, 2, 3])[0] == [10, 20, 5]
+
+
+def test_pro_rata_splits_by_units_requested():
+    # shares 2.5, 5 and 2.5 of 10 units
+    takes, _, inventory_after = clear(clear_pro_rata, [10], [10, 20, 10])
+    assert takes == [3, 5, 2]
+    assert inventory_after == [0]
+    # the weights don't matter to pro rata
+    assert clear(clear_pro_rata, [10], [10, 20, 10], weights=[1, 1, 9])[0] == [3, 5, 2]
+
+
+def test_price_weighted_splits_by_buyprice():
+    assert clear(clear_price_weighted, [8], [10, 10], weights=[1, 3])[0] == [2, 6]
+    # units requested and buyprice both count: 5 x 2 against 10 x 1
+    assert clear(clear_price_weighted, [6], [5, 10], weights=[2, 1])[0] == [3, 3]
+
+
+def test_rounding_leftovers_go_by_weight_then_list_order():
+    # floor shares of 10 over three equal requests are 3 each, the last unit goes to the first in the list
+    assert clear(clear_pro_rata, [10], [10, 10, 10])[0] == [4, 3, 3]
+    assert clear(clear_price_weighted, [10], [10, 10, 10], weights=[1, 1, 1])[0] == [4, 3, 3]
+    # shares 2.5, 2.5 and 5: the highest weight comes first for the leftover
+    assert clear(clear_price_weighted, [10], [10, 10, 10], weights=[1, 1, 2])[0] == [2, 2, 6]
+    # the leftovers fill one request up before they go to the next
+    assert clear(clear_pro_rata, [5], [3, 3, 3])[0] == [3, 1, 1]
+
+
+def test_agents_that_cannot_pay_leave_their_share_in_stock():
+    takes, money_after, inventory_after = clear(clear_pro_rata, [10], [10, 10], money=[30, RICH], prices=[10])
+    assert takes == [3, 5]
+    assert money_after == [0, RICH - 50]
+    assert inventory_after == [2]
+
+    # materials are paid in request order, the first one can eat the money for the second
+    inventory = np.array([5, 5], dtype=np.int64)
+    prices = np.array([10, 10], dtype=np.int64)
+    mats = np.array([[0, 1]], dtype=np.int64)
+    qty = np.array([[3, 3]], dtype=np.int64)
+    for rule in (clear_pro_rata, clear_price_weighted):
+        takes, money_after, inventory_after = rule(inventory, prices, np.array([40]), mats, qty, None)
+        assert takes.tolist() == [[3, 1]]
+        assert money_after.tolist() == [0]
+        assert inventory_after.tolist() == [2, 4]
@@ -0,0 +1,46 @@
+"""Tests for the `evobuildsim` command (cli.py)."""
+import importlib.util
+import os
+import subprocess
+import sys
+
+import pytest
+
+from evobuildsim import cli, events
+
+
+@pytest.fixture(autouse=True)
+def in_tmp(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    previous = events.configure(events.NullSink(), events.OFF)
+    yield tmp_path
+    events.configure(*previous)
+
+
+def test_run_streams_metrics_on_request():
+    pytest.importorskip("pyarrow")
+    assert cli.main(['run', '--days', '3', '--seed', '1', '--level', 'off', '--metrics', 'daily']) == 0
+    assert len(os.listdir('daily')) == 1
+
+
+def test_run_without_metrics_by_default():
+    assert cli.main(['run', '--days', '3', '--seed', '1', '--level', 'off']) == 0
+    assert os.listdir('.') == []
+
+
+def test_metrics_without_pyarrow(monkeypatch, capsys):
+    find_spec = importlib.util.find_spec
+    monkeypatch.setattr(importlib.util, 'find_spec', lambda name, *args: None if name == 'pyarrow' else find_spec(name, *args))
+    with pytest.raises(SystemExit):
+        cli.main(['run', '--days', '3', '--level', 'off', '--metrics', 'daily'])
+    assert "--metrics needs pyarrow" in capsys.readouterr().err
+    assert not os.path.exists('daily')
+
+
+def test_plain_run_does_not_import_the_export_modules():
+    code = ("import sys\nfrom evobuildsim.cli import main\nmain(['run', '--days', '3', '--level', 'off'])\n"
+            "print([name for name in ('pyarrow', 'pandas', 'openpyxl', 'numpy') if name in sys.modules])")
+    project = os.path.dirname(os.path.dirname(os.path.abspath(cli.__file__)))
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                            env={**os.environ, 'PYTHONPATH': project})
+    assert output.stdout.strip() == "[]"
@@ -0,0 +1,88 @@
+"""Tests for the convergence monitor and early stopping (convergence.py)."""
+import csv
+import random
+
+import pytest
+
+from evobuildsim import events, simulation
+from evobuildsim.config import SimulationConfig
+from evobuildsim.convergence import ConvergenceMonitor, genotype_entropy, rank_correlation
+
+
+@pytest.fixture(autouse=True)
+def silent():
+    previous = events.configure(events.NullSink(), events.OFF)
+    yield
+    events.configure(*previous)
+
+
+def checks(monitor, houses, days=range(6, 601, 6)):
+    """Feed the monitor a population whose houses built follow houses(agent index, day); the stop day or None."""
+    _, agents = simulation.create_world()
+    for day in days:
+        for index, agent in enumerate(agents):
+            agent.houses_built = houses(index, day)
+        if monitor.update(day, agents) is not None:
+            return monitor.stop_day
+    return None
+
+
+def test_steady_growth_is_not_a_plateau():
+    assert checks(ConvergenceMonitor(stop_plateau=5), lambda index, day: day // 3 + index) is None
+
+
+def test_flat_fitness_is_a_plateau():
+    monitor = ConvergenceMonitor(stop_plateau=5)
+    assert checks(monitor, lambda index, day: index if day > 60 else day) == 60 + 5 * 6
+    assert monitor.stop_reason == 'plateau'
+
+
+def test_growth_within_the_tolerance_is_a_plateau():
+    # best and mean grow by well under 1% of their level per check
+    monitor = ConvergenceMonitor(stop_plateau=3, plateau_tolerance=0.01)
+    assert checks(monitor, lambda index, day: 1000 + index + day // 100) == 24
+
+
+def test_min_day():
+    monitor = ConvergenceMonitor(stop_plateau=1, min_day=100)
+    assert checks(monitor, lambda index, day: index) == 102
+
+
+def test_entropy_and_rank_correlation():
+    _, agents = simulation.create_world()
+    assert genotype_entropy(agents[:1]) == 0.0
+    assert genotype_entropy(agents) > 0.0
+    assert rank_correlation(['a', 'b', 'c'], ['a', 'b', 'c']) == 1.0
+    assert rank_correlation(['a', 'b', 'c'], ['c', 'b', 'a']) == -1.0
+
+
+def read_csv(path):
+    with open(path, newline='') as f:
+        return list(csv.DictReader(f))
+
+
+def test_stop_reason_in_the_final_stats(tmp_path, monkeypatch):
+    pytest.importorskip("pandas")
+    pytest.importorskip("openpyxl")
+    monkeypatch.chdir(tmp_path)
+
+    random.seed(0)
+    simulation.main(20, write_stats=True)
+    rows = read_csv("agent_stats.csv")
+    assert 'Stop Reason' not in rows[0]
+
+    # the first early stop adds the columns to the file, empty for the rows written before
+    random.seed(0)
+    config = SimulationConfig(stop_entropy=100.0, stop_min_day=10)
+    simulation.main(20, config=config, write_stats=True)
+    random.seed(0)
+    simulation.main(20, write_stats=True)
+    rows = read_csv("agent_stats.csv")
+    assert len(rows) == 36
+    assert {(row['Stop Reason'], row['Stop Day']) for row in rows[:12] + rows[24:]} == {('', '')}
+    assert {(row['Stop Reason'], row['Stop Day']) for row in rows[12:24]} == {('entropy', '12')}
+
+    import pandas as pd
+    excel = pd.read_excel("agent_stats.xlsx")
+    assert excel['Stop Reason'].tolist()[12:24] == ['entropy'] * 12
+    assert excel['Stop Day'].tolist()[12:24] == [12] * 12
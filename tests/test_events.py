@@ -0,0 +1,99 @@
+"""Tests for the leveled events and their sinks (events.py)."""
+import json
+
+import pytest
+
+from evobuildsim import events, simulation
+from evobuildsim.config import SimulationConfig
+
+
+@pytest.fixture(autouse=True)
+def restore():
+    previous = events.configure(events.NullSink(), events.OFF)
+    yield
+    events.configure(*previous)
+
+
+@pytest.mark.parametrize("level, flags", [
+    (events.DEBUG, (True, True, True)),
+    (events.INFO, (False, True, True)),
+    (events.WARNING, (False, False, True)),
+    (events.OFF, (False, False, False)),
+    ('info', (False, True, True)),
+    ('DEBUG', (True, True, True)),
+])
+def test_level_gating(level, flags):
+    sink = events.RingBufferSink()
+    events.configure(sink, level)
+    assert (events.debug_enabled, events.info_enabled, events.warning_enabled) == flags
+    events.trace(events.DEBUG, "debug")
+    events.emit(events.PartCompleted("A", "hall"))
+    events.trace(events.WARNING, "warning")
+    assert len(sink.events) == sum(flags)
+    assert events.current_sink() is sink
+
+
+def test_configure_returns_the_previous_setting():
+    sink = events.RingBufferSink()
+    previous = events.configure(sink, events.INFO)
+    assert previous[1] == events.OFF
+    assert events.configure(*previous) == (sink, events.INFO)
+    assert not events.info_enabled
+    assert events.silence() == previous
+    assert isinstance(events.current_sink(), events.NullSink)
+
+
+def test_silenced_run_emits_nothing():
+    sink = events.RingBufferSink()
+    events.configure(sink, events.OFF)
+    material_agent, agents = simulation.create_world(SimulationConfig())
+    simulation.main(10, material_agent, agents, write_stats=False)
+    assert len(sink.events) == 0
+
+
+def test_ring_buffer_keeps_the_last_events():
+    sink = events.RingBufferSink(capacity=3)
+    events.configure(sink, events.INFO)
+    for index in range(5):
+        events.emit(events.Purchase(f"A{index}", "wood", index, 10 * index))
+    events.emit(events.Trade("B", "C", "wood", 1, 2))
+    assert [event.agent for event in sink.of_kind('purchase')] == ["A3", "A4"]
+    assert [event.kind for event in sink.events] == ['purchase', 'purchase', 'trade']
+
+
+def test_file_sink_writes_ndjson_in_batches(tmp_path):
+    path = tmp_path / "events.ndjson"
+    sink = events.FileSink(str(path), batch_size=3)
+    events.configure(sink, events.INFO)
+    events.emit(events.Purchase("A", "wood", 2, 30))
+    events.emit(events.Mutation("B", "build_order", ("hall",), ("floor",)))
+    assert path.read_text() == ""  # still in the batch
+    events.emit(events.HouseSold("A", 1, 500, 10, 510))
+    lines = path.read_text().splitlines()
+    assert len(lines) == 3
+    assert json.loads(lines[0]) == {'agent': "A", 'material': "wood", 'quantity': 2, 'cost': 30, 'kind': 'purchase'}
+    assert json.loads(lines[1])['old'] == ["hall"]
+    assert json.loads(lines[2])['kind'] == 'house_sold'
+
+    events.emit(events.Trace(events.INFO, "day 1"))
+    sink.close()
+    lines = path.read_text().splitlines()
+    assert json.loads(lines[-1]) == {'level': events.INFO, 'text': "day 1", 'kind': 'trace'}
+    assert len(lines) == 4
+
+
+def test_file_sink_appends(tmp_path):
+    path = str(tmp_path / "events.ndjson")
+    for agent in ("A", "B"):
+        sink = events.FileSink(path)
+        sink.write(events.PartCompleted(agent, "hall"))
+        sink.close()
+    with open(path) as f:
+        assert [json.loads(line)['agent'] for line in f] == ["A", "B"]
+
+
+def test_console_sink_prints_the_old_lines(capsys):
+    events.configure(events.ConsoleSink(), events.INFO)
+    events.emit(events.Purchase("A", "wood", 2, 30))
+    events.trace(events.DEBUG, "hidden")
+    assert capsys.readouterr().out == "A received 2 units of wood for SEK 30.\n"
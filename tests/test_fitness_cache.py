@@ -0,0 +1,92 @@
+"""Tests for the genotype fitness cache (fitness_cache.py) and its use by the replica runner."""
+import shutil
+import sqlite3
+import statistics
+
+import pytest
+
+from evobuildsim import runner
+from evobuildsim.config import SimulationConfig
+from evobuildsim.fitness_cache import FitnessCache, FitnessStats, environment_key, genotype_key
+
+GENOME = (['floor', 'hall', 'garret'], 1, 2, 3)
+OTHER = (['hall', 'floor', 'garret'], 2, 4, 5)
+
+
+def test_running_stats_and_merge():
+    values = [1.5, 2.0, 4.25, 3.0, 0.5]
+    stats, left, right = FitnessStats(), FitnessStats(), FitnessStats()
+    for index, value in enumerate(values):
+        stats.add(value)
+        (left if index < 2 else right).add(value)
+    left.merge(right)
+    for merged in (stats, left):
+        assert merged.count == 5
+        assert merged.mean == pytest.approx(statistics.fmean(values))
+        assert merged.variance == pytest.approx(statistics.variance(values))
+
+
+def test_file_is_shared_between_caches(tmp_path):
+    path = str(tmp_path / "fitness.sqlite")
+    config = SimulationConfig()
+    with FitnessCache(path) as first, FitnessCache(path) as second:
+        first.record(config, GENOME, 2.0)
+        second.record(config, GENOME, 4.0)
+    with FitnessCache(path) as cache:
+        stats = cache.estimate(config, GENOME)
+        assert (stats.count, stats.mean) == (2, 3.0)
+        # another environment doesn't see it
+        assert cache.estimate(config.replace(mutation_rate=0.5), GENOME) is None
+
+
+def test_lookups_mark_entries_used(tmp_path):
+    path = str(tmp_path / "fitness.sqlite")
+    config = SimulationConfig()
+    with FitnessCache(path) as cache:
+        cache.record(config, GENOME, 2.0)
+        cache.record(config, OTHER, 1.0)
+    with sqlite3.connect(path) as connection:
+        connection.execute("UPDATE fitness SET last_used = 0")
+    with FitnessCache(path, max_disk_entries=1) as cache:
+        assert cache.estimate(config, GENOME).count == 1
+    with sqlite3.connect(path) as connection:
+        rows = connection.execute("SELECT genotype, last_used FROM fitness").fetchall()
+    # the entry that was looked up is the one kept by the pruning
+    assert [genotype for genotype, _ in rows] == [genotype_key(GENOME)]
+    assert rows[0][1] > 0
+
+
+def test_snapshot_cache_is_read_only():
+    config = SimulationConfig()
+    source = FitnessCache()
+    source.record(config, GENOME, 2.0)
+    snapshot = source.snapshot(config)
+    assert snapshot == {(environment_key(config), genotype_key(GENOME)): (1, 2.0, 0.0)}
+
+    cache = FitnessCache(snapshot=snapshot)
+    cache.record(config, GENOME, 10.0)
+    cache.record(config, OTHER, 1.0)
+    assert cache.estimate(config, GENOME).mean == 2.0
+    assert cache.estimate(config, OTHER) is None
+
+    source.merge(cache.pending)
+    assert source.estimate(config, GENOME).count == 2
+    assert source.estimate(config, OTHER).mean == 1.0
+
+
+def test_replicas_with_a_cache_do_not_depend_on_workers(tmp_path):
+    config = SimulationConfig(days=35, surrogate=True, surrogate_min_samples=1)
+    seeded = str(tmp_path / "seeded.sqlite")
+    runner.run_replicas(range(4), config, workers=0, fitness_cache_path=seeded)
+
+    results = []
+    for name, workers, chunksize in (("serial", 0, 1), ("chunked", 0, 3), ("pool", 2, 2)):
+        path = str(tmp_path / f"{name}.sqlite")
+        shutil.copy(seeded, path)
+        per_seed = runner.run_replicas(range(10, 16), config, workers=workers, chunksize=chunksize,
+                                       fitness_cache_path=path)['per_seed']
+        with FitnessCache(path) as cache:
+            results.append((per_seed, {key: values[0] for key, values in cache.snapshot(config).items()}))
+    assert results[0] == results[1] == results[2]
+    # every replica's samples made it into the file
+    assert sum(results[0][1].values()) == (4 + 6) * 12
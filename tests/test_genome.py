@@ -0,0 +1,94 @@
+"""Tests for the packed genomes and the exhaustive landscape (genome.py)."""
+import pytest
+
+from evobuildsim import events, genome, simulation
+from evobuildsim.config import SimulationConfig
+
+np = pytest.importorskip("numpy")
+
+
+@pytest.fixture(autouse=True)
+def silent():
+    previous = events.configure(events.NullSink(), events.OFF)
+    yield
+    events.configure(*previous)
+
+
+def test_encode_decode_round_trip():
+    genomes = [genome.decode(code) for code in range(genome.SPACE)]
+    assert len(set(genomes)) == genome.SPACE == 768
+    assert [genome.encode(value) for value in genomes] == list(range(genome.SPACE))
+    assert genome.decode(np.int16(5)) == genomes[5]
+    for bad in (-1, genome.SPACE):
+        with pytest.raises(ValueError):
+            genome.decode(bad)
+    build_order = genome.BUILD_ORDERS[0]
+    for bad in ((build_order, 3, 1, 1), (build_order, 1, 0, 1), (build_order, 1, 1, genome.PRICES + 1)):
+        with pytest.raises(ValueError):
+            genome.encode(bad)
+
+
+def test_pack_unpack_round_trip():
+    _, agents = simulation.create_world(SimulationConfig(roster=simulation.scaled_roster(genome.SPACE)))
+    genome.unpack(np.arange(genome.SPACE), agents)
+    assert [agent.genome() for agent in agents] == [genome.decode(code) for code in range(genome.SPACE)]
+    packed = genome.pack(agents)
+    assert packed.dtype == np.int16
+    assert packed.tolist() == list(range(genome.SPACE))
+    # houses follow the house count of the new genome
+    assert all(len(agent.construction_progress) == agent.priority_houses for agent in agents)
+
+    shuffled = np.random.default_rng(1).permutation(genome.SPACE)
+    genome.unpack(shuffled, agents)
+    assert genome.pack(agents).tolist() == shuffled.tolist()
+
+
+def swapped_in_order(codes, pairs):
+    codes = list(codes)
+    for first, second in pairs:
+        codes[first], codes[second] = codes[second], codes[first]
+    return codes
+
+
+def test_crossover_with_distinct_parents():
+    codes = np.arange(10, dtype=np.int16)
+    pairs = [(0, 5), (7, 2), (9, 1)]
+    assert genome.crossover(codes.copy(), pairs).tolist() == swapped_in_order(range(10), pairs)
+
+
+def test_crossover_with_repeated_parents_swaps_in_order():
+    rng = np.random.default_rng(3)
+    for _ in range(20):
+        codes = rng.integers(0, genome.SPACE, 12).astype(np.int16)
+        pairs = rng.integers(0, 12, (8, 2))
+        expected = swapped_in_order(codes.tolist(), pairs.tolist())
+        assert genome.crossover(codes, pairs).tolist() == expected
+    # a parent paired with itself keeps its genome
+    assert genome.crossover(np.array([4, 9], dtype=np.int16), [(1, 1), (0, 1)]).tolist() == [9, 4]
+
+
+def test_mutate_at_rate_zero_changes_nothing():
+    codes = np.arange(genome.SPACE, dtype=np.int16)
+    assert genome.mutate(codes, 0.0, np.random.default_rng(0)).tolist() == codes.tolist()
+
+
+def test_mutate_at_rate_one_redraws_every_gene():
+    codes = np.full(4000, genome.encode((genome.BUILD_ORDERS[2], 2, 3, 5)), dtype=np.int16)
+    mutated = genome.mutate(codes, 1.0, np.random.default_rng(0))
+    assert mutated.dtype == np.int16
+    order, priority_houses, buyprice, sellprice = genome.fields(mutated.astype(np.int64))
+    assert (priority_houses == 1).all()
+    assert sorted(set(order.tolist())) == list(range(len(genome.BUILD_ORDERS)))
+    assert sorted(set(buyprice.tolist())) == sorted(set(sellprice.tolist())) == list(range(1, genome.PRICES + 1))
+    # the same generator state gives the same mutation
+    assert genome.mutate(codes, 1.0, np.random.default_rng(0)).tolist() == mutated.tolist()
+
+
+def test_landscape_covers_every_genotype_once():
+    rows = genome.landscape(SimulationConfig(days=2), seeds=[0], workers=0, chunksize=100)
+    assert sorted(row['code'] for row in rows) == list(range(genome.SPACE))
+    assert [row['rank'] for row in rows] == list(range(1, genome.SPACE + 1))
+    assert all(row['mean'] >= later['mean'] for row, later in zip(rows, rows[1:]))
+    for row in rows[:20]:
+        assert genome.decode(row['code']) == (tuple(row['build_order']), row['priority_houses'],
+                                              row['buyprice'], row['sellprice'])
@@ -0,0 +1,64 @@
+"""Tests for the memory-mapped history store (history.py)."""
+import json
+import os
+import random
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from evobuildsim import events, simulation
+from evobuildsim.history import DATA_FILE, FIELDS, SCHEMA_FILE, HistoryStore, agent_row
+
+
+@pytest.fixture(autouse=True)
+def silent():
+    previous = events.configure(events.NullSink(), events.OFF)
+    yield
+    events.configure(*previous)
+
+
+@pytest.fixture
+def recorded(tmp_path):
+    random.seed(4)
+    material_agent, agents = simulation.create_world()
+    directory = str(tmp_path / "history")
+    with HistoryStore.create(directory, agents, chunk_days=8) as history:
+        simulation.main(20, material_agent, agents, history=history, write_stats=False)
+    return directory, agents
+
+
+def test_file_format(recorded):
+    directory, agents = recorded
+    with open(os.path.join(directory, SCHEMA_FILE)) as f:
+        schema = json.load(f)
+    assert schema == {'fields': list(FIELDS), 'agents': [agent.name for agent in simulation.create_world()[1]],
+                      'first_day': 1, 'chunk_days': 8}
+    # grown in whole chunks past the first 8 days, int64 days x agents x fields
+    assert os.path.getsize(os.path.join(directory, DATA_FILE)) == 24 * len(agents) * len(FIELDS) * 8
+
+
+def test_last_day_matches_the_agents(recorded):
+    directory, agents = recorded
+    history = HistoryStore.open(directory)
+    for agent in agents:
+        assert history.view(agents=history.column(agent.name), days=20).tolist() == agent_row(agent, 20)
+    assert history.view('day', days=slice(1, 21))[:, 0].tolist() == list(range(1, 21))
+    assert not history.view('day', days=slice(21, 25)).any()
+
+
+def test_view_selects_every_list_on_its_own_axis(recorded):
+    directory, agents = recorded
+    history = HistoryStore.open(directory)
+    columns, fields = [0, 3, 5], ['money', 'genome']
+
+    view = history.view(fields, agents=columns, days=slice(2, 12))
+    assert view.shape == (10, 3, 2)
+    for j, column in enumerate(columns):
+        for k, field in enumerate(fields):
+            assert np.array_equal(view[:, j, k], history.view(field, agents=column, days=slice(2, 12)))
+
+    assert history.view(fields, agents=columns, days=7).shape == (3, 2)
+    assert history.view(fields, agents=1).shape[1:] == (2,)
+    assert history.view('money', agents=columns).shape == (history.capacity, 3)
+    assert history.view(agents=columns, days=7).shape == (3, len(FIELDS))
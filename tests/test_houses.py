@@ -0,0 +1,95 @@
+"""Tests for the house types and the compiled catalog (houses.py)."""
+import pickle
+
+import pytest
+
+from evobuildsim import simulation
+from evobuildsim.config import SimulationConfig
+from evobuildsim.houses import COTTAGE, HOUSE_TYPES, STANDARD, HouseCatalog, HouseType, resolve
+
+
+PRICES = simulation.MaterialAgent().prices
+
+VILLA = HouseType('villa', {
+    'floor': {'windows': 14, 'doors': 8, 'wall_modules': 9, 'toilet_seats': 3, 'tabs': 2, 'shower_cabins': 3},
+    'garret': {'windows': 4, 'doors': 2, 'wall_modules': 2},
+    'hall': {'outside_doors': 2, 'windows': 1, 'wall_modules': 1},
+}, 1400000)
+
+
+@pytest.mark.parametrize("house_type", [STANDARD, COTTAGE, VILLA])
+def test_dict_round_trip(house_type):
+    values = house_type.to_dict()
+    copy = HouseType.from_dict(values)
+    assert copy.to_dict() == values
+    assert (copy.name, copy.parts, copy.totals, copy.empty_parts) == \
+        (house_type.name, house_type.parts, house_type.totals, house_type.empty_parts)
+    assert pickle.loads(pickle.dumps(house_type)).to_dict() == values
+
+
+def test_derived_fields():
+    assert STANDARD.parts == ('floor', 'garret', 'hall')
+    assert STANDARD.totals == {'floor': 31, 'garret': 5, 'hall': 3}
+    assert COTTAGE.empty_parts['garret'] == {'windows': 0, 'doors': 0, 'wall_modules': 0}
+
+
+def test_resolve():
+    assert resolve(None) is STANDARD
+    assert resolve('cottage') is COTTAGE
+    assert resolve(VILLA) is VILLA
+    assert resolve('villa', {'villa': VILLA}) is VILLA
+    with pytest.raises(ValueError, match="unknown house type 'villa'"):
+        resolve('villa')
+
+
+def test_catalog_rejects_bad_types():
+    with pytest.raises(ValueError, match="at least one"):
+        HouseCatalog([], PRICES)
+    with pytest.raises(ValueError, match="unique"):
+        HouseCatalog([STANDARD, COTTAGE, HouseType('cottage', COTTAGE.part_requirements, 1)], PRICES)
+    with pytest.raises(ValueError, match="parts"):
+        HouseCatalog([STANDARD, HouseType('shed', {'floor': {'doors': 1}}, 1000)], PRICES)
+    gold = dict(STANDARD.part_requirements, hall={'gold_taps': 1})
+    with pytest.raises(ValueError, match="unpriced materials: gold_taps"):
+        HouseCatalog([STANDARD, HouseType('palace', gold, 10 ** 7)], PRICES)
+
+
+def test_catalog_rows_per_type():
+    catalog = HouseCatalog([STANDARD, COTTAGE, VILLA], PRICES)
+    assert catalog.materials == tuple(PRICES)
+    assert len(catalog) == 3 and 'villa' in catalog and 'palace' not in catalog
+    assert catalog['cottage'] is COTTAGE and list(catalog) == [STANDARD, COTTAGE, VILLA]
+    for position, house_type in enumerate(catalog):
+        for part, row in zip(catalog.parts, catalog.requirements[position]):
+            assert dict(zip(catalog.materials, row)) == \
+                {material: house_type.part_requirements[part].get(material, 0) for material in catalog.materials}
+        assert catalog.totals[position] == tuple(house_type.totals[part] for part in catalog.parts)
+        part_costs = tuple(sum(units * PRICES[material] for material, units in house_type.part_requirements[part].items())
+                           for part in catalog.parts)
+        assert catalog.part_costs[position] == part_costs
+        assert catalog.costs[position] == sum(part_costs)
+        assert catalog.sell_prices[position] == house_type.sell_price
+    # the comment on COTTAGE: 515695 at the default prices, 14% under its price
+    assert catalog.costs[1] == 515695
+    assert catalog.margins() == {name: price - cost for name, price, cost in
+                                 zip(('standard', 'cottage', 'villa'), catalog.sell_prices, catalog.costs)}
+
+
+def test_house_mix_is_handed_out_in_roster_order():
+    roster = simulation.scaled_roster(7)
+    roster[2] = dict(roster[2], house_type='standard')
+    config = SimulationConfig(roster=roster, house_types=[VILLA.to_dict()], house_mix=['cottage', 'villa', 'cottage'])
+    _, agents = simulation.create_world(config)
+    # the mix goes by roster position, agents that name a type keep it
+    assert [agent.house_type.name for agent in agents] == \
+        ['cottage', 'villa', 'standard', 'cottage', 'villa', 'cottage', 'cottage']
+    assert agents[0].house_type is COTTAGE
+    assert all(house.house_type is agent.house_type for agent in agents for house in agent.construction_progress)
+
+    _, agents = simulation.create_world(SimulationConfig(roster=roster))
+    assert [agent.house_type.name for agent in agents] == ['standard'] * 7
+    with pytest.raises(ValueError, match="unknown house type 'villa'"):
+        simulation.create_world(SimulationConfig(roster=roster, house_mix=['villa']))
+    with pytest.raises(ValueError, match="unique"):
+        simulation.create_world(SimulationConfig(roster=roster, house_types=[VILLA.to_dict(), VILLA.to_dict()]))
+    assert set(HOUSE_TYPES) == {'standard', 'cottage'}
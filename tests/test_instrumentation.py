@@ -0,0 +1,104 @@
+"""Tests for the phase timers and hot-path counters (instrumentation.py)."""
+import pstats
+import random
+
+import pytest
+
+from evobuildsim import events, instrumentation, simulation
+from evobuildsim.config import SimulationConfig
+from evobuildsim.instrumentation import COUNTERS, PHASES, Instrumentation
+
+
+@pytest.fixture(autouse=True)
+def silent():
+    previous = events.configure(events.NullSink(), events.OFF)
+    yield
+    events.configure(*previous)
+
+
+def instrumented_run(days=20, engine="object", seed=3, **options):
+    config = SimulationConfig(days=days, engine=engine)
+    instruments = Instrumentation(**options)
+    random.seed(seed)
+    material_agent, agents = simulation.create_world(config)
+    simulation.main(days, material_agent, agents, config=config, write_stats=False, instruments=instruments)
+    return instruments
+
+
+def test_phases_and_counters_of_a_short_run():
+    instruments = instrumented_run(days=20)
+    metrics = instruments.metrics()
+    assert set(metrics['phases']) == set(PHASES)
+    phases = metrics['phases']
+    # the default config trades every 5th day and runs the GA every 15th
+    assert phases['trading_day']['calls'] == 4
+    assert phases['ga_day']['calls'] == 1
+    assert phases['write_stats']['calls'] == 0
+    assert phases['sort_agents']['calls'] + phases['idle_days']['calls'] == 20
+    assert all(phase['seconds'] >= 0 for phase in phases.values())
+
+    assert [row['day'] for row in metrics['days']] == list(range(1, 21))
+    totals = metrics['totals']
+    assert totals['purchases'] > 0 and totals['parts_completed'] > 0
+    for counter in COUNTERS:
+        assert sum(metrics['agents'][counter].values()) == totals[counter]
+        assert sum(row[counter] for row in metrics['days']) == totals[counter]
+    # a trade counts for the buyer and for the seller
+    assert totals['trades'] % 2 == 0
+
+
+def test_summary_of_an_instrumented_day():
+    instruments = instrumented_run(days=10)
+    row = instruments.days[4]
+    line = instruments.summary(5)
+    assert line.startswith("day 5: ")
+    assert f"purchases {row['purchases']} trades {row['trades']} parts {row['parts_completed']}" in line
+    assert "trading_day" in line
+    assert len(instruments.summaries()) == 10
+    with pytest.raises(KeyError):
+        instruments.summary(11)
+
+
+def test_summaries_as_trace_events():
+    sink = events.RingBufferSink()
+    events.configure(sink, events.INFO)
+    instruments = instrumented_run(days=5, summarize=True)
+    lines = [event.text for event in sink.of_kind('trace') if event.text.startswith("day ")]
+    assert lines == instruments.summaries()
+
+
+def test_profile_days_profiles_only_that_range(tmp_path):
+    assert instrumented_run(days=5).profile_stats() is None
+    path = str(tmp_path / "run.prof")
+    instruments = instrumented_run(days=20, profile_days=range(16, 19), profile_path=path)
+    stats = instruments.profile_stats()
+    functions = {name for _, _, name in stats.stats}
+    # day 18 is a mutation day; the trading days 15 and 20 and the GA day 15 fall outside the range
+    assert 'perform_mutation' in functions
+    assert 'conduct_trading_round' not in functions
+    assert 'select_parents' not in functions
+    assert pstats.Stats(path).total_calls == stats.total_calls
+
+
+def test_enabled_is_restored_after_deactivate():
+    assert not instrumentation.enabled
+    outer, inner = Instrumentation(), Instrumentation()
+    outer.activate()
+    inner.activate()
+    assert instrumentation.enabled and instrumentation._active is inner
+    inner.deactivate()
+    assert instrumentation.enabled and instrumentation._active is outer
+    outer.deactivate()
+    assert not instrumentation.enabled and instrumentation._active is None
+
+    instrumented_run(days=3)
+    assert not instrumentation.enabled
+
+
+def test_engines_count_the_same_per_agent():
+    pytest.importorskip("numpy")
+    by_object = instrumented_run(days=30, engine="object").metrics()
+    by_array = instrumented_run(days=30, engine="array").metrics()
+    assert by_array['agents'] == by_object['agents']
+    assert [{counter: row[counter] for counter in COUNTERS} for row in by_array['days']] == \
+        [{counter: row[counter] for counter in COUNTERS} for row in by_object['days']]
@@ -0,0 +1,62 @@
+"""Tests for the island-model GA (islands.py)."""
+import pytest
+
+from evobuildsim import events
+from evobuildsim.config import SimulationConfig
+from evobuildsim.islands import Island, make_islands, run_islands
+from evobuildsim.selection import fitness
+
+
+@pytest.fixture(autouse=True)
+def silent():
+    previous = events.configure(events.NullSink(), events.OFF)
+    yield
+    events.configure(*previous)
+
+
+def arrivals(count):
+    return [((['hall', 'floor', 'garret'], 2, 4, 5), 100.0 + index) for index in range(count)]
+
+
+def test_immigrants_never_replace_the_fittest_builder():
+    island = Island(0, SimulationConfig(days=20), seed=1)
+    island.run_until(20)
+    elite = max(island.agents, key=fitness)
+    elite_genome = elite.genome()
+    assert island.immigrate(arrivals(len(island.agents) + 5)) == len(island.agents) - 1
+    assert elite.genome() == elite_genome
+    assert island.immigrants == len(island.agents) - 1
+
+
+def test_max_immigrants():
+    island = Island(0, SimulationConfig(days=20), seed=1, max_immigrants=2)
+    assert island.immigrate(arrivals(5)) == 2
+    assert island.immigrate(arrivals(1)) == 1
+    assert island.immigrants == 3
+
+
+def test_migrants_moved_counts_the_placed_genomes():
+    configs = make_islands(SimulationConfig(days=30), islands=3)
+    result = run_islands(configs, seed=2, migrate_every=10, migrants=4, topology='full', processes=False,
+                         max_immigrants=3)
+    # migrations on days 10, 20 and 30, every island gets 2 x 4 genomes each time and takes 3 of them
+    assert result['migrations'] == 3
+    assert result['migrants_moved'] == 3 * 3 * 3
+    assert [island['immigrants'] for island in result['islands']] == [9, 9, 9]
+
+
+def test_make_islands_returns_separate_configs():
+    configs = make_islands(islands=3)
+    assert configs == [SimulationConfig()] * 3
+    assert len({id(config) for config in configs}) == 3
+    configs[0].mutation_rate = 0.5
+    assert [config.mutation_rate for config in configs] == [0.5, 0.1, 0.1]
+    assert make_islands(SimulationConfig(days=7), islands=0) == []
+
+
+def test_processes_do_not_change_the_result():
+    configs = make_islands(SimulationConfig(days=30), islands=3)
+    configs[1].ga_every = 10
+    in_process = run_islands(configs, seed=4, migrate_every=10, migrants=2, topology='random', processes=False)
+    assert run_islands(configs, seed=4, migrate_every=10, migrants=2, topology='random', processes=True) == in_process
+    assert in_process['migrants_moved'] > 0
@@ -0,0 +1,78 @@
+"""Tests for the lineage store (lineage.py)."""
+import os
+import random
+
+import pytest
+
+from evobuildsim import events, simulation
+from evobuildsim.lineage import CROSSOVER, FIELDS, RECORD, RECORDS_FILE, LineageStore
+
+
+@pytest.fixture(autouse=True)
+def silent():
+    previous = events.configure(events.NullSink(), events.OFF)
+    yield
+    events.configure(*previous)
+
+
+def run(directory, days=60, seed=4):
+    random.seed(seed)
+    material_agent, agents = simulation.create_world()
+    with LineageStore.create(directory, agents) as lineage:
+        simulation.main(days, material_agent, agents, write_stats=False, lineage=lineage)
+    return lineage, agents
+
+
+def test_records_follow_the_run(tmp_path):
+    lineage, agents = run(str(tmp_path / "lineage"))
+    assert lineage.columns['kind'][:len(agents)].tolist() == [0] * len(agents)
+    for strategy in range(len(lineage)):
+        # parents always come before their children
+        assert lineage.columns['parent_a'][strategy] < strategy
+        assert lineage.columns['parent_b'][strategy] < strategy
+    for agent in agents:
+        record = lineage.record(lineage.current(agent.name))
+        assert record['genome'] == agent.genome()
+        assert lineage.line(record['id'])[0] == lineage.agents.index(agent.name)
+    assert CROSSOVER in lineage.columns['kind']
+
+
+def test_file_format(tmp_path):
+    directory = str(tmp_path / "lineage")
+    lineage, _ = run(directory)
+    assert os.path.getsize(os.path.join(directory, RECORDS_FILE)) == len(lineage) * RECORD.size == len(lineage) * 28
+    reopened = LineageStore.open(directory)
+    assert reopened.agents == lineage.agents
+    assert all(reopened.columns[field] == lineage.columns[field] for field in FIELDS)
+    # a record cut short by a crash is dropped
+    with open(os.path.join(directory, RECORDS_FILE), 'ab') as f:
+        f.write(b'\0' * 5)
+    assert len(LineageStore.open(directory)) == len(lineage)
+
+
+def test_agent_in_two_pairs():
+    _, agents = simulation.create_world()
+    first, second, third = agents[:3]
+    genomes = [agent.genome() for agent in agents[:3]]
+    lineage = LineageStore.create(None, agents)
+    # pair by pair, the way main() records them
+    for pair in ([first, second], [first, third]):
+        simulation.perform_crossover(pair)
+        lineage.record_crossover(6, pair)
+    record = lineage.record(lineage.current(first.name))
+    assert record['genome'] == first.genome() == genomes[2]
+    assert (record['parent_a'], record['parent_b']) == (len(agents), 2)
+    assert lineage.record(lineage.current(second.name))['genome'] == genomes[0]
+
+    batch = [first, second, first, third]
+    simulation.perform_crossover(batch)
+    with pytest.raises(ValueError, match="two pairs"):
+        lineage.record_crossover(12, batch)
+
+
+def test_trait_shares():
+    lineage, _ = run(None)
+    totals = {}
+    for generation, gene, _, _, share in lineage.trait_frequencies():
+        totals[generation, gene] = totals.get((generation, gene), 0) + share
+    assert all(total == pytest.approx(1.0) for total in totals.values())
@@ -0,0 +1,96 @@
+"""Tests for the streamed per-day metrics (metrics_writer.py)."""
+import os
+import random
+
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+
+from evobuildsim import events, simulation
+from evobuildsim.metrics_writer import COLUMNS, MetricsWriter, export_metrics, read_metrics
+
+
+@pytest.fixture(autouse=True)
+def silent():
+    previous = events.configure(events.NullSink(), events.OFF)
+    yield
+    events.configure(*previous)
+
+
+def run(directory, days=6, batch_rows=10, format='arrow', run_id=None):
+    random.seed(3)
+    material_agent, agents = simulation.create_world()
+    with MetricsWriter(directory, format=format, batch_rows=batch_rows, run_id=run_id) as metrics:
+        agents = simulation.main(days, material_agent, agents, write_stats=False, metrics=metrics)
+    return metrics, agents
+
+
+@pytest.mark.parametrize('format', ['arrow', 'parquet'])
+def test_rows_round_trip(tmp_path, format):
+    if format == 'parquet':
+        pytest.importorskip("pyarrow.parquet")
+    directory = str(tmp_path / "metrics")
+    metrics, agents = run(directory, format=format, run_id="first")
+    run(directory, format=format, run_id="second")
+    assert not metrics._thread.is_alive()
+    # a batch every 10 rows, so the file has many record batches or row groups
+    if format == 'parquet':
+        import pyarrow.parquet as pq
+        assert pq.ParquetFile(metrics.path).num_row_groups > 1
+
+    table = read_metrics(directory)
+    assert table.schema.names == [name for name, _ in COLUMNS]
+    assert table.num_rows == 2 * 6 * len(agents)
+    rows = [row for row in table.to_pylist() if row['run_id'] == 'first']
+    assert [row['day'] for row in rows] == [day for day in range(1, 7) for _ in agents]
+    last = {row['agent']: row for row in rows if row['day'] == 6}
+    for agent in agents:
+        row = last[agent.name]
+        assert (row['money'], row['houses_built'], row['build_order']) == \
+               (agent.money, agent.houses_built, ', '.join(agent.build_order))
+        assert row['fitness'] == agent.houses_built + agent.money / 1000000
+
+
+def test_export(tmp_path):
+    pytest.importorskip("pandas")
+    directory = str(tmp_path / "metrics")
+    _, agents = run(directory)
+    csv_path = str(tmp_path / "daily.csv")
+    df = export_metrics(directory, csv_path=csv_path)
+    assert len(df) == 6 * len(agents)
+    with open(csv_path) as f:
+        assert f.readline().strip() == ','.join(name for name, _ in COLUMNS)
+    final = export_metrics(directory, final_day_only=True)
+    assert final['day'].tolist() == [6] * len(agents)
+
+
+def test_close_on_exception_keeps_what_was_recorded(tmp_path):
+    directory = str(tmp_path / "metrics")
+    _, agents = simulation.create_world()
+    with pytest.raises(RuntimeError):
+        with MetricsWriter(directory, batch_rows=5) as metrics:
+            metrics.record_day(1, agents)
+            metrics.record_day(2, agents)
+            raise RuntimeError("the run failed")
+    assert not metrics._thread.is_alive()
+    assert read_metrics(directory).num_rows == 2 * len(agents)
+
+
+def test_writer_errors_reach_the_caller(tmp_path):
+    _, agents = simulation.create_world()
+    agents[0].buyprice = 1000  # out of range for int8
+    metrics = MetricsWriter(str(tmp_path / "metrics"), batch_rows=1)
+    for day in range(1, 20):  # more batches than the queue holds, the failed writer must keep draining
+        try:
+            metrics.record_day(day, agents)
+        except pa.ArrowException:
+            break
+    with pytest.raises(pa.ArrowException):
+        metrics.close()
+    assert not metrics._thread.is_alive()
+
+
+def test_unknown_format(tmp_path):
+    with pytest.raises(ValueError, match="unknown metrics format"):
+        MetricsWriter(str(tmp_path), format="csv")
+    assert os.listdir(tmp_path) == []
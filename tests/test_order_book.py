@@ -0,0 +1,53 @@
+"""Tests for the per-material order books of the trading days (order_book.py)."""
+from types import SimpleNamespace
+
+import pytest
+
+from evobuildsim import events
+from evobuildsim.order_book import Trade, clear_order_books
+
+
+@pytest.fixture(autouse=True)
+def silent():
+    previous = events.configure(events.NullSink(), events.OFF)
+    yield
+    events.configure(*previous)
+
+
+def builder(name, money=1000, needs=0, excess=0, buyprice=2, sellprice=1):
+    return SimpleNamespace(name=name, money=money, buyprice=buyprice, sellprice=sellprice,
+                           materials_needed={'wood': needs}, excess_materials={'wood': excess})
+
+
+def test_seller_never_sells_more_than_its_excess():
+    seller = builder('seller', excess=3)
+    first, second = builder('first', needs=2, buyprice=3), builder('second', needs=2)
+    ledger = clear_order_books([seller, first, second], {'wood': 10})
+    # the highest bid fills first, the second buyer gets what is left
+    assert ledger == [Trade('wood', 'seller', 'first', 2, 10, 20), Trade('wood', 'seller', 'second', 1, 10, 10)]
+    assert seller.excess_materials['wood'] == 0
+    assert seller.money == 1030
+    assert (first.materials_needed['wood'], first.excess_materials['wood'], first.money) == (0, 2, 980)
+    assert (second.materials_needed['wood'], second.excess_materials['wood'], second.money) == (1, 1, 990)
+
+
+def test_cheapest_ask_first_at_the_sellers_price():
+    dear, cheap = builder('dear', excess=5, sellprice=2), builder('cheap', excess=1, sellprice=1)
+    buyer = builder('buyer', needs=3, buyprice=2)
+    ledger = clear_order_books([dear, cheap, buyer], {'wood': 10})
+    assert ledger == [Trade('wood', 'cheap', 'buyer', 1, 10, 10), Trade('wood', 'dear', 'buyer', 2, 20, 40)]
+    assert dear.excess_materials['wood'] == 3
+
+
+def test_buyers_take_what_they_can_pay_for():
+    seller = builder('seller', excess=5)
+    buyer = builder('buyer', money=25, needs=5)
+    assert clear_order_books([seller, buyer], {'wood': 10}) == [Trade('wood', 'seller', 'buyer', 2, 10, 20)]
+    assert buyer.money == 5
+
+
+def test_no_trade_below_the_ask_or_with_oneself():
+    seller = builder('seller', excess=5, sellprice=3)
+    assert clear_order_books([seller, builder('buyer', needs=5, buyprice=2)], {'wood': 10}) == []
+    both = builder('both', needs=2, excess=2)
+    assert clear_order_books([both], {'wood': 10}) == []
@@ -0,0 +1,115 @@
+"""Tests for the array engine (population_engine.py) against the object model."""
+import random
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from evobuildsim import events, simulation
+from evobuildsim.config import SimulationConfig
+from evobuildsim.population_engine import PopulationEngine
+
+
+@pytest.fixture(autouse=True)
+def silent():
+    previous = events.configure(events.NullSink(), events.OFF)
+    yield
+    events.configure(*previous)
+
+
+def make_world(seed, n=60, **overrides):
+    random.seed(seed)
+    overrides.setdefault('inventory_multiplier', 40)
+    config = SimulationConfig(roster=simulation.scaled_roster(n), **overrides)
+    return simulation.create_world(config)
+
+
+def state(material_agent, agents):
+    """Everything a request day can change, as plain values."""
+    return [
+        (agent.name, agent.money, agent.houses_built, agent.current_focus_house,
+         [{part: dict(materials) for part, materials in house.items()} for house in agent.construction_progress],
+         [dict(house.remaining) for house in agent.construction_progress],
+         [house.parts_completed for house in agent.construction_progress],
+         dict(agent.excess_materials), dict(agent.materials_needed))
+        for agent in agents
+    ], dict(material_agent.inventory)
+
+
+def object_days(material_agent, agents, days):
+    for _ in range(days):
+        for agent in agents:
+            agent.request_materials(material_agent, 0.2, 1)
+            if agent.priority_houses == 2:
+                agent.switch_focus()
+
+
+@pytest.mark.parametrize("days", [1, 4, 12])
+@pytest.mark.parametrize("house_mix", [None, ['standard', 'cottage']])
+def test_write_back_matches_object_model(days, house_mix):
+    object_world = make_world(3, house_mix=house_mix)
+    array_world = make_world(3, house_mix=house_mix)
+    random.seed(5)
+    object_days(*object_world, days)
+
+    random.seed(5)
+    engine = PopulationEngine.from_agents(array_world[1], array_world[0])
+    for _ in range(days):
+        engine.request_day()
+    engine.write_back(array_world[1], array_world[0])
+
+    assert state(*array_world) == state(*object_world)
+
+
+def test_write_back_only_clears_what_changed():
+    material_agent, agents = make_world(7)
+    engine = PopulationEngine.from_agents(agents, material_agent)
+    random.seed(1)
+    engine.request_day()
+    assert engine.dirty_parts.any() and engine.needs_dirty.any()
+    engine.write_back(agents, material_agent)
+    assert not engine.dirty_parts.any() and not engine.excess_dirty.any() and not engine.needs_dirty.any()
+
+    # nothing changed since: writing back again leaves the objects alone
+    before = state(material_agent, agents)
+    engine.write_back(agents, material_agent)
+    assert state(material_agent, agents) == before
+
+    reloaded = PopulationEngine.from_agents(agents, material_agent)
+    for name in ('progress', 'excess', 'money', 'houses_built', 'current_focus', 'inventory'):
+        assert np.array_equal(getattr(reloaded, name), getattr(engine, name)), name
+
+
+def run_main(engine, days, seed=0, n=None, **overrides):
+    roster = {} if n is None else {'roster': simulation.scaled_roster(n), 'inventory_multiplier': max(3, n // 4)}
+    config = SimulationConfig(engine=engine, **roster, **overrides)
+    material_agent, agents = simulation.create_world(config)
+    random.seed(seed)
+    agents = simulation.main(days, material_agent=material_agent, agents=agents, config=config, write_stats=False)
+    return state(material_agent, agents), [(agent.fitness_score, agent.build_order, agent.priority_houses,
+                                            agent.buyprice, agent.sellprice) for agent in agents], random.random()
+
+
+# trading, mutation and GA days in between the request days the engine keeps across
+@pytest.mark.parametrize("days", [4, 6, 16, 50])
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_main_array_engine_matches_object_engine(days, seed):
+    assert run_main('array', days, seed) == run_main('object', days, seed)
+
+
+@pytest.mark.parametrize("overrides", [
+    {'n': 300, 'house_mix': ['standard', 'cottage']},
+    {'n': 300, 'skip_idle': False},
+    {'rng': 'streams', 'rng_seed': 9},
+])
+def test_main_array_engine_matches_object_engine_configs(overrides):
+    assert run_main('array', 40, **overrides) == run_main('object', 40, **overrides)
+
+
+def test_main_keeps_the_engine_between_request_days(monkeypatch):
+    loads = []
+    load = PopulationEngine.load
+    monkeypatch.setattr(PopulationEngine, 'load', lambda self, *args: loads.append(args) or load(self, *args))
+    run_main('array', 30, skip_idle=False)
+    # on day 1 and after the trading days 5-25 only; mutation and GA days reload just the agents they changed
+    assert len(loads) == 6
@@ -0,0 +1,77 @@
+"""Tests for the regional markets (regions.py)."""
+from collections import Counter
+
+import pytest
+
+from evobuildsim import events, simulation
+from evobuildsim.config import SimulationConfig
+from evobuildsim.regions import Region, clear_exchange, run_regions, split_world
+
+
+@pytest.fixture(autouse=True)
+def silent():
+    previous = events.configure(events.NullSink(), events.OFF)
+    yield
+    events.configure(*previous)
+
+
+def regional_configs(agents=48, regions=3, days=30):
+    config = SimulationConfig(days=days, roster=simulation.scaled_roster(agents),
+                              inventory_multiplier=max(3, agents // regions // 4))
+    return split_world(config, regions)
+
+
+def test_split_world_deals_the_roster_round_robin():
+    configs = split_world(SimulationConfig(roster=simulation.scaled_roster(10)), regions=3)
+    assert [len(config.roster) for config in configs] == [4, 3, 3]
+    assert sorted(name for config in configs for name, *_ in config.roster) == \
+        sorted(name for name, *_ in simulation.scaled_roster(10))
+    with pytest.raises(ValueError):
+        split_world(SimulationConfig(roster=simulation.scaled_roster(2)), regions=3)
+
+
+def test_clear_exchange_conserves_goods_and_money():
+    regions = [Region(index, config, seed=5) for index, config in enumerate(regional_configs())]
+    prices = simulation.MaterialAgent().prices
+    cleared = 0
+    for day in (10, 20, 30):
+        for region in regions:
+            region.run_until(day)
+        orders = [region.orders() for region in regions]
+        fills, ledger = clear_exchange(orders, prices)
+        cleared += len(ledger)
+
+        assert sum(money for region_fills in fills for _, money, _, _ in region_fills) == 0
+        # units leave the sellers' excess and land in the buyers' excess, whose needs go down by as much
+        moved, bought, traded = Counter(), Counter(), Counter()
+        for region_fills in fills:
+            for _, _, excess, needs in region_fills:
+                for material, quantity in excess.items():
+                    moved[material] += quantity
+                for material, quantity in needs.items():
+                    assert quantity > 0
+                    bought[material] += quantity
+        for trade in ledger:
+            traded[trade.material] += trade.quantity
+        assert all(quantity == 0 for quantity in moved.values())
+        assert bought == traded
+
+        # nobody sells more than they posted or gets more than they asked for
+        posted = [{position: (excess, needs) for position, _, _, _, excess, needs in region_orders}
+                  for region_orders in orders]
+        for region, region_fills in enumerate(fills):
+            for position, _, excess, needs in region_fills:
+                offered, wanted = posted[region][position]
+                assert all(-quantity <= offered.get(material, 0) for material, quantity in excess.items())
+                assert all(quantity <= wanted[material] for material, quantity in needs.items())
+        for region, region_fills in zip(regions, fills):
+            region.apply_fills(region_fills)
+    assert cleared > 0
+
+
+def test_processes_do_not_change_the_result():
+    configs = regional_configs(agents=48, regions=3, days=30)
+    in_process = run_regions(configs, seed=3, processes=False)
+    assert run_regions(configs, seed=3, processes=True) == in_process
+    assert len(in_process['regions']) == 3
+    assert sum(len(region['agents']) for region in in_process['regions']) == 48
@@ -0,0 +1,105 @@
+"""Tests for snapshots (snapshot.py) and the record-and-replay of runs (replay.py)."""
+import random
+
+import pytest
+
+from evobuildsim import events, simulation
+from evobuildsim.config import SimulationConfig
+from evobuildsim.replay import Tape, record_run, replay
+from evobuildsim.snapshot import Recorder, Snapshot
+
+CONFIGS = [SimulationConfig(), SimulationConfig(inventory_multiplier=5), SimulationConfig(engine='array')]
+
+
+@pytest.fixture(autouse=True)
+def silent():
+    previous = events.configure(events.NullSink(), events.OFF)
+    yield
+    events.configure(*previous)
+
+
+def world_state(material_agent, agents):
+    state = Snapshot.capture(0, material_agent, agents, rng_state=0).state
+    del state['day'], state['rng_state']
+    return state
+
+
+def plain_run(config, days, seed=5):
+    random.seed(seed)
+    material_agent, agents = simulation.create_world(config)
+    agents = simulation.main(days, material_agent, agents, config=config, write_stats=False)
+    return world_state(material_agent, agents), random.random()
+
+
+def needs_numpy(config):
+    if config.engine == 'array':
+        pytest.importorskip("numpy")
+
+
+@pytest.mark.parametrize('config', CONFIGS, ids=['default', 'large_inventory', 'array'])
+def test_restored_snapshot_continues_the_run(config, tmp_path):
+    needs_numpy(config)
+    expected = plain_run(config, 60)
+
+    random.seed(5)
+    material_agent, agents = simulation.create_world(config)
+    recorder = Recorder(days={25})
+    simulation.main(25, material_agent, agents, config=config, write_stats=False, on_day_end=recorder)
+    path = str(tmp_path / "day25.snap")
+    recorder.snapshots[25].save(path)
+    random.seed(99)  # the snapshot brings back the random state
+
+    day, material_agent, agents = Snapshot.load(path).restore()
+    agents = simulation.main(60, material_agent, agents, config=config, write_stats=False, start_day=day + 1)
+    assert (world_state(material_agent, agents), random.random()) == expected
+
+
+def test_forks_are_independent():
+    random.seed(5)
+    material_agent, agents = simulation.create_world()
+    snapshot = Snapshot.capture(0, material_agent, agents)
+    (_, _, first), (_, _, second) = snapshot.fork(2)
+    first[0].money = 0
+    assert second[0].money == agents[0].money != 0
+
+
+@pytest.mark.parametrize('config', CONFIGS, ids=['default', 'large_inventory', 'array'])
+def test_recording_and_replay_reproduce_the_run(config, tmp_path):
+    needs_numpy(config)
+    expected_world, expected_next = plain_run(config, 60)
+
+    random.seed(5)
+    agents, tape = record_run(60, config=config, snapshot_every=10)
+    # the random module carries on as after the plain run
+    assert random.random() == expected_next
+    path = str(tmp_path / "run.tape")
+    tape.save(path)
+    tape = Tape.load(path)
+    _, material_agent, agents = tape.snapshots[60].restore(set_random_state=False)
+    assert world_state(material_agent, agents) == expected_world
+
+    # day 43 is replayed from the day 40 snapshot, with the events of the replayed days only
+    sink = events.RingBufferSink(100000)
+    material_agent, agents = replay(tape, 43, 60, sink=sink)
+    assert world_state(material_agent, agents) == expected_world
+    assert sink.events
+
+
+def test_replay_of_one_agent():
+    random.seed(5)
+    _, tape = record_run(50, snapshot_every=10)
+    name = tape.snapshots[0].restore(set_random_state=False)[2][0].name
+    sink = events.RingBufferSink(100000)
+    replay(tape, 43, 44, agent=name, sink=sink)
+    about = [event for event in sink.events if not isinstance(event, events.Trace)]
+    assert about and all(name in (getattr(event, 'agent', None), getattr(event, 'agent_a', None),
+                                  getattr(event, 'agent_b', None)) for event in about)
+
+
+def test_replay_outside_the_recording():
+    random.seed(5)
+    _, tape = record_run(20, snapshot_every=10)
+    with pytest.raises(ValueError, match="outside the recorded run"):
+        replay(tape, 15, 25)
+    with pytest.raises(ValueError, match="outside the recorded run"):
+        replay(tape, 0)
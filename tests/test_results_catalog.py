@@ -0,0 +1,90 @@
+"""Tests for the SQLite results catalog (results_catalog.py)."""
+import random
+import statistics
+
+import pytest
+
+from evobuildsim import events, runner, simulation
+from evobuildsim.config import SimulationConfig
+from evobuildsim.results_catalog import DailyStats, ResultsCatalog
+
+
+@pytest.fixture(autouse=True)
+def silent():
+    previous = events.configure(events.NullSink(), events.OFF)
+    yield
+    events.configure(*previous)
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    with ResultsCatalog(str(tmp_path / "results.sqlite")) as catalog:
+        yield catalog
+
+
+def test_schema(catalog):
+    connection = catalog.connection
+    assert connection.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+    tables = {name for (name,) in connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    assert tables == {'configs', 'runs', 'agents', 'final_stats', 'daily_stats', 'genome_stats'}
+    indexes = {name for (name,) in connection.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert {'runs_config', 'final_agent', 'final_genome', 'daily_agent'} <= indexes
+
+
+def test_replicas_and_top_genomes(catalog):
+    config, other = SimulationConfig(days=20), SimulationConfig(days=20, mutation_rate=0.3)
+    results = runner.run_replicas(range(3), config, workers=0)
+    run_ids = catalog.record_replicas(results)
+    catalog.record_replicas(runner.run_replicas(range(2), other, workers=0))
+
+    runs = catalog.runs({'mutation_rate': 0.1})
+    assert [run['run_id'] for run in runs] == run_ids
+    assert [run['seed'] for run in runs] == [0, 1, 2]
+    assert catalog.config(run_ids[0]) == config
+    expected = sorted(results['per_seed'][1]['agents'], key=lambda agent: agent['fitness'], reverse=True)
+    assert catalog.final_stats(run_ids[1]) == expected
+    assert len(catalog.runs()) == 5
+
+    # the running sums per genome give the same means as the final stats they summarise
+    scores = {}
+    for result in results['per_seed']:
+        for agent in result['agents']:
+            genome = (', '.join(agent['build_order']), agent['priority_houses'], agent['buyprice'], agent['sellprice'])
+            scores.setdefault(genome, []).append(agent['fitness'])
+    top = catalog.top_genomes({'mutation_rate': 0.1, 'days': 20}, limit=1000)
+    assert len(top) == len(scores)
+    assert [entry['mean'] for entry in top] == sorted((entry['mean'] for entry in top), reverse=True)
+    for entry in top:
+        samples = scores[entry['build_order'], entry['priority_houses'], entry['buyprice'], entry['sellprice']]
+        assert (entry['count'], entry['best']) == (len(samples), max(samples))
+        assert entry['mean'] == pytest.approx(statistics.fmean(samples))
+    with pytest.raises(ValueError, match="unknown config field"):
+        catalog.top_genomes({'mutation': 0.1})
+
+
+def test_run_with_daily_stats(catalog):
+    config = SimulationConfig(days=12)
+    random.seed(3)
+    material_agent, agents = simulation.create_world(config)
+    daily = DailyStats(every=3)
+    agents = simulation.main(12, material_agent, agents, config=config, write_stats=False, on_day_end=daily)
+    run_id = catalog.record_run(config, 3, agents, daily=daily)
+    rows = catalog.daily_stats(run_id)
+    assert len(rows) == 4 * len(agents)
+    name = agents[0].name
+    assert [row[0] for row in catalog.daily_stats(run_id, name)] == [3, 6, 9, 12]
+    assert catalog.daily_stats(run_id, name)[-1][3:5] == (agents[0].money, agents[0].houses_built)
+
+
+def test_import_csv(catalog, tmp_path, monkeypatch):
+    pytest.importorskip("pandas")
+    monkeypatch.chdir(tmp_path)
+    _, agents = simulation.create_world()
+    simulation.write_stats_to_csv(agents, 0, 0.2, 1)
+    agents[0].money += 1
+    simulation.write_stats_to_csv(agents, 0, 0.2, 1, stop_reason='plateau', stop_day=42)
+    assert catalog.import_csv("agent_stats.csv") == 2
+    runs = catalog.runs()
+    assert [(run['seed'], run['stop_day'], run['stop_reason']) for run in runs] == [(None, None, None), (None, 42, 'plateau')]
+    assert catalog.config(runs[0]['run_id']) is None
+    assert {agent['name']: agent['money'] for agent in catalog.final_stats(runs[1]['run_id'])}[agents[0].name] == agents[0].money
@@ -0,0 +1,70 @@
+"""Tests for the per-purpose random streams (rng.py)."""
+import random
+
+import pytest
+
+from evobuildsim import simulation
+from evobuildsim.config import SimulationConfig
+from evobuildsim.rng import MATERIALS, RngStreams
+
+np = pytest.importorskip("numpy")
+
+
+@pytest.fixture
+def agents():
+    return simulation.create_world(SimulationConfig(roster=simulation.scaled_roster(30)))[1]
+
+
+def by_name(agents, rows):
+    return {agent.name: row for agent, row in zip(agents, rows)}
+
+
+def test_draws_follow_the_name_not_the_position(agents):
+    shuffled = agents[:]
+    random.Random(4).shuffle(shuffled)
+    assert [agent.name for agent in shuffled] != [agent.name for agent in agents]
+    streams = RngStreams(7)
+    forced_buy = by_name(agents, streams.forced_buy_rows(3, agents))
+    mutation = by_name(agents, streams.mutation_rows(5, agents))
+    # a fresh object and a shuffled roster give every name the same values
+    streams = RngStreams(7)
+    assert by_name(shuffled, streams.forced_buy_rows(3, shuffled)) == forced_buy
+    assert by_name(shuffled, streams.mutation_rows(5, shuffled)) == mutation
+    assert by_name(agents, streams.forced_buy_rows(3, agents)) == forced_buy
+
+
+def test_mutation_rows_hold_rolls_and_gene_values(agents):
+    for row in RngStreams(1).mutation_rows(2, agents):
+        assert len(row) == 7
+        assert all(0 <= roll < 1 for roll in row[:4])
+        assert 0 <= row[4] < 6 and 1 <= row[5] <= 8 and 1 <= row[6] <= 8
+
+
+def test_draws_differ_across_purpose_day_and_seed(agents):
+    streams = RngStreams(7)
+    block = streams.forced_buy_block(3, agents)
+    assert block.shape == (len(agents), len(MATERIALS))
+    assert not np.array_equal(block, streams.forced_buy_block(4, agents))
+    assert not np.array_equal(block, RngStreams(8).forced_buy_block(3, agents))
+
+    rolls = np.array([row[:4] for row in streams.mutation_rows(3, agents)])
+    assert not np.array_equal(rolls, block[:, :4])
+    assert not np.array_equal(rolls, np.array([row[:4] for row in streams.mutation_rows(4, agents)]))
+    assert not np.array_equal(rolls, np.array([row[:4] for row in RngStreams(8).mutation_rows(3, agents)]))
+
+    assert streams.selection(3).random() == RngStreams(7).selection(3).random()
+    assert streams.selection(3).random() != streams.selection(4).random()
+    assert streams.selection(3).random() != RngStreams(8).selection(3).random()
+
+
+def test_material_columns_can_be_reordered(agents):
+    streams = RngStreams(2)
+    block = streams.forced_buy_block(1, agents)
+    materials = MATERIALS[::-1]
+    assert np.array_equal(streams.forced_buy_block(1, agents, materials), block[:, ::-1])
+
+
+def test_names_must_be_unique(agents):
+    agents[1].name = agents[0].name
+    with pytest.raises(ValueError, match="unique"):
+        RngStreams(0).forced_buy_rows(1, agents)
@@ -0,0 +1,38 @@
+"""Tests for seeded replicas on a process pool (runner.py)."""
+import pytest
+
+from evobuildsim import events, runner
+from evobuildsim.config import SimulationConfig
+
+CONFIG = SimulationConfig(days=20)
+
+
+@pytest.fixture(autouse=True)
+def silent():
+    previous = events.configure(events.NullSink(), events.OFF)
+    yield
+    events.configure(*previous)
+
+
+def test_results_do_not_depend_on_workers_or_chunks():
+    serial = runner.run_replicas(range(6), CONFIG, workers=0)
+    assert [result['seed'] for result in serial['per_seed']] == list(range(6))
+    for workers, chunksize in ((0, 4), (2, 1), (2, 4), (3, 6)):
+        assert runner.run_replicas(range(6), CONFIG, workers=workers, chunksize=chunksize) == serial
+
+
+def test_seeds_are_deduplicated_and_sorted():
+    results = runner.run_replicas([3, 1, 3], CONFIG, workers=0)
+    assert [result['seed'] for result in results['per_seed']] == [1, 3]
+    assert results['summary']['replicas'] == 2
+
+
+def test_chunksize_below_one():
+    with pytest.raises(ValueError, match="chunksize"):
+        runner.run_replicas(range(6), CONFIG, workers=2, chunksize=0)
+    with pytest.raises(SystemExit):
+        runner.cli(['--seeds', '0-5', '--chunksize', '0'])
+
+
+def test_parse_seeds():
+    assert runner.parse_seeds('0-3,7,9-10') == [0, 1, 2, 3, 7, 9, 10]
@@ -0,0 +1,32 @@
+"""Tests for the parent selection operators (selection.py)."""
+import random
+
+import pytest
+
+from evobuildsim import simulation
+from evobuildsim.selection import OPERATORS, FitnessTable
+
+
+def population(money=None):
+    _, agents = simulation.create_world()
+    if money is not None:
+        for agent in agents:
+            agent.money = money
+    return agents
+
+
+@pytest.mark.parametrize('operator', OPERATORS)
+def test_operators_pick_the_requested_count(operator):
+    assert len(FitnessTable(population()).select(6, operator, rng=random.Random(3))) == 6
+
+
+def test_unknown_operator_is_rejected_even_without_fitness():
+    for agents in (population(), population(money=0), []):
+        with pytest.raises(ValueError, match="unknown selection operator"):
+            FitnessTable(agents).select(4, 'roulete')
+
+
+def test_zero_total_fitness_selects_nobody_on_the_wheel():
+    table = FitnessTable(population(money=0))
+    assert table.select(4, 'roulette') == table.select(4, 'alias') == table.select(4, 'sus') == []
+    assert len(table.select(4, 'tournament', rng=random.Random(1))) == 4
@@ -0,0 +1,57 @@
+"""Tests for skipping idle request days (simulation.skip_idle_days): a run must not change by it."""
+import random
+
+import pytest
+
+from evobuildsim import events, simulation
+from evobuildsim.config import SimulationConfig
+
+
+@pytest.fixture(autouse=True)
+def silent():
+    previous = events.configure(events.NullSink(), events.OFF)
+    yield
+    events.configure(*previous)
+
+
+@pytest.fixture
+def skips(monkeypatch):
+    """Days skipped by the runs of a test."""
+    skipped = []
+    skip_idle_days = simulation.skip_idle_days
+
+    def counting(first_day, last_day, *args, **kwargs):
+        skipped.extend(range(first_day, last_day + 1))
+        return skip_idle_days(first_day, last_day, *args, **kwargs)
+
+    monkeypatch.setattr(simulation, 'skip_idle_days', counting)
+    return skipped
+
+
+def world_state(material_agent, agents):
+    return (dict(material_agent.inventory),
+            [(agent.name, agent.money, agent.houses_built, agent.genome(), agent.current_focus_house,
+              dict(agent.excess_materials), dict(agent.materials_needed),
+              [{part: dict(used) for part, used in house.items()} for house in agent.construction_progress])
+             for agent in agents])
+
+
+def run(seed, days, with_hook=False, **settings):
+    config = SimulationConfig(**settings)
+    random.seed(seed)
+    material_agent, agents = simulation.create_world(config)
+    ends = []
+    hook = (lambda day, _, agents: ends.append((day, random.random(), [agent.current_focus_house for agent in agents]))) \
+        if with_hook else None
+    agents = simulation.main(days, material_agent, agents, config=config, write_stats=False, on_day_end=hook)
+    return world_state(material_agent, agents), ends, random.getstate()
+
+
+@pytest.mark.parametrize('settings', [{}, {'clearing': 'pro_rata'}, {'with_hook': True}, {'engine': 'array'}],
+                         ids=['default', 'pro_rata', 'on_day_end', 'array'])
+def test_skipping_idle_days_changes_nothing(settings, skips):
+    if settings.get('engine') == 'array':
+        pytest.importorskip("numpy")
+    for seed in range(3):
+        assert run(seed, 400, skip_idle=True, **settings) == run(seed, 400, skip_idle=False, **settings)
+    assert skips
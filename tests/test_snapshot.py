@@ -0,0 +1,75 @@
+"""Tests for the snapshot file format and forking (snapshot.py)."""
+import random
+import struct
+
+import pytest
+
+from evobuildsim import events, simulation
+from evobuildsim.config import SimulationConfig
+from evobuildsim.snapshot import _HEADER, MAGIC, SNAPSHOT_VERSION, Snapshot
+
+
+@pytest.fixture(autouse=True)
+def silent():
+    previous = events.configure(events.NullSink(), events.OFF)
+    yield
+    events.configure(*previous)
+
+
+@pytest.fixture
+def snapshot():
+    random.seed(2)
+    material_agent, agents = simulation.create_world(SimulationConfig(house_mix=['standard', 'cottage']))
+    simulation.main(12, material_agent, agents, write_stats=False)
+    return Snapshot.capture(12, material_agent, agents)
+
+
+def world_state(world):
+    day, material_agent, agents = world
+    state = Snapshot.capture(day, material_agent, agents, rng_state=0).state
+    del state['rng_state']
+    return state
+
+
+def test_save_and_load(snapshot, tmp_path):
+    path = str(tmp_path / "day12.snap")
+    snapshot.save(path)
+    with open(path, 'rb') as f:
+        magic, version, day, _ = _HEADER.unpack(f.read(_HEADER.size))
+    assert (magic, version, day) == (MAGIC, SNAPSHOT_VERSION, 12)
+    loaded = Snapshot.load(path)
+    assert loaded.day == 12 and loaded.payload == snapshot.payload
+
+
+def test_foreign_and_unknown_files_are_rejected(snapshot, tmp_path):
+    path = str(tmp_path / "day12.snap")
+    snapshot.save(path)
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    foreign = tmp_path / "foreign.snap"
+    foreign.write_bytes(b"EBTAPE" + data[len(MAGIC):])
+    with pytest.raises(ValueError, match="not a simulation snapshot"):
+        Snapshot.load(str(foreign))
+
+    for version in (0, SNAPSHOT_VERSION + 1):
+        unknown = tmp_path / f"v{version}.snap"
+        unknown.write_bytes(data[:len(MAGIC)] + struct.pack("<H", version) + data[len(MAGIC) + 2:])
+        with pytest.raises(ValueError, match=f"snapshot version {version}"):
+            Snapshot.load(str(unknown))
+
+
+def test_fork_branches_match_a_restore_and_share_nothing(snapshot):
+    restored = world_state(snapshot.restore(set_random_state=False))
+    random.seed(7)
+    before = random.getstate()
+    branches = snapshot.fork(3)
+    assert random.getstate() == before
+    assert [world_state(branch) for branch in branches] == [restored] * 3
+
+    # run one branch on; the others don't move
+    _, material_agent, agents = branches[1]
+    simulation.main(30, material_agent, agents, write_stats=False, start_day=13)
+    assert world_state(branches[0]) == world_state(branches[2]) == restored
+    assert world_state(branches[1]) != restored
+    assert snapshot.fork(0) == []
@@ -0,0 +1,61 @@
+"""Tests for parameter sweeps and their result cache (sweep.py)."""
+import pytest
+
+from evobuildsim import events
+from evobuildsim.config import SimulationConfig
+from evobuildsim.sweep import ResultCache, _parse_axis, grid, run_sweep
+
+BASE = SimulationConfig(days=12)
+
+
+@pytest.fixture(autouse=True)
+def silent():
+    previous = events.configure(events.NullSink(), events.OFF)
+    yield
+    events.configure(*previous)
+
+
+def test_axis_values_are_parsed():
+    assert _parse_axis('parents=2,4') == ('parents', [2, 4])
+    assert _parse_axis('mutation_rate=0.0:0.5') == ('mutation_rate', (0.0, 0.5))
+    assert _parse_axis('selection=sus,None') == ('selection', ['sus', None])
+
+
+def test_bool_axis():
+    name, values = _parse_axis('skip_idle=true,False,TRUE')
+    assert values == [True, False, True]
+    assert all(type(value) is bool for value in values)
+    assert [config.skip_idle for config in grid(SimulationConfig(), **{name: values})] == values
+
+
+def test_cache_key(tmp_path):
+    cache = ResultCache(str(tmp_path), version='a')
+    key = cache.key(BASE, 1)
+    assert key == cache.key(BASE.replace(), 1)
+    assert key != cache.key(BASE, 2)
+    assert key != cache.key(BASE.replace(mutation_rate=0.2), 1)
+    assert key != ResultCache(str(tmp_path), version='b').key(BASE, 1)
+
+
+def test_overlapping_sweep_reuses_the_cache(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache"), version='test')
+    first = run_sweep(grid(BASE, mutation_rate=[0.05, 0.1]), range(3), workers=0, cache=cache)
+    assert [(point['computed'], point['cached']) for point in first['points']] == [(3, 0), (3, 0)]
+
+    second = run_sweep(grid(BASE, mutation_rate=[0.1, 0.2]), range(4), workers=0, cache=cache)
+    # the seeds 0-2 of mutation_rate=0.1 were run before, the new point and seed are computed
+    assert [(point['computed'], point['cached']) for point in second['points']] == [(1, 3), (4, 0)]
+    again = run_sweep(grid(BASE, mutation_rate=[0.1]), range(3), workers=0, cache=cache)
+    assert again['points'][0]['summary'] == first['points'][1]['summary']
+
+    # another code version doesn't see the old results
+    other = run_sweep(grid(BASE, mutation_rate=[0.1]), range(3), workers=0,
+                      cache=ResultCache(str(tmp_path / "cache"), version='other'))
+    assert other['points'][0]['computed'] == 3
+
+
+def test_workers_do_not_change_the_summaries():
+    points = grid(BASE, mutation_rate=[0.05, 0.2])
+    serial = run_sweep(points, range(4), workers=0, cache=False)
+    pooled = run_sweep(points, range(4), workers=2, cache=False)
+    assert [point['summary'] for point in serial['points']] == [point['summary'] for point in pooled['points']]